@@ -0,0 +1,194 @@
+"""
+Event-loop lag while large messages are built, sent and parsed.
+
+A probe task sleeps PROBE_INTERVAL seconds in a loop and records how late
+each wake-up is; CPU-bound work that holds the loop shows up as lag. Each
+scenario runs once per CPU_POOL_MODE against the local fakes, in a fresh
+interpreter. Run from the repository root:
+
+    python -m benchmarks.bench_event_loop_lag
+    python -m benchmarks.bench_event_loop_lag --message-mb 10 --mode off --mode process
+    python -m benchmarks.bench_event_loop_lag --json > lag.json
+"""
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from src.services.cpu_pool import shutdown_cpu_pools
+from src.services.email_receiver import EmailReceiver
+from src.services.email_sender import EmailSender
+
+from .bench_throughput import bench_settings, percentile
+from .fake_servers import FakeIMAPServer, FakePOP3Server, FakeServer, FakeSMTPServer, build_message
+
+
+PROBE_INTERVAL = 0.001
+MODES = ("off", "thread", "process")
+
+
+class LagProbe:
+    """Measures how late the event loop runs a periodically sleeping task."""
+
+    def __init__(self, interval: float = PROBE_INTERVAL):
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+
+    def __enter__(self) -> "LagProbe":
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._task.cancel()
+
+
+class ServerThread:
+    """Runs the fake servers on their own loop, so their work is not probed."""
+
+    def __init__(self, *servers: FakeServer):
+        self.servers = servers
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def _call(self, coroutine) -> Any:
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def __enter__(self) -> "ServerThread":
+        self.thread.start()
+        for server in self.servers:
+            self._call(server.start())
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for server in self.servers:
+            self._call(server.stop())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def large_body(message_mb: int) -> str:
+    """Non-ASCII text body, so it is base64-encoded like most real mail."""
+    line = "Grüße aus dem Benchmark, Zeile für Zeile. " * 2 + "\n"
+    return line * (message_mb * 1024 * 1024 // len(line.encode()))
+
+
+async def large_send(sender: EmailSender, receiver: EmailReceiver, args) -> Callable[[], Awaitable]:
+    """send_email with a large body: MIME building and rendering."""
+    body = large_body(args.message_mb)
+    return lambda: sender.send_email(recipient="user@example.com", subject="Large", body=body)
+
+
+async def imap_fetch(sender: EmailSender, receiver: EmailReceiver, args) -> Callable[[], Awaitable]:
+    """IMAP listing of large messages: MIME parsing."""
+    return lambda: receiver.receive_emails_imap(limit=args.messages)
+
+
+async def pop3_fetch(sender: EmailSender, receiver: EmailReceiver, args) -> Callable[[], Awaitable]:
+    """POP3 retrieval of large messages: MIME parsing."""
+    return lambda: receiver.receive_emails_pop3(limit=args.messages)
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[Callable[[], Awaitable]]]] = {
+    "large_send": large_send,
+    "imap_fetch": imap_fetch,
+    "pop3_fetch": pop3_fetch,
+}
+
+
+async def run_scenario(name: str, mode: str, args) -> Dict[str, Any]:
+    """Start the fakes and run one scenario under a lag probe."""
+    body_bytes = args.message_mb * 1024 * 1024
+    mailbox = {number: build_message(number, body_bytes) for number in range(1, args.messages + 1)}
+    smtp, imap, pop3 = FakeSMTPServer(), FakeIMAPServer(mailbox), FakePOP3Server(mailbox)
+    with ServerThread(smtp, imap, pop3):
+        settings = bench_settings(smtp, imap, pop3).model_copy(update={"CPU_POOL_MODE": mode})
+        sender = EmailSender(settings)
+        receiver = EmailReceiver(settings)
+        try:
+            operation = await SCENARIOS[name](sender, receiver, args)
+            # Warm up connections and pool workers (process start-up is not measured)
+            await operation()
+            durations: List[float] = []
+            with LagProbe() as probe:
+                for _ in range(args.repeats):
+                    started = time.perf_counter()
+                    result = await operation()
+                    durations.append(time.perf_counter() - started)
+                    if result["status"] != "success":
+                        raise RuntimeError(result["message"])
+        finally:
+            await sender.close()
+            await receiver.close()
+            shutdown_cpu_pools()
+
+    return {
+        "scenario": name,
+        "mode": mode,
+        "operation_ms": round(percentile(durations, 50) * 1000, 1),
+        "lag_p50_ms": round(percentile(probe.lags, 50) * 1000, 2),
+        "lag_p99_ms": round(percentile(probe.lags, 99) * 1000, 2),
+        "lag_max_ms": round(max(probe.lags) * 1000, 2)
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    columns = [
+        ("scenario", 14), ("mode", 10), ("operation_ms", 14), ("lag_p50_ms", 12),
+        ("lag_p99_ms", 12), ("lag_max_ms", 12)
+    ]
+    headers = ["scenario", "mode", "op p50 ms", "lag p50 ms", "lag p99 ms", "lag max ms"]
+    print("".join(header.ljust(width) for header, (_, width) in zip(headers, columns)))
+    for result in results:
+        print("".join(str(result[key]).ljust(width) for key, width in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--mode", action="append", choices=MODES,
+                        help="CPU_POOL_MODE to run under (repeatable; default: all)")
+    parser.add_argument("--message-mb", type=int, default=5, help="Message size (default: 5)")
+    parser.add_argument("--messages", type=int, default=4,
+                        help="Messages per IMAP/POP3 listing (default: 4)")
+    parser.add_argument("--repeats", type=int, default=5, help="Measured operations (default: 5)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_scenario(args.scenario[0], args.mode[0], args))))
+        return
+
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        for mode in args.mode or MODES:
+            command = [
+                sys.executable, "-m", "benchmarks.bench_event_loop_lag", "--child",
+                "--scenario", name, "--mode", mode, "--message-mb", str(args.message_mb),
+                "--messages", str(args.messages), "--repeats", str(args.repeats)
+            ]
+            completed = subprocess.run(command, capture_output=True, text=True, check=True)
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
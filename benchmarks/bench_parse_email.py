@@ -0,0 +1,91 @@
+"""
+Benchmark parse_email against the previous two-walk parser.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parse_email
+"""
+
+import email
+import timeit
+from email.header import decode_header
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from src.services.email_receiver import parse_email
+
+
+def legacy_parse_email(email_message, email_id):
+    """The parser before the single-walk rewrite, kept for comparison."""
+    subject = ""
+    if email_message["Subject"]:
+        for content, encoding in decode_header(email_message["Subject"]):
+            subject += content.decode(encoding or "utf-8", errors="ignore") if isinstance(content, bytes) else content
+    body = ""
+    if email_message.is_multipart():
+        for part in email_message.walk():
+            if part.get_content_type() == "text/plain":
+                try:
+                    body = part.get_payload(decode=True).decode(errors="ignore")
+                    break
+                except Exception:
+                    pass
+    else:
+        try:
+            body = email_message.get_payload(decode=True).decode(errors="ignore")
+        except Exception:
+            body = str(email_message.get_payload())
+    attachments = []
+    if email_message.is_multipart():
+        for part in email_message.walk():
+            if part.get_content_disposition() == "attachment":
+                filename = part.get_filename()
+                if filename:
+                    attachments.append({"filename": filename, "content_type": part.get_content_type()})
+    return {
+        "id": email_id,
+        "subject": subject,
+        "from": email_message.get("From", ""),
+        "to": email_message.get("To", ""),
+        "date": email_message.get("Date", ""),
+        "body": body[:1000],
+        "body_length": len(body),
+        "attachments": attachments,
+        "has_attachments": len(attachments) > 0,
+    }
+
+
+def build_message(body_chars: int, attachments: int, attachment_bytes: int) -> email.message.Message:
+    """Build a parsed message with a base64 UTF-8 body and binary attachments."""
+    message = MIMEMultipart()
+    message["Subject"] = "Benchmark"
+    message.attach(MIMEText("Lorem ipsum dolor sit amet. " * (body_chars // 28), "plain", "utf-8"))
+    for index in range(attachments):
+        part = MIMEApplication(bytes(range(256)) * (attachment_bytes // 256))
+        part.add_header("Content-Disposition", "attachment", filename=f"file{index}.bin")
+        message.attach(part)
+    return email.message_from_bytes(message.as_bytes())
+
+
+CASES = {
+    "short body": (2_000, 0, 0),
+    "long body": (2_000_000, 0, 0),
+    "long body + 5 x 1 MB attachments": (500_000, 5, 1_000_000),
+}
+
+
+def main(number: int = 20) -> None:
+    print(f"{'case':<36}{'legacy (ms)':>14}{'current (ms)':>14}{'speedup':>10}")
+    for name, args in CASES.items():
+        message = build_message(*args)
+        legacy = min(timeit.repeat(lambda: legacy_parse_email(message, "1"), number=number, repeat=3))
+        current = min(timeit.repeat(lambda: parse_email(message, "1"), number=number, repeat=3))
+        print(
+            f"{name:<36}{legacy / number * 1000:>14.3f}{current / number * 1000:>14.3f}"
+            f"{legacy / current:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Throughput benchmarks for EmailSender and EmailReceiver against local fakes.
+
+Every scenario runs in a fresh interpreter so its peak RSS is its own.
+Run from the repository root:
+
+    python -m benchmarks.bench_throughput
+    python -m benchmarks.bench_throughput --messages 500 --latency-ms 20 --scenario bulk_send
+    python -m benchmarks.bench_throughput --json > results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+from src.config import Settings
+from src.services.email_receiver import EmailReceiver
+from src.services.email_sender import EmailSender
+
+from .fake_servers import FakeIMAPServer, FakePOP3Server, FakeSMTPServer, build_message
+
+
+BULK_BATCH_SIZE = 50
+LISTING_REPEATS = 5
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def bench_settings(smtp: FakeSMTPServer, imap: FakeIMAPServer, pop3: FakePOP3Server) -> Settings:
+    """Settings pointing every protocol at the local fakes."""
+    return Settings(
+        _env_file=None,
+        SMTP_SERVER="127.0.0.1",
+        SMTP_PORT=smtp.port,
+        SMTP_USERNAME="bench",
+        SMTP_PASSWORD="bench",
+        SMTP_USE_TLS=False,
+        SMTP_RATE_LIMIT_ENABLED=False,
+        DEFAULT_FROM_EMAIL="bench@example.com",
+        IMAP_SERVER="127.0.0.1",
+        IMAP_PORT=imap.port,
+        IMAP_USERNAME="bench",
+        IMAP_PASSWORD="bench",
+        IMAP_USE_SSL=False,
+        IMAP_IDLE_ENABLED=False,
+        MESSAGE_CACHE_ENABLED=False,
+        POP3_SERVER="127.0.0.1",
+        POP3_PORT=pop3.port,
+        POP3_USERNAME="bench",
+        POP3_PASSWORD="bench",
+        POP3_USE_SSL=False
+    )
+
+
+async def timed(operation: Callable[[], Awaitable[Dict[str, Any]]], latencies: List[float]) -> None:
+    """Run one operation, recording its duration and failing loudly on errors."""
+    started = time.perf_counter()
+    result = await operation()
+    latencies.append(time.perf_counter() - started)
+    if result["status"] not in ("success", "partial"):
+        raise RuntimeError(result["message"])
+
+
+async def single_send(sender: EmailSender, receiver: EmailReceiver, args) -> Dict[str, Any]:
+    """Sequential send_email calls over the pooled connection."""
+    latencies: List[float] = []
+    for number in range(args.messages):
+        await timed(lambda: sender.send_email(
+            recipient=f"user{number}@example.com", subject="Benchmark", body="Hello " * 50
+        ), latencies)
+    return {"operation": "send_email", "messages": args.messages, "latencies": latencies}
+
+
+async def bulk_send(sender: EmailSender, receiver: EmailReceiver, args) -> Dict[str, Any]:
+    """send_many in batches of BULK_BATCH_SIZE."""
+    latencies: List[float] = []
+    for start in range(0, args.messages, BULK_BATCH_SIZE):
+        batch = [
+            {"recipient": f"user{number}@example.com", "subject": "Benchmark", "body": "Hello " * 50}
+            for number in range(start, min(args.messages, start + BULK_BATCH_SIZE))
+        ]
+        await timed(lambda: sender.send_many(batch), latencies)
+    return {"operation": f"send_many({BULK_BATCH_SIZE})", "messages": args.messages, "latencies": latencies}
+
+
+async def large_attachments(sender: EmailSender, receiver: EmailReceiver, args) -> Dict[str, Any]:
+    """Sequential sends, each carrying one large attachment."""
+    latencies: List[float] = []
+    count = max(1, args.messages // 20)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "large.bin")
+        with open(path, "wb") as f:
+            f.write(os.urandom(args.attachment_mb * 1024 * 1024))
+        for number in range(count):
+            await timed(lambda: sender.send_email(
+                recipient=f"user{number}@example.com", subject="Report", body="Attached.",
+                attachments=[path]
+            ), latencies)
+    return {"operation": f"send_email({args.attachment_mb} MB)", "messages": count, "latencies": latencies}
+
+
+async def imap_listing(sender: EmailSender, receiver: EmailReceiver, args) -> Dict[str, Any]:
+    """Full IMAP listings of every message in the mailbox."""
+    latencies: List[float] = []
+    for _ in range(LISTING_REPEATS):
+        await timed(lambda: receiver.receive_emails_imap(limit=args.messages), latencies)
+    return {
+        "operation": f"receive_emails_imap({args.messages})",
+        "messages": args.messages * LISTING_REPEATS,
+        "latencies": latencies
+    }
+
+
+async def pop3_retrieval(sender: EmailSender, receiver: EmailReceiver, args) -> Dict[str, Any]:
+    """POP3 retrieval of every message in the maildrop."""
+    latencies: List[float] = []
+    for _ in range(LISTING_REPEATS):
+        await timed(lambda: receiver.receive_emails_pop3(limit=args.messages), latencies)
+    return {
+        "operation": f"receive_emails_pop3({args.messages})",
+        "messages": args.messages * LISTING_REPEATS,
+        "latencies": latencies
+    }
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[Dict[str, Any]]]] = {
+    "single_send": single_send,
+    "bulk_send": bulk_send,
+    "large_attachments": large_attachments,
+    "imap_listing": imap_listing,
+    "pop3_retrieval": pop3_retrieval,
+}
+
+
+async def run_scenario(name: str, args) -> Dict[str, Any]:
+    """Start the fakes, run one scenario and summarize it."""
+    latency = args.latency_ms / 1000
+    mailbox = {number: build_message(number) for number in range(1, args.messages + 1)}
+    async with FakeSMTPServer(latency) as smtp, FakeIMAPServer(mailbox, latency) as imap, \
+            FakePOP3Server(mailbox, latency) as pop3:
+        settings = bench_settings(smtp, imap, pop3)
+        sender = EmailSender(settings)
+        receiver = EmailReceiver(settings)
+        started = time.perf_counter()
+        try:
+            outcome = await SCENARIOS[name](sender, receiver, args)
+        finally:
+            elapsed = time.perf_counter() - started
+            await sender.close()
+            await receiver.close()
+
+    latencies = outcome["latencies"]
+    return {
+        "scenario": name,
+        "operation": outcome["operation"],
+        "operations": len(latencies),
+        "messages": outcome["messages"],
+        "seconds": round(elapsed, 3),
+        "messages_per_sec": round(outcome["messages"] / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "server_connections": smtp.connections + imap.connections + pop3.connections
+    }
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    columns = [
+        ("scenario", 18), ("operation", 28), ("messages_per_sec", 12), ("p50_ms", 10),
+        ("p99_ms", 10), ("peak_rss_mb", 12), ("server_connections", 8)
+    ]
+    headers = ["scenario", "operation", "msg/s", "p50 ms", "p99 ms", "peak RSS MB", "conns"]
+    print("".join(header.ljust(width) for header, (_, width) in zip(headers, columns)))
+    for result in results:
+        print("".join(str(result[key]).ljust(width) for key, width in columns))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--messages", type=int, default=200, help="Messages per scenario (default: 200)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Delay added to every server reply (default: 0)")
+    parser.add_argument("--attachment-mb", type=int, default=10,
+                        help="Attachment size for large_attachments (default: 10)")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_scenario(args.scenario[0], args))))
+        return
+
+    results = []
+    for name in args.scenario or list(SCENARIOS):
+        command = [
+            sys.executable, "-m", "benchmarks.bench_throughput", "--child", "--scenario", name,
+            "--messages", str(args.messages), "--latency-ms", str(args.latency_ms),
+            "--attachment-mb", str(args.attachment_mb)
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
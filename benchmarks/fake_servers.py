@@ -0,0 +1,259 @@
+"""
+In-process SMTP, IMAP and POP3 servers for reproducible benchmarks.
+
+Each server speaks just enough of its protocol for ``EmailSender`` and
+``EmailReceiver``, accepts any credentials, never uses TLS and can delay
+every reply by ``latency`` seconds to emulate a remote provider.
+"""
+
+import asyncio
+import re
+from typing import Dict, List, Optional
+
+
+def build_message(number: int, body_bytes: int = 2000) -> bytes:
+    """A plain-text message of roughly ``body_bytes`` bytes."""
+    line = f"Line of message {number} padded to a typical width.".ljust(76) + "\r\n"
+    body = line * max(1, body_bytes // len(line))
+    return (
+        f"From: sender{number}@example.com\r\n"
+        f"To: me@example.com\r\n"
+        f"Subject: Benchmark message {number}\r\n"
+        f"Date: Mon, 01 Jan 2024 00:00:00 +0000\r\n"
+        f"Message-ID: <{number}@bench.example.com>\r\n"
+        f"Content-Type: text/plain; charset=utf-8\r\n"
+        f"\r\n"
+        f"{body}"
+    ).encode()
+
+
+class FakeServer:
+    """Base class handling the listening socket and reply latency."""
+
+    def __init__(self, latency: float = 0.0):
+        """
+        Initialize the server.
+
+        Args:
+            latency: Seconds added before every reply
+        """
+        self.latency = latency
+        self.port = 0
+        self.connections = 0
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    async def start(self) -> int:
+        """Listen on an ephemeral localhost port and return it."""
+        self._server = await asyncio.start_server(
+            self._handle, "127.0.0.1", 0, limit=16 * 1024 * 1024
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        """Stop listening and close the socket."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    async def reply(self, writer: asyncio.StreamWriter, data: bytes) -> None:
+        """Send a reply after the configured latency."""
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(data)
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            await self.handle(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        raise NotImplementedError
+
+
+class FakeSMTPServer(FakeServer):
+    """SMTP server that accepts and counts every message."""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(latency)
+        self.messages = 0
+        self.recipients = 0
+        self.bytes_received = 0
+
+    async def handle(self, reader, writer):
+        await self.reply(writer, b"220 fake ESMTP ready\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            verb = line[:4].upper()
+            if verb in (b"EHLO", b"HELO"):
+                await self.reply(writer, b"250-fake\r\n250-8BITMIME\r\n250-AUTH PLAIN LOGIN\r\n250 SIZE 104857600\r\n")
+            elif verb == b"AUTH":
+                await self.reply(writer, b"235 2.7.0 Authentication successful\r\n")
+            elif verb == b"RCPT":
+                self.recipients += 1
+                await self.reply(writer, b"250 OK\r\n")
+            elif verb == b"DATA":
+                await self.reply(writer, b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                data = await reader.readuntil(b"\r\n.\r\n")
+                self.messages += 1
+                self.bytes_received += len(data)
+                await self.reply(writer, b"250 2.0.0 queued\r\n")
+            elif verb == b"QUIT":
+                await self.reply(writer, b"221 bye\r\n")
+                break
+            else:
+                await self.reply(writer, b"250 OK\r\n")
+
+
+class FakePOP3Server(FakeServer):
+    """POP3 maildrop serving a fixed set of messages, with PIPELINING."""
+
+    def __init__(self, messages: Dict[int, bytes], latency: float = 0.0):
+        super().__init__(latency)
+        self.messages = messages
+
+    @staticmethod
+    def multiline(data: bytes) -> bytes:
+        """Dot-stuff and terminate a multi-line response."""
+        stuffed = re.sub(rb"(?m)^\.", b"..", data)
+        if not stuffed.endswith(b"\r\n"):
+            stuffed += b"\r\n"
+        return stuffed + b".\r\n"
+
+    async def handle(self, reader, writer):
+        await self.reply(writer, b"+OK fake POP3 ready\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command, *args = line.decode().strip().split()
+            command = command.upper()
+            if command in ("USER", "PASS", "NOOP"):
+                await self.reply(writer, b"+OK\r\n")
+            elif command == "CAPA":
+                await self.reply(writer, b"+OK\r\nTOP\r\nUIDL\r\nPIPELINING\r\n.\r\n")
+            elif command == "LIST":
+                listing = b"".join(f"{n} {len(m)}\r\n".encode() for n, m in self.messages.items())
+                await self.reply(writer, b"+OK\r\n" + listing + b".\r\n")
+            elif command == "UIDL":
+                listing = b"".join(f"{n} uid-{n}\r\n".encode() for n in self.messages)
+                await self.reply(writer, b"+OK\r\n" + listing + b".\r\n")
+            elif command in ("RETR", "TOP"):
+                data = self.messages.get(int(args[0]))
+                if data is None:
+                    await self.reply(writer, b"-ERR no such message\r\n")
+                    continue
+                if command == "TOP":
+                    data = data.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+                await self.reply(writer, b"+OK\r\n" + self.multiline(data))
+            elif command == "QUIT":
+                await self.reply(writer, b"+OK bye\r\n")
+                break
+            else:
+                await self.reply(writer, b"-ERR unknown command\r\n")
+
+
+class FakeIMAPServer(FakeServer):
+    """
+    Single-mailbox IMAP4rev1 server.
+
+    Supports LOGIN, CAPABILITY, SELECT/EXAMINE, UID SEARCH (every key
+    matches all messages), UID FETCH of ``UID``, ``RFC822``,
+    ``RFC822.SIZE`` and ``BODY.PEEK[]``, NOOP and LOGOUT.
+    """
+
+    FETCH_ITEM_RE = re.compile(r"BODY\.PEEK\[\]|RFC822\.SIZE|RFC822|UID", re.IGNORECASE)
+
+    def __init__(self, messages: Dict[int, bytes], latency: float = 0.0, uidvalidity: int = 1):
+        super().__init__(latency)
+        self.messages = messages
+        self.uidvalidity = uidvalidity
+
+    def _uids(self, message_set: str) -> List[int]:
+        """Resolve a UID set such as ``1:3,7,9:*`` against the mailbox."""
+        existing = sorted(self.messages)
+        last = existing[-1] if existing else 0
+        uids = set()
+        for item in message_set.split(","):
+            start, _, end = item.partition(":")
+            low = last if start == "*" else int(start)
+            high = low if not end else (last if end == "*" else int(end))
+            low, high = min(low, high), max(low, high)
+            uids.update(uid for uid in existing if low <= uid <= high)
+        return sorted(uids)
+
+    def _fetch(self, uid: int, sequence: int, items: List[str]) -> bytes:
+        """Build the untagged FETCH response for one message."""
+        data = self.messages[uid]
+        parts = [f"UID {uid}".encode()]
+        for item in items:
+            if item == "RFC822.SIZE":
+                parts.append(f"RFC822.SIZE {len(data)}".encode())
+            elif item in ("RFC822", "BODY.PEEK[]"):
+                name = "RFC822" if item == "RFC822" else "BODY[]"
+                parts.append(f"{name} {{{len(data)}}}\r\n".encode() + data)
+        return f"* {sequence} FETCH (".encode() + b" ".join(parts) + b")\r\n"
+
+    async def handle(self, reader, writer):
+        await self.reply(writer, b"* OK [CAPABILITY IMAP4rev1 UIDPLUS] fake IMAP ready\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            tag, _, rest = line.decode().strip().partition(" ")
+            command, _, args = rest.partition(" ")
+            command = command.upper()
+            if command == "CAPABILITY":
+                await self.reply(writer, f"* CAPABILITY IMAP4rev1 UIDPLUS\r\n{tag} OK done\r\n".encode())
+            elif command == "LOGIN":
+                await self.reply(writer, f"{tag} OK [CAPABILITY IMAP4rev1 UIDPLUS] logged in\r\n".encode())
+            elif command in ("SELECT", "EXAMINE"):
+                uidnext = max(self.messages, default=0) + 1
+                await self.reply(writer, (
+                    f"* {len(self.messages)} EXISTS\r\n"
+                    f"* 0 RECENT\r\n"
+                    f"* OK [UIDVALIDITY {self.uidvalidity}] UIDs valid\r\n"
+                    f"* OK [UIDNEXT {uidnext}] predicted next UID\r\n"
+                    f"{tag} OK [READ-WRITE] {command} completed\r\n"
+                ).encode())
+            elif command == "UID":
+                await self._uid_command(tag, args, writer)
+            elif command == "LOGOUT":
+                await self.reply(writer, f"* BYE logging out\r\n{tag} OK done\r\n".encode())
+                break
+            elif command in ("NOOP", "CHECK", "CLOSE"):
+                await self.reply(writer, f"{tag} OK done\r\n".encode())
+            else:
+                await self.reply(writer, f"{tag} BAD unsupported command\r\n".encode())
+
+    async def _uid_command(self, tag: str, args: str, writer) -> None:
+        subcommand, _, args = args.partition(" ")
+        subcommand = subcommand.upper()
+        if subcommand == "SEARCH":
+            uids = " ".join(str(uid) for uid in sorted(self.messages))
+            await self.reply(writer, f"* SEARCH {uids}\r\n{tag} OK SEARCH completed\r\n".encode())
+        elif subcommand == "FETCH":
+            message_set, _, items = args.partition(" ")
+            requested = [item.upper() for item in self.FETCH_ITEM_RE.findall(items)]
+            sequence = {uid: index for index, uid in enumerate(sorted(self.messages), 1)}
+            response = b"".join(
+                self._fetch(uid, sequence[uid], requested) for uid in self._uids(message_set)
+            )
+            await self.reply(writer, response + f"{tag} OK FETCH completed\r\n".encode())
+        else:
+            await self.reply(writer, f"{tag} BAD unsupported UID command\r\n".encode())
@@ -85,12 +85,12 @@ async def receive_emails_imap_example():
         print(f"Error: {result['message']}")
 
 
-def receive_emails_pop3_example():
+async def receive_emails_pop3_example():
     """Example: Receive emails via POP3."""
     receiver = EmailReceiver()
     
     # Get last 10 emails
-    result = receiver.receive_emails_pop3(limit=10)
+    result = await receiver.receive_emails_pop3(limit=10)
     
     if result["status"] == "success":
         print(f"Retrieved {result['count']} emails:")
@@ -114,8 +114,10 @@ async def using_mcp_server_example():
     
     print("MCP Server created with the following tools:")
     print("- send_email")
+    print("- send_emails_bulk")
     print("- receive_emails_imap")
     print("- receive_emails_pop3")
+    print("- wait_for_new_emails")
     print("\nRun main.py to start the server")
 
 
@@ -129,7 +131,7 @@ async def main():
     # await send_email_with_attachments_example()
     # await send_html_email_example()
     # await receive_emails_imap_example()
-    # receive_emails_pop3_example()
+    # await receive_emails_pop3_example()
     await using_mcp_server_example()
 
 
@@ -2,12 +2,18 @@
 Configuration management for the Email MCP server.
 """
 
+import json
 import os
-from typing import Optional
+import re
+from typing import Any, Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
 
 
+# Kinds of CPU worker pool; "off" keeps all work on the event loop
+CPU_POOL_MODES = ("thread", "process", "off")
+
+
 class Settings(BaseSettings):
     """Application settings."""
     
@@ -23,12 +29,39 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str = Field(default="")
     SMTP_USE_TLS: bool = Field(default=True)
     
+    # SMTP Connection Pool
+    SMTP_POOL_MIN_SIZE: int = Field(default=0)
+    SMTP_POOL_MAX_SIZE: int = Field(default=5)
+    SMTP_POOL_IDLE_TIMEOUT: float = Field(default=60.0)
+    SMTP_POOL_MAX_MESSAGES_PER_CONNECTION: int = Field(default=100)
+    SMTP_POOL_HEALTH_CHECK_INTERVAL: float = Field(default=15.0)
+    
+    # Outbound rate limiting (unset limits use the provider's defaults)
+    SMTP_RATE_LIMIT_ENABLED: bool = Field(default=True)
+    SMTP_RATE_LIMIT_PER_MINUTE: Optional[float] = Field(default=None)
+    SMTP_RATE_LIMIT_BURST: Optional[int] = Field(default=None)
+    SMTP_RATE_LIMIT_PER_DAY: Optional[int] = Field(default=None)
+    SMTP_RATE_LIMIT_MAX_WAIT: float = Field(default=60.0)
+    
     # IMAP Configuration
     IMAP_SERVER: str = Field(default="imap.gmail.com")
     IMAP_PORT: int = Field(default=993)
     IMAP_USERNAME: str = Field(default="")
     IMAP_PASSWORD: str = Field(default="")
     IMAP_USE_SSL: bool = Field(default=True)
+    IMAP_FETCH_BATCH_SIZE: int = Field(default=50)
+    IMAP_PREVIEW_BYTES: int = Field(default=2048)
+    IMAP_SEARCH_CACHE_TTL: float = Field(default=300.0)
+    IMAP_ATTACHMENT_CHUNK_BYTES: int = Field(default=1048576)
+    IMAP_MAILBOX_CONNECTIONS: int = Field(default=3)
+    IMAP_IDLE_ENABLED: bool = Field(default=True)
+    IMAP_IDLE_TIMEOUT: float = Field(default=1740.0)
+    IMAP_RECONNECT_ATTEMPTS: int = Field(default=3)
+    IMAP_RECONNECT_BACKOFF: float = Field(default=1.0)
+    
+    # Local message cache for incremental IMAP sync
+    MESSAGE_CACHE_ENABLED: bool = Field(default=True)
+    MESSAGE_CACHE_DIR: str = Field(default="cache")
     
     # POP3 Configuration
     POP3_SERVER: str = Field(default="pop.gmail.com")
@@ -36,11 +69,44 @@ class Settings(BaseSettings):
     POP3_USERNAME: str = Field(default="")
     POP3_PASSWORD: str = Field(default="")
     POP3_USE_SSL: bool = Field(default=True)
+    POP3_TIMEOUT: float = Field(default=30.0)
+    POP3_PIPELINE_DEPTH: int = Field(default=20)
     
     # Email Settings
     DEFAULT_FROM_EMAIL: str = Field(default="")
     DEFAULT_FROM_NAME: str = Field(default="MCP Email Server")
     MAX_ATTACHMENT_SIZE_MB: int = Field(default=25)
+    ATTACHMENT_CACHE_MAX_MB: int = Field(default=64)
+    ATTACHMENT_DOWNLOAD_DIR: str = Field(default="downloads")
+    BULK_SEND_CONCURRENCY: int = Field(default=5)
+    SMTP_MAX_RECIPIENTS_PER_TRANSACTION: int = Field(default=50)
+    
+    # Durable outbound queue for queued sends
+    SEND_QUEUE_DIR: str = Field(default="queue")
+    SEND_QUEUE_WORKERS: int = Field(default=2)
+    SEND_QUEUE_MAX_ATTEMPTS: int = Field(default=5)
+    SEND_QUEUE_RETRY_BACKOFF: float = Field(default=30.0)
+    SEND_QUEUE_MAX_BACKOFF: float = Field(default=3600.0)
+    SEND_QUEUE_POLL_INTERVAL: float = Field(default=1.0)
+
+    # Per-phase timing traces in send/receive results (also per call via
+    # the tools' trace argument), optionally appended as OTLP/JSON lines
+    TRACING_ENABLED: bool = Field(default=False)
+    TRACE_EXPORT_FILE: str = Field(default="")
+
+    # Worker pool ("thread", "process" or "off") for building, rendering
+    # and parsing messages at least CPU_OFFLOAD_THRESHOLD_BYTES in size
+    CPU_POOL_MODE: str = Field(default="thread")
+    CPU_POOL_WORKERS: int = Field(default=2)
+    CPU_OFFLOAD_THRESHOLD_BYTES: int = Field(default=262144)
+
+    # Named account profiles: {"name": {"SMTP_USERNAME": ..., ...}} as JSON,
+    # inline and/or in a file. The settings above are the "default" account.
+    ACCOUNTS: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    ACCOUNTS_FILE: str = Field(default="")
+    # Counts accounts, not connections: each active account may hold up to
+    # SMTP_POOL_MAX_SIZE + IMAP_MAILBOX_CONNECTIONS open connections
+    ACCOUNT_MAX_ACTIVE: int = Field(default=20)
 
     # Server mode and authentication
     MODE: str = Field(default="Development")
@@ -61,6 +127,123 @@ class Settings(BaseSettings):
         if not (1 <= v <= 65535):
             raise ValueError(f"Port must be between 1 and 65535, got {v}")
         return v
+    
+    @field_validator(
+        "SMTP_POOL_MAX_SIZE",
+        "SMTP_POOL_MAX_MESSAGES_PER_CONNECTION",
+        "BULK_SEND_CONCURRENCY",
+        "SMTP_MAX_RECIPIENTS_PER_TRANSACTION",
+        "SEND_QUEUE_WORKERS",
+        "SEND_QUEUE_MAX_ATTEMPTS",
+        "IMAP_FETCH_BATCH_SIZE",
+        "IMAP_PREVIEW_BYTES",
+        "IMAP_ATTACHMENT_CHUNK_BYTES",
+        "IMAP_MAILBOX_CONNECTIONS",
+        "IMAP_RECONNECT_ATTEMPTS",
+        "POP3_PIPELINE_DEPTH",
+        "CPU_POOL_WORKERS",
+        "ACCOUNT_MAX_ACTIVE"
+    )
+    @classmethod
+    def validate_positive(cls, v: int) -> int:
+        """Validate limits that must allow at least one unit of work."""
+        if v < 1:
+            raise ValueError(f"Value must be at least 1, got {v}")
+        return v
+
+    
+    @field_validator("CPU_POOL_MODE")
+    @classmethod
+    def validate_cpu_pool_mode(cls, v: str) -> str:
+        """Validate the worker pool kind."""
+        mode = v.lower()
+        if mode not in CPU_POOL_MODES:
+            raise ValueError(f"CPU_POOL_MODE must be one of: {', '.join(CPU_POOL_MODES)}, got {v!r}")
+        return mode
+    
+    @field_validator(
+        "SMTP_RATE_LIMIT_PER_MINUTE",
+        "SMTP_RATE_LIMIT_BURST",
+        "SMTP_RATE_LIMIT_PER_DAY"
+    )
+    @classmethod
+    def validate_optional_positive(cls, v: Optional[float]) -> Optional[float]:
+        """Validate optional limits that, when set, must allow some work."""
+        if v is not None and v <= 0:
+            raise ValueError(f"Value must be greater than 0, got {v}")
+        return v
+
+
+# Name of the account configured by the top-level settings
+DEFAULT_ACCOUNT = "default"
+
+# Account names double as directory names for per-account queues and caches,
+# so "." and ".." (which would resolve to the base directory or its parent)
+# are refused
+ACCOUNT_NAME_RE = re.compile(r"^(?!\.+$)[A-Za-z0-9_.-]+$")
+
+# Settings an account profile may override
+ACCOUNT_SETTING_PREFIXES = ("SMTP_", "IMAP_", "POP3_", "DEFAULT_FROM_")
+
+
+def load_account_profiles(settings: Settings) -> Dict[str, Dict[str, Any]]:
+    """
+    Read the named account profiles from ACCOUNTS_FILE and ACCOUNTS.
+    
+    Profiles in ACCOUNTS take precedence over same-named ones in the file.
+    Setting names are case-insensitive.
+    
+    Args:
+        settings: Settings holding the profile sources
+        
+    Returns:
+        Mapping of account name to its setting overrides
+        
+    Raises:
+        ValueError: If a profile name or setting is invalid
+    """
+    profiles: Dict[str, Dict[str, Any]] = {}
+    if settings.ACCOUNTS_FILE:
+        with open(settings.ACCOUNTS_FILE, "r", encoding="utf-8") as f:
+            profiles.update(json.load(f))
+    profiles.update(settings.ACCOUNTS)
+    
+    normalized: Dict[str, Dict[str, Any]] = {}
+    for name, profile in profiles.items():
+        if name == DEFAULT_ACCOUNT or not ACCOUNT_NAME_RE.match(name):
+            raise ValueError(f"Invalid account name: {name!r}")
+        overrides = {key.upper(): value for key, value in profile.items()}
+        for key in overrides:
+            if key not in Settings.model_fields or not key.startswith(ACCOUNT_SETTING_PREFIXES):
+                raise ValueError(f"Account {name!r} cannot override {key}")
+        normalized[name] = overrides
+    return normalized
+
+
+def account_settings(settings: Settings, name: str, overrides: Dict[str, Any]) -> Settings:
+    """
+    Build the settings of a named account on top of the base settings.
+    
+    Each account gets its own queue and message cache directories under the
+    base ones, so accounts never pick up each other's queued mail.
+    
+    Args:
+        settings: Base settings
+        name: Account name
+        overrides: The account's setting overrides
+        
+    Returns:
+        Validated settings for the account
+    """
+    values = settings.model_dump()
+    values.update(
+        SEND_QUEUE_DIR=os.path.join(settings.SEND_QUEUE_DIR, name),
+        MESSAGE_CACHE_DIR=os.path.join(settings.MESSAGE_CACHE_DIR, name),
+        ACCOUNTS={},
+        ACCOUNTS_FILE=""
+    )
+    values.update(overrides)
+    return Settings(_env_file=None, **values)
 
 
 # Global settings instance
@@ -2,26 +2,116 @@
 FastMCP Server implementation for Email Send/Receive.
 """
 
-from typing import List, Optional
+import json
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
 from fastmcp import FastMCP
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from .services.email_sender import EmailSender
-from .services.email_receiver import EmailReceiver
+from .services.accounts import AccountManager
+from .services import metrics
 from .config import get_settings
 import logging
 
+
+# Values accepted by the ``output_format`` argument of tools that support it
+OUTPUT_FORMATS = ("text", "json")
+
+
+def select_fields(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    Keep only the requested keys of a result record.
+    
+    Args:
+        record: Result dictionary
+        fields: Keys to keep, in the order given (all keys if empty)
+        
+    Returns:
+        The projected record
+    """
+    if not fields:
+        return record
+    return {field: record[field] for field in fields if field in record}
+
+
+def format_email(idx: int, email_data: Dict[str, Any]) -> List[str]:
+    """
+    Render one email of an IMAP listing as text lines.
+    
+    Args:
+        idx: 1-based position of the email in the listing
+        email_data: Email record; its ``mailbox`` is shown when present
+        
+    Returns:
+        Lines describing the email, ending with a blank line
+    """
+    lines = [f"--- Email {idx} ---"]
+    if "mailbox" in email_data:
+        lines.append(f"Mailbox: {email_data['mailbox']}")
+    lines.append(f"ID: {email_data.get('id', 'N/A')}")
+    lines.append(f"From: {email_data.get('from', 'N/A')}")
+    lines.append(f"To: {email_data.get('to', 'N/A')}")
+    lines.append(f"Subject: {email_data.get('subject', 'N/A')}")
+    lines.append(f"Date: {email_data.get('date', 'N/A')}")
+    
+    if email_data.get('has_attachments'):
+        attachments = email_data.get('attachments', [])
+        logging.info(f"Email {idx} has {len(attachments)} attachment(s).")
+        lines.append(f"Attachments: {len(attachments)}")
+        for att in attachments:
+            line = f"  - {att.get('filename', 'N/A')} ({att.get('content_type', 'N/A')})"
+            if 'size' in att:
+                line += f", {att['size']} bytes"
+            lines.append(line)
+    
+    body = email_data.get('body', '')
+    body_preview = body[:200] + "..." if len(body) > 200 else body
+    lines.append(f"Body Preview: {body_preview}")
+    lines.append(f"Body Length: {email_data.get('body_length', 0)} characters")
+    lines.append("")
+    return lines
+
+
+def format_trace(result: Dict[str, Any]) -> str:
+    """
+    Render the trace attached to a result as indented text.
+    
+    Args:
+        result: Service result, possibly carrying ``details["trace"]``
+        
+    Returns:
+        Text to append to a tool's text output (empty without a trace)
+    """
+    trace = (result.get("details") or {}).get("trace")
+    if not trace:
+        return ""
+    lines = ["", f"⏱️ Trace {trace['trace_id']} ({trace['total_ms']:.1f} ms):"]
+    for span in trace["spans"]:
+        label = "  " * (span["depth"] + 1) + span["name"]
+        if "count" in span:
+            label += f" (x{span['count']})"
+        lines.append(f"{label}: {span['duration_ms']:.1f} ms")
+    return "\n".join(lines)
+
+
 def create_server() -> FastMCP:
     """Create and configure the FastMCP server."""
     
-    # Initialize server
-    mcp = FastMCP("Email Send/Receive MCP")
+    # Services are created per account on first use
+    accounts = AccountManager()
+    logging.info("Account manager initialized.")
+    
+    @asynccontextmanager
+    async def lifespan(server: FastMCP):
+        # Deliver mail queued before a restart without waiting for a tool call
+        await accounts.resume_queues()
+        try:
+            yield {}
+        finally:
+            await accounts.close()
     
-    # Initialize service classes
-    email_sender = EmailSender()
-    logging.info("EmailSender service initialized.")
-    email_receiver = EmailReceiver()
-    logging.info("EmailReceiver service initialized.")
+    # Initialize server
+    mcp = FastMCP("Email Send/Receive MCP", lifespan=lifespan)
     
     # === EMAIL SENDING TOOLS ===
     @mcp.tool()
@@ -32,7 +122,12 @@ def create_server() -> FastMCP:
         attachments: Optional[List[str]] = None,
         cc: Optional[List[str]] = None,
         bcc: Optional[List[str]] = None,
-        is_html: bool = False
+        is_html: bool = False,
+        queued: bool = False,
+        output_format: str = "text",
+        fields: Optional[List[str]] = None,
+        account: Optional[str] = None,
+        trace: bool = False
     ) -> str:
         """Send an email via SMTP.
         
@@ -44,94 +139,645 @@ def create_server() -> FastMCP:
             cc: Optional list of CC recipients
             bcc: Optional list of BCC recipients
             is_html: Whether the body is HTML (default: False for plain text)
+            queued: Return immediately with a message ID and deliver in the
+                background with retries (default: False). Check progress
+                with get_send_status
+            output_format: "text" for a readable summary or "json" for the
+                structured result (default: text)
+            fields: With output_format="json", only include these keys of
+                the result details (default: all)
+            account: Account profile to use (default: the default account)
+            trace: Include per-phase timings (DNS, connect, STARTTLS, AUTH,
+                MIME building, attachment encoding, DATA) in the result
+                (default: False; ignored with queued=True)
         
         Returns:
             JSON string with status and details of the sent email
         """
-        result = await email_sender.send_email(
-            recipient=recipient,
+        if output_format not in OUTPUT_FORMATS:
+            return f"❌ Error: output_format must be one of: {', '.join(OUTPUT_FORMATS)}"
+        
+        try:
+            email_sender = await accounts.sender(account)
+        except (ValueError, OSError) as e:
+            if output_format == "json":
+                return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+            return f"❌ Error: {str(e)}"
+        
+        if queued:
+            result = await email_sender.enqueue_email(
+                recipient=recipient,
+                subject=subject,
+                body=body,
+                attachments=attachments,
+                cc=cc,
+                bcc=bcc,
+                is_html=is_html
+            )
+        else:
+            result = await email_sender.send_email(
+                recipient=recipient,
+                subject=subject,
+                body=body,
+                attachments=attachments,
+                cc=cc,
+                bcc=bcc,
+                is_html=is_html,
+                trace=trace
+            )
+        
+        if result["status"] == "success":
+            if queued:
+                logging.info(f"Email to {recipient} queued as {result['message_id']}.")
+            else:
+                logging.info(f"Email sent successfully to {recipient} with subject '{subject}'.")
+        else:
+            logging.error(f"Failed to send email to {recipient}: {result['message']}")
+        
+        if output_format == "json":
+            if "details" in result:
+                result = {**result, "details": select_fields(result["details"], fields)}
+            return json.dumps(result, ensure_ascii=False)
+        
+        if result["status"] != "success":
+            return f"❌ Error: {result['message']}" + format_trace(result)
+        if queued:
+            return (
+                f"📨 Email queued for delivery.\n"
+                f"Message ID: {result['message_id']}\n"
+                f"Use get_send_status to check delivery."
+            )
+        details = result.get("details", {})
+        return (
+            f"✅ Email sent successfully!\n"
+            f"Recipient: {details.get('recipient', recipient)}\n"
+            f"Subject: {details.get('subject', subject)}\n"
+            f"CC: {', '.join(details.get('cc', [])) if details.get('cc') else 'None'}\n"
+            f"BCC: {', '.join(details.get('bcc', [])) if details.get('bcc') else 'None'}\n"
+            f"Attachments: {details.get('attachments', 0)}"
+        ) + format_trace(result)
+    
+    @mcp.tool()
+    async def send_emails_bulk(
+        messages: List[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        account: Optional[str] = None
+    ) -> str:
+        """Send many emails in one call over a fixed number of concurrent SMTP sessions.
+        
+        Args:
+            messages: List of message objects. Each accepts the fields
+                recipient (required), body (required), subject, attachments,
+                cc, bcc, is_html, from_email and from_name
+            concurrency: Number of concurrent SMTP sessions (default: server setting)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            JSON string with overall status, counts and per-message results
+        """
+        try:
+            email_sender = await accounts.sender(account)
+        except (ValueError, OSError) as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+        
+        result = await email_sender.send_many(messages, concurrency=concurrency)
+        
+        if result["status"] == "error":
+            logging.error(f"Bulk send failed: {result['message']}")
+        else:
+            logging.info(f"Bulk send finished: {result['message']}")
+        
+        return json.dumps(result, ensure_ascii=False)
+    
+    @mcp.tool()
+    async def send_email_fanout(
+        recipients: List[str],
+        body: str,
+        subject: str = " Message from MCP Email Server",
+        attachments: Optional[List[str]] = None,
+        is_html: bool = False,
+        concurrency: Optional[int] = None,
+        account: Optional[str] = None
+    ) -> str:
+        """Send the same email to many recipients using multi-recipient SMTP transactions.
+        
+        The message is rendered once and recipients are grouped by domain, with
+        up to the configured maximum RCPT TO per transaction. Recipients are
+        not listed in the To header.
+        
+        Args:
+            recipients: Recipient email addresses
+            body: Email body content
+            subject: Email subject/title
+            attachments: Optional list of file paths to attach
+            is_html: Whether the body is HTML (default: False for plain text)
+            concurrency: Number of concurrent SMTP transactions (default: server setting)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            JSON string with overall status, counts and the server's
+            accept/reject result for each recipient
+        """
+        try:
+            email_sender = await accounts.sender(account)
+        except (ValueError, OSError) as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+        
+        result = await email_sender.send_fanout(
+            recipients=recipients,
             subject=subject,
             body=body,
             attachments=attachments,
-            cc=cc,
-            bcc=bcc,
-            is_html=is_html
+            is_html=is_html,
+            concurrency=concurrency
         )
         
-        if result["status"] == "success":
-            details = result.get("details", {})
-            logging.info(f"Email sent successfully to {recipient} with subject '{subject}'.")
-            return (
-                f"✅ Email sent successfully!\n"
-                f"Recipient: {details.get('recipient', recipient)}\n"
-                f"Subject: {details.get('subject', subject)}\n"
-                f"CC: {', '.join(details.get('cc', [])) if details.get('cc') else 'None'}\n"
-                f"BCC: {', '.join(details.get('bcc', [])) if details.get('bcc') else 'None'}\n"
-                f"Attachments: {details.get('attachments', 0)}"
-            )
+        if result["status"] == "error":
+            logging.error(f"Fan-out send failed: {result['message']}")
         else:
-            logging.error(f"Failed to send email to {recipient}: {result['message']}")
-            return f"❌ Error: {result['message']}"
+            logging.info(f"Fan-out send finished: {result['message']}")
+        
+        return json.dumps(result, ensure_ascii=False)
+    
+    @mcp.tool()
+    async def register_email_template(
+        subject: str,
+        body: str,
+        is_html: bool = False,
+        template_id: Optional[str] = None
+    ) -> str:
+        """Register a reusable email template for mail merge.
+        
+        Placeholders are written as {{ name }} in the subject or body and
+        filled from each row passed to send_mail_merge. Templates are shared
+        by all accounts.
+        
+        Args:
+            subject: Subject template
+            body: Body template
+            is_html: Whether the body is HTML; substituted values are escaped (default: False)
+            template_id: ID to register under; replaces an existing template
+                with the same ID (default: generated)
+        
+        Returns:
+            JSON string with the template ID and its placeholder names
+        """
+        email_sender = await accounts.sender()
+        result = email_sender.register_template(
+            subject=subject,
+            body=body,
+            is_html=is_html,
+            template_id=template_id
+        )
+        logging.info(f"Registered email template {result['template_id']}.")
+        return json.dumps(result, ensure_ascii=False)
+    
+    @mcp.tool()
+    async def send_mail_merge(
+        template_id: str,
+        rows: List[Dict[str, Any]],
+        attachments: Optional[List[str]] = None,
+        concurrency: Optional[int] = None,
+        account: Optional[str] = None
+    ) -> str:
+        """Send a personalized email per row from a registered template.
+        
+        Args:
+            template_id: ID returned by register_email_template
+            rows: Per-recipient variables. Each row needs a recipient and may
+                include cc and bcc lists; every key is available as a placeholder
+            attachments: Optional list of file paths attached to every email
+            concurrency: Number of concurrent SMTP sessions (default: server setting)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            JSON string with overall status, counts and per-row results
+        """
+        try:
+            email_sender = await accounts.sender(account)
+        except (ValueError, OSError) as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+        
+        result = await email_sender.send_merge(
+            template_id=template_id,
+            rows=rows,
+            attachments=attachments,
+            concurrency=concurrency
+        )
+        
+        if result["status"] == "error":
+            logging.error(f"Mail merge failed: {result['message']}")
+        else:
+            logging.info(f"Mail merge finished: {result['message']}")
+        
+        return json.dumps(result, ensure_ascii=False)
+    
+    @mcp.tool()
+    async def get_send_status(message_id: str, account: Optional[str] = None) -> str:
+        """Get the delivery status of an email sent with queued=True.
+        
+        Args:
+            message_id: Message ID returned when the email was queued
+            account: Account the email was queued from (default: the default account)
+        
+        Returns:
+            JSON string with the delivery state (queued, sending, sent or
+            failed), attempt count and last error
+        """
+        try:
+            email_sender = await accounts.sender(account)
+        except (ValueError, OSError) as e:
+            return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+        
+        result = await email_sender.get_send_status(message_id)
+        
+        if result["status"] == "error":
+            logging.error(f"Send status lookup failed: {result['message']}")
+        
+        return json.dumps(result, ensure_ascii=False)
     
     # === EMAIL RECEIVING TOOLS ===
     @mcp.tool()
     async def receive_emails_imap(
         mailbox: str = "INBOX",
         limit: int = 10,
-        unread_only: bool = False
+        unread_only: bool = False,
+        summary_only: bool = False,
+        cursor: Optional[str] = None,
+        direction: str = "older",
+        from_address: Optional[str] = None,
+        subject: Optional[str] = None,
+        since: Optional[str] = None,
+        before: Optional[str] = None,
+        larger_than: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+        gmail_query: Optional[str] = None,
+        output_format: str = "text",
+        fields: Optional[List[str]] = None,
+        account: Optional[str] = None,
+        trace: bool = False
     ) -> str:
         """Receive emails using IMAP protocol.
         
+        Filters are combined (AND) into a single server-side IMAP SEARCH, so
+        only matching emails are downloaded.
+        
         Args:
             mailbox: Mailbox to read from (default: INBOX)
-            limit: Maximum number of emails to retrieve (default: 10)
+            limit: Maximum number of emails to retrieve, i.e. the page size (default: 10)
             unread_only: Only retrieve unread emails (default: False)
+            summary_only: List headers, attachment metadata and a short preview
+                without downloading full messages or attachments (default: False)
+            cursor: Cursor returned with the previous page; omit for the first page
+            direction: "older" pages back from the newest email, "newer" pages
+                forward from the oldest (default: older)
+            from_address: Only emails whose From contains this text
+            subject: Only emails whose Subject contains this text
+            since: Only emails dated on or after this day (YYYY-MM-DD)
+            before: Only emails dated before this day (YYYY-MM-DD)
+            larger_than: Only emails larger than this many bytes
+            headers: Only emails whose headers contain these values,
+                e.g. {"List-Id": "announce"}
+            gmail_query: Gmail search syntax such as "has:attachment
+                newer_than:7d" (Gmail servers only)
+            output_format: "text" for a readable listing or "json" for
+                structured email objects (default: text)
+            fields: With output_format="json", only include these email keys,
+                e.g. ["id", "from", "subject", "date"] (default: all)
+            account: Account profile to use (default: the default account)
+            trace: Include per-phase timings (connect, login, select, search,
+                cache, fetch, parse) in the result (default: False)
         
         Returns:
             JSON string with received emails
         """
+        if output_format not in OUTPUT_FORMATS:
+            return f"❌ Error: output_format must be one of: {', '.join(OUTPUT_FORMATS)}"
+        
+        try:
+            email_receiver = await accounts.receiver(account)
+        except (ValueError, OSError) as e:
+            if output_format == "json":
+                return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+            return f"❌ Error: {str(e)}"
+        
         result = await email_receiver.receive_emails_imap(
             mailbox=mailbox,
             limit=limit,
-            unread_only=unread_only
+            unread_only=unread_only,
+            summary_only=summary_only,
+            cursor=cursor,
+            direction=direction,
+            filters={
+                "from_address": from_address,
+                "subject": subject,
+                "since": since,
+                "before": before,
+                "larger_than": larger_than,
+                "headers": headers,
+                "gmail_query": gmail_query
+            },
+            trace=trace
+        )
+        
+        if result["status"] != "success":
+            logging.error(f"Failed to receive emails from mailbox '{mailbox}': {result['message']}")
+            if output_format == "json":
+                return json.dumps(result, ensure_ascii=False)
+            return f"❌ Error: {result['message']}" + format_trace(result)
+        
+        emails = result.get("emails", [])
+        logging.info(f"Received {len(emails)} emails from mailbox '{mailbox}'.")
+        
+        if output_format == "json":
+            return json.dumps({
+                **result,
+                "emails": [select_fields(email_data, fields) for email_data in emails]
+            }, ensure_ascii=False)
+        
+        if not emails:
+            logging.info(f"No emails found in mailbox '{mailbox}'.")
+            return "📭 No emails found." + format_trace(result)
+        
+        header = f"📬 Retrieved {len(emails)} email(s)"
+        if result.get("cached"):
+            header += f" ({result['cached']} from local cache)"
+        logging.info(header)
+        
+        lines = [header + ":", ""]
+        for idx, email_data in enumerate(emails, 1):
+            lines.extend(format_email(idx, email_data))
+        
+        if result.get("next_cursor"):
+            lines.append(f"More emails available ({result['total']} total). Next page cursor: {result['next_cursor']}")
+        
+        return "\n".join(lines) + "\n" + format_trace(result)
+    
+    @mcp.tool()
+    async def receive_emails_multi_mailbox(
+        mailboxes: List[str],
+        limit: int = 10,
+        unread_only: bool = False,
+        summary_only: bool = False,
+        from_address: Optional[str] = None,
+        subject: Optional[str] = None,
+        since: Optional[str] = None,
+        before: Optional[str] = None,
+        larger_than: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+        gmail_query: Optional[str] = None,
+        output_format: str = "text",
+        fields: Optional[List[str]] = None,
+        account: Optional[str] = None
+    ) -> str:
+        """Receive the newest emails of several IMAP mailboxes at once.
+        
+        Mailboxes are searched and fetched concurrently over a small pool of
+        IMAP connections; the results are merged newest first.
+        
+        Args:
+            mailboxes: Mailboxes to read, e.g. ["INBOX", "Sent", "Archive"]
+            limit: Maximum number of emails to return across all mailboxes (default: 10)
+            unread_only: Only retrieve unread emails (default: False)
+            summary_only: List headers, attachment metadata and a short preview
+                without downloading full messages or attachments (default: False)
+            from_address: Only emails whose From contains this text
+            subject: Only emails whose Subject contains this text
+            since: Only emails dated on or after this day (YYYY-MM-DD)
+            before: Only emails dated before this day (YYYY-MM-DD)
+            larger_than: Only emails larger than this many bytes
+            headers: Only emails whose headers contain these values,
+                e.g. {"List-Id": "announce"}
+            gmail_query: Gmail search syntax such as "has:attachment
+                newer_than:7d" (Gmail servers only)
+            output_format: "text" for a readable listing or "json" for
+                structured email objects (default: text)
+            fields: With output_format="json", only include these email keys,
+                e.g. ["id", "mailbox", "subject", "date"] (default: all)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            JSON string with received emails
+        """
+        if output_format not in OUTPUT_FORMATS:
+            return f"❌ Error: output_format must be one of: {', '.join(OUTPUT_FORMATS)}"
+        
+        try:
+            email_receiver = await accounts.receiver(account)
+        except (ValueError, OSError) as e:
+            if output_format == "json":
+                return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+            return f"❌ Error: {str(e)}"
+        
+        result = await email_receiver.receive_emails_multi(
+            mailboxes=mailboxes,
+            limit=limit,
+            unread_only=unread_only,
+            summary_only=summary_only,
+            filters={
+                "from_address": from_address,
+                "subject": subject,
+                "since": since,
+                "before": before,
+                "larger_than": larger_than,
+                "headers": headers,
+                "gmail_query": gmail_query
+            }
+        )
+        
+        if result["status"] == "error":
+            logging.error(f"Failed to receive emails from mailboxes {mailboxes}: {result['message']}")
+            if output_format == "json":
+                return json.dumps(result, ensure_ascii=False)
+            return f"❌ Error: {result['message']}"
+        
+        emails = result["emails"]
+        logging.info(f"Received {len(emails)} emails from {len(result['mailboxes'])} mailboxes.")
+        
+        if output_format == "json":
+            return json.dumps({
+                **result,
+                "emails": [select_fields(email_data, fields) for email_data in emails]
+            }, ensure_ascii=False)
+        
+        lines = []
+        if result["status"] == "partial":
+            lines.extend([f"⚠️ {result['message']}", ""])
+        for mailbox, outcome in result["mailboxes"].items():
+            if outcome["status"] == "success":
+                lines.append(f"{mailbox}: {outcome['total']} matching")
+            else:
+                lines.append(f"{mailbox}: ❌ {outcome['message']}")
+        lines.append("")
+        
+        if not emails:
+            return "📭 No emails found.\n\n" + "\n".join(lines)
+        
+        lines.extend([f"📬 Retrieved {len(emails)} email(s):", ""])
+        for idx, email_data in enumerate(emails, 1):
+            lines.extend(format_email(idx, email_data))
+        
+        return "\n".join(lines)
+    
+    @mcp.tool()
+    async def receive_emails_pop3(
+        limit: int = 10,
+        summary_only: bool = False,
+        account: Optional[str] = None
+    ) -> str:
+        """Receive emails using POP3 protocol.
+        
+        Args:
+            limit: Maximum number of emails to retrieve (default: 10)
+            summary_only: Retrieve headers only, without message bodies (default: False)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            Formatted list of received emails
+        """
+        try:
+            email_receiver = await accounts.receiver(account)
+        except (ValueError, OSError) as e:
+            return f"❌ Error: {str(e)}"
+        
+        result = await email_receiver.receive_emails_pop3(
+            limit=limit,
+            summary_only=summary_only
         )
         
         if result["status"] == "success":
-            logging.info(f"Received {len(result.get('emails', []))} emails from mailbox '{mailbox}'.")
             emails = result.get("emails", [])
+            logging.info(f"Received {len(emails)} emails via POP3.")
             if not emails:
-                logging.info(f"No emails found in mailbox '{mailbox}'.")
-                return "📭 No emails found."
+                return "📭 No emails found." + format_trace(result)
             
-            output = f"📬 Retrieved {len(emails)} email(s):\n\n"
-            logging.info(output)
+            lines = [f"📬 Retrieved {len(emails)} email(s) via POP3:", ""]
             for idx, email_data in enumerate(emails, 1):
-                output += f"--- Email {idx} ---\n"
-                output += f"ID: {email_data.get('id', 'N/A')}\n"
-                output += f"From: {email_data.get('from', 'N/A')}\n"
-                output += f"To: {email_data.get('to', 'N/A')}\n"
-                output += f"Subject: {email_data.get('subject', 'N/A')}\n"
-                output += f"Date: {email_data.get('date', 'N/A')}\n"
-                
+                lines.append(f"--- Email {idx} ---")
+                lines.append(f"ID: {email_data.get('id', 'N/A')}")
+                lines.append(f"From: {email_data.get('from', 'N/A')}")
+                lines.append(f"To: {email_data.get('to', 'N/A')}")
+                lines.append(f"Subject: {email_data.get('subject', 'N/A')}")
+                lines.append(f"Date: {email_data.get('date', 'N/A')}")
                 if email_data.get('has_attachments'):
-                    logging.info(f"Email {idx} has {len(email_data.get('attachments', []))} attachment(s).")
-                    output += f"Attachments: {len(email_data.get('attachments', []))}\n"
-                    for att in email_data.get('attachments', []):
-                        output += f"  - {att.get('filename', 'N/A')} ({att.get('content_type', 'N/A')})\n"
-                
-                body = email_data.get('body', '')
-                body_preview = body[:200] + "..." if len(body) > 200 else body
-                logging.info(f"Email {idx} body preview: {body_preview}")
-                output += f"Body Preview: {body_preview}\n"
-                output += f"Body Length: {email_data.get('body_length', 0)} characters\n\n"
+                    lines.append(f"Attachments: {len(email_data.get('attachments', []))}")
+                if not summary_only:
+                    body = email_data.get('body', '')
+                    body_preview = body[:200] + "..." if len(body) > 200 else body
+                    lines.append(f"Body Preview: {body_preview}")
+                lines.append(f"Size: {email_data.get('size', 0)} bytes")
+                lines.append("")
             
-            return output
+            return "\n".join(lines)
         else:
-            logging.error(f"Failed to receive emails from mailbox '{mailbox}': {result['message']}")
+            logging.error(f"Failed to receive emails via POP3: {result['message']}")
             return f"❌ Error: {result['message']}"
     
+    @mcp.tool()
+    async def wait_for_new_emails(
+        mailbox: str = "INBOX",
+        timeout: float = 60.0,
+        account: Optional[str] = None
+    ) -> str:
+        """Wait for new emails to arrive using IMAP IDLE push notifications.
+        
+        Args:
+            mailbox: Mailbox to watch (default: INBOX)
+            timeout: Maximum seconds to wait (default: 60)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            Whether new mail arrived before the timeout
+        """
+        try:
+            email_receiver = await accounts.receiver(account)
+        except (ValueError, OSError) as e:
+            return f"❌ Error: {str(e)}"
+        
+        result = await email_receiver.wait_for_new_emails(mailbox=mailbox, timeout=timeout)
+        
+        if result["status"] == "success":
+            if result["new_mail"]:
+                logging.info(f"New mail arrived in mailbox '{mailbox}'.")
+                return f"📬 New email(s) arrived in {mailbox} ({result['exists']} messages total)."
+            return f"📭 No new emails in {mailbox} within {timeout:g} seconds."
+        else:
+            logging.error(f"Failed to wait for emails in mailbox '{mailbox}': {result['message']}")
+            return f"❌ Error: {result['message']}"
+    
+    @mcp.tool()
+    async def download_attachment(
+        uid: int,
+        section: Optional[str] = None,
+        filename: Optional[str] = None,
+        mailbox: str = "INBOX",
+        account: Optional[str] = None
+    ) -> str:
+        """Download one email attachment to the server's download directory.
+        
+        Only the attachment itself is transferred, in bounded chunks, so
+        large attachments are saved without loading them into memory.
+        
+        Args:
+            uid: Email ID as returned by receive_emails_imap
+            section: Attachment section as listed by receive_emails_imap
+                with summary_only=True (e.g. "2" or "1.2")
+            filename: Attachment filename, used when section is not given
+            mailbox: Mailbox containing the email (default: INBOX)
+            account: Account profile to use (default: the default account)
+        
+        Returns:
+            Path and size of the saved file
+        """
+        try:
+            email_receiver = await accounts.receiver(account)
+        except (ValueError, OSError) as e:
+            return f"❌ Error: {str(e)}"
+        
+        result = await email_receiver.download_attachment(
+            uid=uid,
+            section=section,
+            filename=filename,
+            mailbox=mailbox
+        )
+        
+        if result["status"] == "success":
+            details = result["details"]
+            logging.info(f"Downloaded attachment {details['section']} of email {uid} to {details['path']}.")
+            return (
+                f"📎 Attachment saved.\n"
+                f"Path: {details['path']}\n"
+                f"Type: {details['content_type']}\n"
+                f"Size: {details['size']} bytes"
+            )
+        else:
+            logging.error(f"Failed to download attachment from email {uid}: {result['message']}")
+            return f"❌ Error: {result['message']}"
+    
+    # === ACCOUNTS ===
+    @mcp.tool()
+    async def list_email_accounts() -> str:
+        """List the email accounts this server can use.
+        
+        Pass an account's name as the account argument of other tools to
+        send or read mail as that account.
+        
+        Returns:
+            JSON string with each account's name, sender address and servers
+        """
+        try:
+            result = {"status": "success", "accounts": accounts.describe()}
+        except (ValueError, OSError) as e:
+            result = {"status": "error", "message": str(e)}
+        return json.dumps(result, ensure_ascii=False)
+    
     @mcp.custom_route("/api/health", methods=["GET"])
     async def mcp_health(request):  # Starlette Request -> Response
         return JSONResponse(content={"status": "ok"})  # call FastAPI health handler
     
+    @mcp.custom_route("/api/metrics", methods=["GET"])
+    async def mcp_metrics(request):  # Prometheus scrape endpoint
+        accounts.collect_metrics()
+        return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+    
     return mcp
@@ -0,0 +1,221 @@
+"""
+Named email accounts served by one server process.
+"""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from ..config import (
+    DEFAULT_ACCOUNT,
+    Settings,
+    account_settings,
+    get_settings,
+    load_account_profiles,
+)
+from .email_receiver import EmailReceiver
+from .cpu_pool import shutdown_cpu_pools
+from .email_sender import EmailSender
+from .mime_stream import EncodedAttachmentCache
+from .metrics import (
+    IMAP_SESSION_CONNECTIONS,
+    IMAP_SESSION_MAX_SIZE,
+    SEND_QUEUE_DEPTH,
+    SMTP_POOL_CONNECTIONS,
+    SMTP_POOL_MAX_SIZE
+)
+from .templates import TemplateRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownAccountError(ValueError):
+    """Raised when a tool call names an account that is not configured."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Unknown account '{name}'")
+        self.name = name
+
+
+class AccountManager:
+    """
+    Lazily creates an ``EmailSender`` and ``EmailReceiver`` per account.
+
+    Each account's SMTP pool and IMAP session are opened on first use. At
+    most ``ACCOUNT_MAX_ACTIVE`` accounts keep connections open; when another
+    account becomes active, the least recently used one has its connections
+    closed (they reopen transparently on its next call) and its idle queue
+    workers stopped. Queue workers activate their account before each
+    delivery, so background sends stay within the limit. The limit counts
+    accounts, not connections: an active account can hold up to
+    ``SMTP_POOL_MAX_SIZE`` SMTP plus ``IMAP_MAILBOX_CONNECTIONS`` IMAP
+    connections. Templates and the cache of encoded attachments are shared
+    by all accounts, so ``ATTACHMENT_CACHE_MAX_MB`` bounds the cache once
+    rather than once per account.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None):
+        """
+        Initialize the manager. Profiles are read on first use.
+
+        Args:
+            settings: Base settings, which configure the "default" account
+                (default: the global settings)
+        """
+        self.settings = settings or get_settings()
+        self.templates = TemplateRegistry()
+        self.attachment_cache: Optional[EncodedAttachmentCache] = None
+        if self.settings.ATTACHMENT_CACHE_MAX_MB > 0:
+            self.attachment_cache = EncodedAttachmentCache(
+                self.settings.ATTACHMENT_CACHE_MAX_MB * 1024 * 1024
+            )
+        self._profiles: Optional[Dict[str, Dict[str, Any]]] = None
+        self._account_settings: Dict[str, Settings] = {}
+        self._senders: Dict[str, EmailSender] = {}
+        self._receivers: Dict[str, EmailReceiver] = {}
+        self._active: "OrderedDict[str, None]" = OrderedDict()
+
+    def _get_profiles(self) -> Dict[str, Dict[str, Any]]:
+        """Load the account profiles on first use."""
+        if self._profiles is None:
+            self._profiles = load_account_profiles(self.settings)
+        return self._profiles
+
+    def names(self) -> List[str]:
+        """Names of all configured accounts, the default account first."""
+        return [DEFAULT_ACCOUNT] + sorted(self._get_profiles())
+
+    def get_settings(self, name: Optional[str] = None) -> Settings:
+        """
+        Get an account's settings.
+
+        Args:
+            name: Account name (default: the default account)
+
+        Returns:
+            The account's settings
+
+        Raises:
+            UnknownAccountError: If no such account is configured
+        """
+        name = name or DEFAULT_ACCOUNT
+        if name == DEFAULT_ACCOUNT:
+            return self.settings
+        if name not in self._account_settings:
+            profiles = self._get_profiles()
+            if name not in profiles:
+                raise UnknownAccountError(name)
+            self._account_settings[name] = account_settings(self.settings, name, profiles[name])
+        return self._account_settings[name]
+
+    async def sender(self, name: Optional[str] = None) -> EmailSender:
+        """
+        Get the sending service of an account.
+
+        Raises:
+            UnknownAccountError: If no such account is configured
+        """
+        name = name or DEFAULT_ACCOUNT
+        sender = self._get_sender(name)
+        await self._activate(name)
+        return sender
+
+    def _get_sender(self, name: str) -> EmailSender:
+        """Get an account's sending service without marking it active."""
+        if name not in self._senders:
+            sender = EmailSender(self.get_settings(name))
+            sender.templates = self.templates
+            sender.attachment_cache = self.attachment_cache
+            sender.activate = lambda: self._activate(name)
+            self._senders[name] = sender
+        return self._senders[name]
+
+    async def receiver(self, name: Optional[str] = None) -> EmailReceiver:
+        """
+        Get the receiving service of an account.
+
+        Raises:
+            UnknownAccountError: If no such account is configured
+        """
+        name = name or DEFAULT_ACCOUNT
+        if name not in self._receivers:
+            self._receivers[name] = EmailReceiver(self.get_settings(name))
+        await self._activate(name)
+        return self._receivers[name]
+
+    async def _activate(self, name: str) -> None:
+        """Mark an account as recently used, closing the connections of the
+        least recently used accounts beyond ``ACCOUNT_MAX_ACTIVE``."""
+        self._active[name] = None
+        self._active.move_to_end(name)
+        while len(self._active) > self.settings.ACCOUNT_MAX_ACTIVE:
+            evicted, _ = self._active.popitem(last=False)
+            logger.debug(f"Closing connections of inactive account '{evicted}'")
+            if evicted in self._senders:
+                sender = self._senders[evicted]
+                await sender.close_connections()
+                # Workers with a backlog keep going, re-activating the account
+                # per message; idle ones would only poll
+                if sender.stats()["queue_depth"] == 0:
+                    await sender.stop_queue_workers()
+            if evicted in self._receivers:
+                await self._receivers[evicted].close_connections()
+
+    async def resume_queues(self) -> None:
+        """Start delivering every account's outbound backlog left over from a
+        previous run. Accounts without pending messages are left untouched."""
+        for name in self.names():
+            created = name not in self._senders
+            pending = self._get_sender(name).resume_queue()
+            if pending:
+                logger.info(f"Resuming {pending} queued message(s) for account '{name}'")
+                await self._activate(name)
+            elif created:
+                del self._senders[name]
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """
+        Summarize the configured accounts without credentials.
+
+        Returns:
+            One entry per account with its addresses and servers
+        """
+        accounts = []
+        for name in self.names():
+            settings = self.get_settings(name)
+            accounts.append({
+                "name": name,
+                "from_email": settings.DEFAULT_FROM_EMAIL or settings.SMTP_USERNAME,
+                "smtp_server": settings.SMTP_SERVER,
+                "imap_server": settings.IMAP_SERVER,
+                "pop3_server": settings.POP3_SERVER,
+                "active": name in self._active
+            })
+        return accounts
+
+    def collect_metrics(self) -> None:
+        """Update the SMTP pool and outbound queue gauges of every account
+        that has sent mail, and the IMAP session gauges of every account
+        that has read mail."""
+        for name, sender in self._senders.items():
+            stats = sender.stats()
+            SMTP_POOL_CONNECTIONS.set(stats["pool"]["in_use"], name, "in_use")
+            SMTP_POOL_CONNECTIONS.set(stats["pool"]["idle"], name, "idle")
+            SMTP_POOL_MAX_SIZE.set(stats["pool"]["max_size"], name)
+            SEND_QUEUE_DEPTH.set(stats["queue_depth"], name)
+        for name, receiver in self._receivers.items():
+            sessions = receiver.stats()["sessions"]
+            IMAP_SESSION_CONNECTIONS.set(sessions["in_use"], name, "in_use")
+            IMAP_SESSION_CONNECTIONS.set(sessions["idle"], name, "idle")
+            IMAP_SESSION_MAX_SIZE.set(sessions["max_size"], name)
+
+    async def close(self) -> None:
+        """Close every account's services and the shared CPU worker pools."""
+        senders, self._senders = list(self._senders.values()), {}
+        receivers, self._receivers = list(self._receivers.values()), {}
+        self._active.clear()
+        for sender in senders:
+            await sender.close()
+        for receiver in receivers:
+            await receiver.close()
+        shutdown_cpu_pools()
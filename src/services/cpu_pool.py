@@ -0,0 +1,118 @@
+"""
+Worker pool for CPU-bound MIME building and parsing.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+from ..config import CPU_POOL_MODES, Settings
+from .metrics import CPU_OFFLOAD_TOTAL
+
+
+T = TypeVar("T")
+
+
+class CPUPool:
+    """
+    Runs CPU-heavy functions off the event loop once their input is large.
+
+    Building, rendering and parsing a multi-megabyte message takes tens to
+    hundreds of milliseconds of pure-Python work, during which no other
+    request on the loop makes progress. Inputs of at least
+    ``threshold_bytes`` are handed to a worker; smaller ones run inline,
+    where the hand-off would cost more than it saves.
+
+    Threads keep the loop responsive (the interpreter switches away from a
+    busy worker every few milliseconds) but share one core with it;
+    processes run in parallel at the cost of pickling arguments and
+    results, so functions must be importable and their arguments picklable.
+    """
+
+    def __init__(self, mode: str = "thread", workers: int = 2, threshold_bytes: int = 262144):
+        """
+        Initialize the pool. Workers are started on first use.
+
+        Args:
+            mode: "thread", "process" or "off"
+            workers: Maximum number of worker threads or processes
+            threshold_bytes: Smallest input size sent to a worker
+        """
+        if mode not in CPU_POOL_MODES:
+            raise ValueError(f"CPU pool mode must be one of: {', '.join(CPU_POOL_MODES)}")
+        self.mode = mode
+        self.workers = workers
+        self.threshold_bytes = threshold_bytes
+        self._executor: Optional[Executor] = None
+
+    def offloads(self, size: int) -> bool:
+        """Whether work on an input of ``size`` bytes goes to a worker."""
+        return self.mode != "off" and size >= self.threshold_bytes
+
+    def _get_executor(self) -> Executor:
+        """Get the executor, starting it on first use."""
+        if self._executor is None:
+            if self.mode == "process":
+                # Forking a process that runs an event loop and threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="email-cpu"
+                )
+        return self._executor
+
+    async def run(self, size: int, func: Callable[..., T], *args: Any) -> T:
+        """
+        Call ``func(*args)``, in a worker if ``size`` reaches the threshold.
+
+        Args:
+            size: Size in bytes of the input, e.g. the raw message length
+            func: Function to call
+            *args: Positional arguments for ``func``
+
+        Returns:
+            The function's result
+        """
+        if not self.offloads(size):
+            return func(*args)
+        CPU_OFFLOAD_TOTAL.inc(func.__name__, self.mode)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def shutdown(self) -> None:
+        """Stop the workers; queued work is cancelled."""
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# CPU-bound work competes for the same cores whichever account it is for,
+# so every service with the same pool settings shares one pool
+_pools: Dict[Tuple[str, int, int], CPUPool] = {}
+
+
+def get_cpu_pool(settings: Settings) -> CPUPool:
+    """
+    Get the shared pool for the CPU_POOL_* settings, creating it if needed.
+
+    Args:
+        settings: Settings holding the pool configuration
+
+    Returns:
+        The shared pool
+    """
+    key = (settings.CPU_POOL_MODE, settings.CPU_POOL_WORKERS, settings.CPU_OFFLOAD_THRESHOLD_BYTES)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = CPUPool(*key)
+    return pool
+
+
+def shutdown_cpu_pools() -> None:
+    """Stop the workers of every shared pool."""
+    for pool in _pools.values():
+        pool.shutdown()
+    _pools.clear()
@@ -6,273 +6,1132 @@ import aioimaplib
 import asyncio
 import email
 import email.message
-from email.header import decode_header
-from typing import List, Dict, Any, Optional
-import poplib
-from datetime import datetime
+import base64
+import bisect
+import logging
+import os
+import quopri
+import re
+import time
+from email.utils import formataddr, parsedate_to_datetime
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
 
-from ..config import get_settings
+from ..config import Settings, get_settings
+from .cpu_pool import CPUPool, get_cpu_pool
+from .imap_session import IMAPSession, IMAPSessionManager
+from . import tracing
+from .message_cache import MessageCache
+from .metrics import (
+    BYTES_TOTAL,
+    IMAP_PHASE_SECONDS,
+    MESSAGES_TOTAL,
+    POP3_PHASE_SECONDS,
+    record_error,
+)
+from .pop3_client import POP3Client
+from ..utils.imap_parser import (
+    build_search_criteria,
+    chunked,
+    iter_parts,
+    parse_bodystructure,
+    parse_envelope,
+    parse_fetch_response,
+    sequence_set,
+)
+from ..utils.message_parser import PREVIEW_CHARS, ParsedMessage, decode_header_value
+from ..utils.transfer_decoder import TransferDecoder
+
+
+logger = logging.getLogger(__name__)
+
+
+PAGE_DIRECTIONS = ("older", "newer")
+
+# Sort position of emails whose Date header cannot be parsed
+OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+
+# Characters replaced when turning an attachment name into a local filename
+UNSAFE_FILENAME_RE = re.compile(r'[\x00-\x1f<>:"/\\|?*]')
+
+
+def format_cursor(uidvalidity: Optional[int], uid: int) -> str:
+    """Encode a paging cursor; UIDVALIDITY is included so stale cursors are detected."""
+    return f"{uidvalidity or 0}:{uid}"
+
+
+def parse_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Decode a paging cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    uidvalidity, _, uid = cursor.partition(":")
+    return int(uidvalidity), int(uid)
+
+
+def record_fetched_bytes(lines: List[Any]) -> None:
+    """Count the bytes of a FETCH response towards the IMAP received total."""
+    BYTES_TOTAL.inc("imap", "received", amount=sum(
+        len(line) for line in lines if isinstance(line, (bytes, bytearray))
+    ))
+
+
+def email_sort_key(email_data: Dict[str, Any]) -> datetime:
+    """
+    Sort key ordering parsed emails by their Date header.
+    
+    Dates without a zone are taken as UTC; missing or unparseable dates
+    sort as the oldest.
+    """
+    try:
+        date = parsedate_to_datetime(email_data.get("date") or "")
+    except (TypeError, ValueError, IndexError):
+        return OLDEST
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return date
+
+
+def select_page(
+    uids: List[int],
+    limit: int,
+    position: Optional[int] = None,
+    direction: str = "older"
+) -> Tuple[List[int], bool]:
+    """
+    Pick one page of UIDs from a sorted SEARCH result.
+    
+    Args:
+        uids: Matching UIDs in ascending order
+        limit: Page size
+        position: UID the previous page ended at (None for the first page)
+        direction: "older" walks down from the newest UID, "newer" walks up
+            from the oldest
+            
+    Returns:
+        Tuple of (page UIDs in ascending order, whether more pages follow)
+    """
+    if direction == "older":
+        end = len(uids) if position is None else bisect.bisect_left(uids, position)
+        start = max(0, end - limit)
+        return uids[start:end], start > 0
+    start = 0 if position is None else bisect.bisect_right(uids, position)
+    end = min(len(uids), start + limit)
+    return uids[start:end], end < len(uids)
+
+
+def parse_email(email_message: email.message.Message, email_id: str) -> Dict[str, Any]:
+    """
+    Parse an email message.
+    
+    The part tree is walked once and only the body preview is decoded;
+    attachment payloads are left untouched.
+    
+    Args:
+        email_message: Email message object
+        email_id: Email ID
+        
+    Returns:
+        Dictionary with parsed email data
+    """
+    parsed = ParsedMessage(email_message, preview_chars=PREVIEW_CHARS)
+    
+    return {
+        "id": email_id,
+        "subject": parsed.subject,
+        "from": email_message.get("From", ""),
+        "to": email_message.get("To", ""),
+        "date": email_message.get("Date", ""),
+        "body": parsed.body,
+        "body_length": parsed.body_length,
+        "attachments": parsed.attachments,
+        "has_attachments": len(parsed.attachments) > 0
+    }
+
+
+def parse_raw_emails(raw_messages: List[Tuple[str, bytes]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Parse a batch of raw messages, skipping any that fail to parse.
+    
+    Module-level so a batch can be handed to a worker process in one call.
+    
+    Args:
+        raw_messages: (email ID, RFC 822 bytes) pairs
+        
+    Returns:
+        Mapping of email ID to parsed email data
+    """
+    parsed = {}
+    for email_id, raw in raw_messages:
+        try:
+            parsed[email_id] = parse_email(email.message_from_bytes(raw), email_id)
+        except Exception:
+            continue
+    return parsed
 
 
 class EmailReceiver:
     """Service for receiving emails via IMAP or POP3."""
     
-    def __init__(self):
-        """Initialize the email receiver with configuration."""
-        self.settings = get_settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        """
+        Initialize the email receiver with configuration.
+        
+        Args:
+            settings: Account settings (default: the global settings)
+        """
+        self.settings = settings or get_settings()
+        self._sessions: Optional[IMAPSessionManager] = None
+        self._cache: Optional[MessageCache] = None
+    
+    def _get_session(self, slot: int = 0) -> IMAPSession:
+        """
+        Get a persistent IMAP session for the configured account.
+        
+        The manager is built lazily so that settings overridden after the
+        service is constructed are honoured.
+        
+        Args:
+            slot: Which session to get; 0 is the primary session, higher
+                slots are the extra connections of ``receive_emails_multi``
+        """
+        if self._sessions is None:
+            self._sessions = IMAPSessionManager(
+                idle_enabled=self.settings.IMAP_IDLE_ENABLED,
+                idle_timeout=self.settings.IMAP_IDLE_TIMEOUT,
+                reconnect_attempts=self.settings.IMAP_RECONNECT_ATTEMPTS,
+                reconnect_backoff=self.settings.IMAP_RECONNECT_BACKOFF
+            )
+        return self._sessions.get_session(
+            host=self.settings.IMAP_SERVER,
+            port=self.settings.IMAP_PORT,
+            username=self.settings.IMAP_USERNAME,
+            password=self.settings.IMAP_PASSWORD,
+            use_ssl=self.settings.IMAP_USE_SSL,
+            slot=slot
+        )
+    
+    def _get_cache(self) -> Optional[MessageCache]:
+        """Get the on-disk message cache, or None if caching is disabled."""
+        if not self.settings.MESSAGE_CACHE_ENABLED:
+            return None
+        if self._cache is None:
+            self._cache = MessageCache(self.settings.MESSAGE_CACHE_DIR)
+        return self._cache
+    
+    def _get_cpu_pool(self) -> CPUPool:
+        """Get the worker pool that parses large fetched messages."""
+        return get_cpu_pool(self.settings)
+    
+    def _account_key(self) -> str:
+        """Identify the configured IMAP account in the message cache."""
+        return f"{self.settings.IMAP_USERNAME}@{self.settings.IMAP_SERVER}:{self.settings.IMAP_PORT}"
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report IMAP session occupancy.
+        
+        Nothing is opened to answer: an unused receiver reports no sessions.
+        
+        Returns:
+            Dictionary with ``sessions`` in use, idle and the per-account
+            maximum (IMAP_MAILBOX_CONNECTIONS)
+        """
+        sessions = self._sessions.stats() if self._sessions is not None else {"in_use": 0, "idle": 0}
+        sessions["max_size"] = self.settings.IMAP_MAILBOX_CONNECTIONS
+        return {"sessions": sessions}
+    
+    async def close_connections(self) -> None:
+        """Log out of persistent IMAP sessions; they reopen on next use."""
+        if self._sessions is not None:
+            sessions, self._sessions = self._sessions, None
+            await sessions.close()
+    
+    async def close(self) -> None:
+        """Log out of persistent IMAP sessions and close the message cache."""
+        await self.close_connections()
+        if self._cache is not None:
+            self._cache.close()
+            self._cache = None
     
     async def receive_emails_imap(
         self,
         mailbox: str = "INBOX",
         limit: int = 10,
-        unread_only: bool = False
+        unread_only: bool = False,
+        summary_only: bool = False,
+        cursor: Optional[str] = None,
+        direction: str = "older",
+        filters: Optional[Dict[str, Any]] = None,
+        trace: bool = False
     ) -> Dict[str, Any]:
         """
         Receive emails using IMAP.
         
+        Filters are compiled into one UID SEARCH so matching happens on the
+        server and only matching messages are fetched.
+        
+        Results are paged by UID. The first page runs a SEARCH and keeps its
+        result on the session; requests that pass the returned ``next_cursor``
+        reuse that result, so later pages cost only the FETCH.
+        
         Args:
             mailbox: Mailbox to read from (default: INBOX)
-            limit: Maximum number of emails to retrieve
+            limit: Maximum number of emails to retrieve (the page size)
             unread_only: Only retrieve unread emails
+            summary_only: List envelope, structure and a short body preview
+                without downloading full messages or attachment contents
+            cursor: ``next_cursor`` from a previous page (omit for the first page)
+            direction: "older" pages from the newest message back,
+                "newer" pages from the oldest message forward
+            filters: Search filters (from_address, subject, since, before,
+                larger_than, headers, gmail_query); see ``build_search_criteria``
+            trace: Time each phase (connect, login, select, search, cache,
+                fetch, parse) and return the spans in ``details["trace"]``;
+                always on when TRACING_ENABLED is set
             
         Returns:
-            Dictionary with status and email list
+            Dictionary with status, email list and paging information
         """
-        try:
-            # Connect to IMAP server
-            imap = aioimaplib.IMAP4_SSL(
-                host=self.settings.IMAP_SERVER,
-                port=self.settings.IMAP_PORT
-            )
-            
-            await imap.wait_hello_from_server()
-            
-            # Login
-            await imap.login(
-                self.settings.IMAP_USERNAME,
-                self.settings.IMAP_PASSWORD
-            )
-            
-            # Select mailbox
-            await imap.select(mailbox)
-            
-            # Search for emails
-            search_criteria = "UNSEEN" if unread_only else "ALL"
-            response = await imap.search(search_criteria)
-            
-            if response[0] != "OK":
+        operation = self._receive_emails_imap(
+            mailbox, limit, unread_only, summary_only, cursor, direction, filters
+        )
+        if not (trace or self.settings.TRACING_ENABLED):
+            return await operation
+        return await tracing.run_traced(
+            "receive_emails_imap", operation, self.settings.TRACE_EXPORT_FILE
+        )
+    
+    async def _receive_emails_imap(
+        self,
+        mailbox: str,
+        limit: int,
+        unread_only: bool,
+        summary_only: bool,
+        cursor: Optional[str],
+        direction: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Search the mailbox and fetch one page of messages."""
+        if direction not in PAGE_DIRECTIONS:
+            return {
+                "status": "error",
+                "message": f"Invalid direction '{direction}'. Use one of: {', '.join(PAGE_DIRECTIONS)}"
+            }
+        position = None
+        if cursor:
+            try:
+                cursor_validity, position = parse_cursor(cursor)
+            except ValueError:
                 return {
                     "status": "error",
-                    "message": "Failed to search emails"
+                    "message": f"Invalid cursor: {cursor}"
                 }
+        try:
+            search_criteria = build_search_criteria(filters, unread_only)
+        except (TypeError, ValueError) as e:
+            return {
+                "status": "error",
+                "message": f"Invalid search filters: {str(e)}"
+            }
+        
+        try:
+            # Reuse the authenticated session; SELECT is skipped if already selected
+            session = self._get_session()
+            async with session.checkout(mailbox) as imap:
+                if position is not None and cursor_validity != (session.uidvalidity or 0):
+                    return {
+                        "status": "error",
+                        "message": "Cursor has expired because the mailbox UIDVALIDITY changed; start from the first page"
+                    }
+                
+                if filters and filters.get("gmail_query") and not imap.has_capability("X-GM-EXT-1"):
+                    return {
+                        "status": "error",
+                        "message": "gmail_query requires a server that supports Gmail search (X-GM-RAW)"
+                    }
+                
+                uids = None
+                if position is not None:
+                    uids = session.cached_search(
+                        mailbox, search_criteria, self.settings.IMAP_SEARCH_CACHE_TTL
+                    )
+                fresh = uids is None
+                if fresh:
+                    with IMAP_PHASE_SECONDS.time("search"):
+                        response = await imap.uid_search(search_criteria)
+                    
+                    if response[0] != "OK":
+                        return {
+                            "status": "error",
+                            "message": "Failed to search emails"
+                        }
+                    
+                    uids = sorted(int(uid) for uid in response[1][0].split())
+                    session.remember_search(mailbox, search_criteria, uids)
+                
+                selected_uids, has_more = select_page(uids, limit, position, direction)
+                
+                emails, cached = await self._fetch_emails_cached(
+                    imap,
+                    mailbox,
+                    session.uidvalidity,
+                    selected_uids,
+                    summary_only,
+                    # Only a fresh, unfiltered search lists every UID in the mailbox
+                    all_uids=uids if fresh and search_criteria == "ALL" else None
+                )
+                uidvalidity = session.uidvalidity
             
-            email_ids = response[1][0].split()
-            
-            # Limit the number of emails
-            email_ids = email_ids[-limit:] if len(email_ids) > limit else email_ids
-            
-            emails = []
-            for email_id in email_ids:
-                # Convert bytes to string for aioimaplib
-                email_id_str = email_id.decode() if isinstance(email_id, bytes) else str(email_id)
-                email_data = await self._fetch_email_imap(imap, email_id_str)
-                if email_data:
-                    emails.append(email_data)
-            
-            # Logout
-            await imap.logout()
+            next_cursor = None
+            if has_more and selected_uids:
+                edge = selected_uids[0] if direction == "older" else selected_uids[-1]
+                next_cursor = format_cursor(uidvalidity, edge)
             
             return {
                 "status": "success",
                 "count": len(emails),
+                "total": len(uids),
+                "cached": cached,
+                "has_more": has_more,
+                "next_cursor": next_cursor,
                 "emails": emails
             }
             
         except Exception as e:
+            record_error("imap", e)
             return {
                 "status": "error",
                 "message": f"Failed to receive emails via IMAP: {str(e)}"
             }
     
-    async def _fetch_email_imap(
+    async def receive_emails_multi(
         self,
-        imap: aioimaplib.IMAP4_SSL,
-        email_id: str
-    ) -> Optional[Dict[str, Any]]:
+        mailboxes: List[str],
+        limit: int = 10,
+        unread_only: bool = False,
+        summary_only: bool = False,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
-        Fetch a single email via IMAP.
+        Receive the newest emails of several mailboxes at once.
+        
+        Mailboxes are read concurrently over up to IMAP_MAILBOX_CONNECTIONS
+        authenticated sessions, each with one mailbox selected at a time.
+        Each mailbox contributes at most ``limit`` of its newest matching
+        emails; the results are merged newest first and cut to ``limit``.
         
         Args:
-            imap: IMAP connection
-            email_id: Email ID to fetch
+            mailboxes: Mailboxes to read, e.g. ["INBOX", "Sent"]
+            limit: Maximum number of emails returned in total
+            unread_only: Only retrieve unread emails
+            summary_only: List envelope, structure and a short body preview
+                without downloading full messages or attachment contents
+            filters: Search filters applied in every mailbox; see
+                ``receive_emails_imap``
             
         Returns:
-            Dictionary with email data or None
+            Dictionary with overall status, the merged email list (each
+            email carries its ``mailbox``) and a per-mailbox result
         """
+        mailboxes = list(dict.fromkeys(mailbox for mailbox in mailboxes or [] if mailbox))
+        if not mailboxes:
+            return {
+                "status": "error",
+                "message": "At least one mailbox is required"
+            }
         try:
-            # Use RFC822 to fetch the complete message
-            response = await imap.fetch(email_id, "RFC822")
-            
-            if response[0] != "OK":
-                return None
+            search_criteria = build_search_criteria(filters, unread_only)
+        except (TypeError, ValueError) as e:
+            return {
+                "status": "error",
+                "message": f"Invalid search filters: {str(e)}"
+            }
+        gmail_query = bool(filters and filters.get("gmail_query"))
+        
+        results: Dict[str, Dict[str, Any]] = {}
+        queue: asyncio.Queue = asyncio.Queue()
+        for mailbox in mailboxes:
+            queue.put_nowait(mailbox)
+        
+        async def worker(slot: int) -> None:
+            session = self._get_session(slot)
+            while True:
+                try:
+                    mailbox = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[mailbox] = await self._list_mailbox(
+                    session, mailbox, search_criteria, limit, summary_only, gmail_query
+                )
+        
+        connections = min(len(mailboxes), self.settings.IMAP_MAILBOX_CONNECTIONS)
+        await asyncio.gather(*(worker(slot) for slot in range(connections)))
+        
+        emails = [
+            email_data
+            for mailbox in mailboxes if results[mailbox]["status"] == "success"
+            for email_data in results[mailbox].pop("emails")
+        ]
+        # Stable sort keeps each mailbox's UID order among equal dates
+        emails.sort(key=email_sort_key, reverse=True)
+        emails = emails[:limit]
+        
+        failed = [mailbox for mailbox in mailboxes if results[mailbox]["status"] == "error"]
+        if not failed:
+            status = "success"
+        elif len(failed) == len(mailboxes):
+            status = "error"
+        else:
+            status = "partial"
+        
+        result = {
+            "status": status,
+            "count": len(emails),
+            "emails": emails,
+            "mailboxes": {mailbox: results[mailbox] for mailbox in mailboxes}
+        }
+        if failed:
+            result["message"] = f"Failed to read {len(failed)} of {len(mailboxes)} mailboxes: {', '.join(failed)}"
+        return result
+    
+    async def _list_mailbox(
+        self,
+        session: IMAPSession,
+        mailbox: str,
+        search_criteria: str,
+        limit: int,
+        summary_only: bool,
+        gmail_query: bool
+    ) -> Dict[str, Any]:
+        """
+        Search one mailbox and fetch its newest ``limit`` matches.
+        
+        Returns:
+            Dictionary with status and, on success, the mailbox's ``total``
+            matches, ``cached`` count and ``emails`` tagged with the mailbox
+        """
+        try:
+            async with session.checkout(mailbox) as imap:
+                if gmail_query and not imap.has_capability("X-GM-EXT-1"):
+                    return {
+                        "status": "error",
+                        "message": "gmail_query requires a server that supports Gmail search (X-GM-RAW)"
+                    }
+                
+                with IMAP_PHASE_SECONDS.time("search"):
+                    response = await imap.uid_search(search_criteria)
+                if response[0] != "OK":
+                    return {
+                        "status": "error",
+                        "message": "Failed to search emails"
+                    }
+                
+                uids = sorted(int(uid) for uid in response[1][0].split())
+                session.remember_search(mailbox, search_criteria, uids)
+                emails, cached = await self._fetch_emails_cached(
+                    imap,
+                    mailbox,
+                    session.uidvalidity,
+                    uids[-limit:] if limit > 0 else [],
+                    summary_only,
+                    all_uids=uids if search_criteria == "ALL" else None
+                )
+        except Exception as e:
+            record_error("imap", e)
+            return {
+                "status": "error",
+                "message": f"Failed to receive emails via IMAP: {str(e)}"
+            }
+        
+        return {
+            "status": "success",
+            "total": len(uids),
+            "cached": cached,
+            "emails": [dict(email_data, mailbox=mailbox) for email_data in emails]
+        }
+    
+    async def _fetch_emails_cached(
+        self,
+        imap: aioimaplib.IMAP4,
+        mailbox: str,
+        uidvalidity: Optional[int],
+        uids: List[int],
+        summary_only: bool,
+        all_uids: Optional[List[int]] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Serve messages from the on-disk cache, fetching only unseen UIDs.
+        
+        Args:
+            imap: IMAP connection with ``mailbox`` selected
+            mailbox: Mailbox name
+            uidvalidity: UIDVALIDITY reported by SELECT (caching is skipped
+                when the server did not report one)
+            uids: UIDs to return, in order
+            summary_only: Whether to return summaries instead of full messages
+            all_uids: Every UID in the mailbox, used to prune expunged messages
             
-            # Extract email body from response
-            # Based on our testing, the message is in response[1][1]
-            if len(response[1]) >= 2:
-                email_body = response[1][1]
-            elif len(response[1]) >= 1:
-                email_body = response[1][0]
-            else:
-                return None
+        Returns:
+            Tuple of (parsed emails in the order of ``uids``, number served
+            from cache)
+        """
+        cache = self._get_cache()
+        if cache is None or uidvalidity is None:
+            return await self._fetch_emails_imap(imap, uids, summary_only), 0
+        
+        account = self._account_key()
+        kind = "summary" if summary_only else "full"
+        with tracing.span("cache.read"):
+            cache.sync_mailbox(account, mailbox, uidvalidity)
+            if all_uids is not None:
+                cache.prune(account, mailbox, all_uids)
+            messages = cache.get_messages(account, mailbox, uids, kind)
+        hits = len(messages)
+        missing = [uid for uid in uids if uid not in messages]
+        
+        if missing:
+            fetched = {
+                int(email_data["id"]): email_data
+                for email_data in await self._fetch_emails_imap(imap, missing, summary_only)
+            }
+            with tracing.span("cache.write"):
+                cache.put_messages(account, mailbox, fetched, kind)
+            messages.update(fetched)
+        
+        return [messages[uid] for uid in uids if uid in messages], hits
+    
+    async def wait_for_new_emails(
+        self,
+        mailbox: str = "INBOX",
+        timeout: float = 60.0
+    ) -> Dict[str, Any]:
+        """
+        Wait for new mail using the persistent session's IDLE notifications.
+        
+        Args:
+            mailbox: Mailbox to watch (default: INBOX)
+            timeout: Maximum seconds to wait
             
-            # Convert to bytes if needed
-            if isinstance(email_body, str):
-                email_body = email_body.encode()
+        Returns:
+            Dictionary with status, whether new mail arrived and the
+            mailbox's message count
+        """
+        if not self.settings.IMAP_IDLE_ENABLED:
+            # The session never enters IDLE, so waiting would always time out
+            return {
+                "status": "error",
+                "message": "IMAP IDLE is disabled (IMAP_IDLE_ENABLED=false)"
+            }
+        
+        try:
+            session = self._get_session()
+            async with session.checkout(mailbox) as imap:
+                if not imap.has_capability("IDLE"):
+                    return {
+                        "status": "error",
+                        "message": "IMAP server does not support IDLE"
+                    }
             
-            # Parse the email message
-            email_message = email.message_from_bytes(email_body)
+            # The session re-enters IDLE when checked back in
+            new_mail = await session.wait_for_new_mail(timeout)
             
-            return self._parse_email(email_message, email_id)
+            return {
+                "status": "success",
+                "new_mail": new_mail,
+                "mailbox": mailbox,
+                "exists": session.exists
+            }
             
         except Exception as e:
-            return None
+            record_error("imap", e)
+            return {
+                "status": "error",
+                "message": f"Failed to wait for new emails via IMAP: {str(e)}"
+            }
     
-    def receive_emails_pop3(
+    async def download_attachment(
         self,
-        limit: int = 10
+        uid: int,
+        section: Optional[str] = None,
+        filename: Optional[str] = None,
+        mailbox: str = "INBOX"
     ) -> Dict[str, Any]:
         """
-        Receive emails using POP3 (synchronous operation).
+        Download one attachment to ``ATTACHMENT_DOWNLOAD_DIR``.
+        
+        Only the attachment's MIME part is transferred, with
+        ``BODY.PEEK[section]<offset.length>`` requests of
+        ``IMAP_ATTACHMENT_CHUNK_BYTES`` each. Every chunk is decoded and
+        written before the next is requested, so memory use does not grow
+        with the attachment size and the message is not marked as read.
         
         Args:
-            limit: Maximum number of emails to retrieve
+            uid: UID of the message
+            section: MIME part number, as listed by a ``summary_only`` listing
+            filename: Attachment filename, used to find the part when
+                ``section`` is not given
+            mailbox: Mailbox containing the message (default: INBOX)
             
         Returns:
-            Dictionary with status and email list
+            Dictionary with status, the saved path and its size
         """
+        if not section and not filename:
+            return {
+                "status": "error",
+                "message": "Either section or filename is required"
+            }
+        
         try:
-            # Connect to POP3 server
-            if self.settings.POP3_USE_SSL:
-                pop = poplib.POP3_SSL(
-                    self.settings.POP3_SERVER,
-                    self.settings.POP3_PORT
-                )
-            else:
-                pop = poplib.POP3(
-                    self.settings.POP3_SERVER,
-                    self.settings.POP3_PORT
-                )
-            
-            # Login
-            pop.user(self.settings.POP3_USERNAME)
-            pop.pass_(self.settings.POP3_PASSWORD)
-            
-            # Get message count
-            num_messages = len(pop.list()[1])
-            
-            # Limit the number of emails
-            start_index = max(1, num_messages - limit + 1)
-            
-            emails = []
-            for i in range(start_index, num_messages + 1):
-                try:
-                    response, lines, octets = pop.retr(i)
-                    email_content = b"\r\n".join(lines)
-                    email_message = email.message_from_bytes(email_content)
-                    
-                    email_data = self._parse_email(email_message, str(i))
-                    if email_data:
-                        emails.append(email_data)
-                except Exception as e:
-                    continue
-            
-            # Quit
-            pop.quit()
+            session = self._get_session()
+            async with session.checkout(mailbox) as imap:
+                with IMAP_PHASE_SECONDS.time("fetch"):
+                    response = await imap.uid("fetch", str(uid), "(UID BODYSTRUCTURE)")
+                fetched = parse_fetch_response(response[1]) if response[0] == "OK" else []
+                if not fetched:
+                    return {
+                        "status": "error",
+                        "message": f"Message {uid} not found in {mailbox}"
+                    }
+                structure = parse_bodystructure(fetched[0][1].get("BODYSTRUCTURE"))
+                
+                part = None
+                for candidate in iter_parts(structure):
+                    if section and candidate["section"] == section:
+                        part = candidate
+                        break
+                    if not section and candidate["filename"] and (
+                        self._decode_header_value(candidate["filename"]) == filename
+                    ):
+                        part = candidate
+                        break
+                if part is None:
+                    return {
+                        "status": "error",
+                        "message": f"Attachment {section or filename} not found in message {uid}"
+                    }
+                
+                name = self._decode_header_value(part["filename"]) if part["filename"] else ""
+                path = self._download_path(name or f"{uid}-part{part['section']}")
+                size = await self._stream_part(imap, uid, part, path)
             
             return {
                 "status": "success",
-                "count": len(emails),
-                "emails": emails
+                "message": f"Saved {os.path.basename(path)} ({size} bytes)",
+                "details": {
+                    "path": os.path.abspath(path),
+                    "filename": name,
+                    "content_type": part["content_type"],
+                    "section": part["section"],
+                    "size": size
+                }
             }
             
         except Exception as e:
+            record_error("imap", e)
             return {
                 "status": "error",
-                "message": f"Failed to receive emails via POP3: {str(e)}"
+                "message": f"Failed to download attachment: {str(e)}"
             }
     
-    def _parse_email(
+    def _download_path(self, filename: str) -> str:
+        """Pick an unused path for ``filename`` inside the download directory."""
+        directory = self.settings.ATTACHMENT_DOWNLOAD_DIR
+        os.makedirs(directory, exist_ok=True)
+        name = UNSAFE_FILENAME_RE.sub("_", os.path.basename(filename)).strip(" .") or "attachment"
+        stem, extension = os.path.splitext(name)
+        path = os.path.join(directory, name)
+        counter = 1
+        while os.path.exists(path):
+            path = os.path.join(directory, f"{stem} ({counter}){extension}")
+            counter += 1
+        return path
+    
+    async def _stream_part(
         self,
-        email_message: email.message.Message,
+        imap: aioimaplib.IMAP4,
+        uid: int,
+        part: Dict[str, Any],
+        path: str
+    ) -> int:
+        """
+        Fetch a MIME part in partial chunks, decoding each into ``path``.
+        
+        Args:
+            imap: IMAP connection with the message's mailbox selected
+            uid: UID of the message
+            part: Parsed BODYSTRUCTURE entry of the part
+            path: Destination file
+            
+        Returns:
+            Number of decoded bytes written
+        """
+        chunk_size = self.settings.IMAP_ATTACHMENT_CHUNK_BYTES
+        decoder = TransferDecoder(part["encoding"])
+        temp_path = path + ".part"
+        written = 0
+        offset = 0
+        try:
+            with open(temp_path, "wb") as f:
+                while True:
+                    with IMAP_PHASE_SECONDS.time("fetch"):
+                        response = await imap.uid(
+                            "fetch", str(uid), f"(BODY.PEEK[{part['section']}]<{offset}.{chunk_size}>)"
+                        )
+                    if response[0] != "OK":
+                        raise RuntimeError(f"FETCH failed: {response[0]}")
+                    record_fetched_bytes(response[1])
+                    chunk = None
+                    for _, items in parse_fetch_response(response[1]):
+                        for key, value in items.items():
+                            if key.startswith("BODY[") and isinstance(value, bytes):
+                                chunk = value
+                    if chunk is None:
+                        # Writing nothing here would save a silently truncated file
+                        raise RuntimeError(
+                            f"FETCH response has no data for section {part['section']} at offset {offset}"
+                        )
+                    data = decoder.feed(chunk)
+                    f.write(data)
+                    written += len(data)
+                    offset += len(chunk)
+                    # A part that fills the last chunk exactly needs no empty follow-up fetch
+                    if len(chunk) < chunk_size or (part["size"] and offset >= part["size"]):
+                        break
+                data = decoder.flush()
+                f.write(data)
+                written += len(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return written
+    
+    async def _fetch_emails_imap(
+        self,
+        imap: aioimaplib.IMAP4_SSL,
+        email_ids: List[Any],
+        summary_only: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Fetch emails via IMAP in batched UID-set requests.
+        
+        Messages are requested ``IMAP_FETCH_BATCH_SIZE`` at a time (e.g.
+        ``UID FETCH 101:150 (UID RFC822)``), so retrieval costs one
+        round-trip per chunk instead of one per message.
+        
+        Args:
+            imap: IMAP connection
+            email_ids: Message UIDs to fetch
+            summary_only: Fetch ENVELOPE, BODYSTRUCTURE, RFC822.SIZE and a
+                partial body instead of the full RFC822 message
+            
+        Returns:
+            List of parsed email dictionaries in the order of ``email_ids``
+        """
+        ids = [
+            email_id.decode() if isinstance(email_id, bytes) else str(email_id)
+            for email_id in email_ids
+        ]
+        fetched: Dict[str, Dict[str, Any]] = {}
+        if summary_only:
+            message_parts = (
+                "(UID ENVELOPE BODYSTRUCTURE RFC822.SIZE "
+                f"BODY.PEEK[TEXT]<0.{self.settings.IMAP_PREVIEW_BYTES}>)"
+            )
+        else:
+            message_parts = "(UID RFC822)"
+        
+        for chunk in chunked(ids, self.settings.IMAP_FETCH_BATCH_SIZE):
+            try:
+                with IMAP_PHASE_SECONDS.time("fetch"):
+                    response = await imap.uid("fetch", sequence_set(chunk), message_parts)
+            except Exception as e:
+                record_error("imap", e)
+                continue
+            
+            if response[0] != "OK":
+                continue
+            record_fetched_bytes(response[1])
+            
+            started = time.perf_counter()
+            raw_messages = []
+            for _, items in parse_fetch_response(response[1]):
+                uid = items.get("UID")
+                if not isinstance(uid, str):
+                    continue
+                
+                if summary_only:
+                    try:
+                        fetched[uid] = self._parse_summary(items, uid)
+                    except Exception as e:
+                        record_error("imap", e)
+                        logger.warning(f"Could not parse summary of message {uid}: {str(e)}")
+                    continue
+                
+                email_body = items.get("RFC822")
+                if isinstance(email_body, bytes):
+                    raw_messages.append((uid, email_body))
+            if raw_messages:
+                # Large batches are parsed in the worker pool, off the event loop
+                fetched.update(await self._get_cpu_pool().run(
+                    sum(len(raw) for _, raw in raw_messages), parse_raw_emails, raw_messages
+                ))
+            tracing.add_time("parse", time.perf_counter() - started)
+        
+        MESSAGES_TOTAL.inc("imap", "received", amount=len(fetched))
+        return [fetched[email_id] for email_id in ids if email_id in fetched]
+    
+    def _parse_summary(
+        self,
+        items: Dict[str, Any],
         email_id: str
     ) -> Dict[str, Any]:
         """
-        Parse an email message.
+        Build an email summary from ENVELOPE/BODYSTRUCTURE FETCH data.
+        
+        Attachment metadata comes from BODYSTRUCTURE, so attachment bytes
+        are never transferred. The body preview is decoded from the partial
+        ``BODY[TEXT]`` using the transfer encoding and charset of the first
+        text/plain part, falling back to text/html like ``ParsedMessage``.
+        
+        ``body_length`` counts decoded characters when the partial fetch
+        holds the whole text; beyond that it is estimated from the part's
+        encoded size, as ``ParsedMessage`` estimates long bodies.
         
         Args:
-            email_message: Email message object
+            items: FETCH data items for one message
             email_id: Email ID
             
         Returns:
-            Dictionary with parsed email data
+            Dictionary with the same fields as ``parse_email`` plus
+            ``size`` and per-attachment ``size`` and ``section``
         """
-        # Decode subject
-        subject = ""
-        if email_message["Subject"]:
-            subject_parts = decode_header(email_message["Subject"])
-            subject = ""
-            for content, encoding in subject_parts:
-                if isinstance(content, bytes):
-                    subject += content.decode(encoding or "utf-8", errors="ignore")
-                else:
-                    subject += content
+        envelope = parse_envelope(items.get("ENVELOPE"))
+        structure = parse_bodystructure(items.get("BODYSTRUCTURE"))
         
-        # Get sender
-        from_header = email_message.get("From", "")
-        
-        # Get recipient
-        to_header = email_message.get("To", "")
+        attachments = []
+        text_part = None
+        html_part = None
+        for part in iter_parts(structure):
+            if part["disposition"] == "attachment":
+                if part["filename"]:
+                    attachments.append({
+                        "filename": self._decode_header_value(part["filename"]),
+                        "content_type": part["content_type"],
+                        "size": part["size"],
+                        "section": part["section"]
+                    })
+            elif text_part is None and part["content_type"] == "text/plain":
+                text_part = part
+            elif html_part is None and part["content_type"] == "text/html":
+                html_part = part
+        if text_part is None:
+            text_part = html_part
         
-        # Get date
-        date_header = email_message.get("Date", "")
+        partial = b""
+        for key, value in items.items():
+            if key.startswith("BODY[TEXT]") and isinstance(value, bytes):
+                partial = value
+                break
         
-        # Get body
-        body = ""
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                content_type = part.get_content_type()
-                if content_type == "text/plain":
-                    try:
-                        body = part.get_payload(decode=True).decode(errors="ignore")
-                        break
-                    except:
-                        pass
+        body = self._decode_preview(structure, text_part, partial) if text_part else ""
+        if text_part is None:
+            body_length = 0
+        elif len(partial) < self.settings.IMAP_PREVIEW_BYTES:
+            # The whole message text was fetched, so the body is complete
+            body_length = len(body)
         else:
-            try:
-                body = email_message.get_payload(decode=True).decode(errors="ignore")
-            except:
-                body = str(email_message.get_payload())
-        
-        # Get attachments info
-        attachments = []
-        if email_message.is_multipart():
-            for part in email_message.walk():
-                if part.get_content_disposition() == "attachment":
-                    filename = part.get_filename()
-                    if filename:
-                        attachments.append({
-                            "filename": filename,
-                            "content_type": part.get_content_type()
-                        })
+            body_length = self._estimate_decoded_size(text_part)
+        size = str(items.get("RFC822.SIZE") or "0")
         
         return {
             "id": email_id,
-            "subject": subject,
-            "from": from_header,
-            "to": to_header,
-            "date": date_header,
-            "body": body[:1000] if len(body) > 1000 else body,  # Limit body length
-            "body_length": len(body),
+            "subject": self._decode_header_value(envelope["subject"]),
+            "from": self._format_addresses(envelope["from"]),
+            "to": self._format_addresses(envelope["to"]),
+            "date": envelope["date"],
+            "body": body[:PREVIEW_CHARS],
+            "body_length": body_length,
+            "size": int(size) if size.isdigit() else 0,
             "attachments": attachments,
             "has_attachments": len(attachments) > 0
         }
+    
+    def _decode_preview(
+        self,
+        structure: Dict[str, Any],
+        text_part: Dict[str, Any],
+        partial: bytes
+    ) -> str:
+        """
+        Decode the text preview out of a partial ``BODY[TEXT]``.
+        
+        Args:
+            structure: Parsed BODYSTRUCTURE of the whole message
+            text_part: The text part to preview
+            partial: Leading bytes of the message text
+            
+        Returns:
+            Decoded preview text
+        """
+        payload = partial
+        if "parts" in structure:
+            # Re-attach the top-level boundary so the MIME parser can split parts
+            boundary = structure["params"].get("boundary", "")
+            wrapper = email.message_from_bytes(
+                f'Content-Type: {structure["content_type"]}; boundary="{boundary}"\r\n\r\n'.encode()
+                + partial
+            )
+            payload = b""
+            for part in wrapper.walk():
+                if part.get_content_type() == text_part["content_type"] and not part.is_multipart():
+                    raw = part.get_payload(decode=False)
+                    payload = raw.encode("ascii", errors="ignore") if isinstance(raw, str) else b""
+                    break
+        
+        encoding = text_part.get("encoding", "7bit")
+        if encoding == "base64":
+            compact = b"".join(payload.split())
+            payload = base64.b64decode(compact[:len(compact) // 4 * 4])
+        elif encoding == "quoted-printable":
+            payload = quopri.decodestring(payload)
+        
+        charset = text_part["params"].get("charset") or "utf-8"
+        try:
+            return payload.decode(charset, errors="ignore")
+        except LookupError:
+            return payload.decode("utf-8", errors="ignore")
+    
+    @staticmethod
+    def _estimate_decoded_size(part: Dict[str, Any]) -> int:
+        """Estimate a part's decoded size from its BODYSTRUCTURE octet count."""
+        if part.get("encoding") == "base64":
+            # 76 characters per CRLF-terminated line, 3 bytes per 4 characters
+            return part["size"] * 76 // 78 * 3 // 4
+        return part["size"]
+    
+    @staticmethod
+    def _decode_header_value(value: str) -> str:
+        """Decode RFC 2047 encoded words in a header value."""
+        return decode_header_value(value)
+    
+    def _format_addresses(self, addresses: List[Tuple[str, str]]) -> str:
+        """Render ENVELOPE addresses like a From/To header."""
+        return ", ".join(
+            formataddr((self._decode_header_value(name), address)) if name else address
+            for name, address in addresses
+        )
+    
+    async def receive_emails_pop3(
+        self,
+        limit: int = 10,
+        summary_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Receive emails using POP3 without blocking the event loop.
+        
+        Messages already seen (by UIDL) are served from the message cache,
+        so only new messages are retrieved from the server.
+        
+        Args:
+            limit: Maximum number of emails to retrieve
+            summary_only: Retrieve headers only (``TOP n 0``)
+            
+        Returns:
+            Dictionary with status and email list
+        """
+        client = POP3Client(
+            self.settings.POP3_SERVER,
+            self.settings.POP3_PORT,
+            use_ssl=self.settings.POP3_USE_SSL,
+            timeout=self.settings.POP3_TIMEOUT
+        )
+        try:
+            with POP3_PHASE_SECONDS.time("connect"):
+                await client.connect()
+            
+            # Login
+            with POP3_PHASE_SECONDS.time("login"):
+                await client.login(
+                    self.settings.POP3_USERNAME,
+                    self.settings.POP3_PASSWORD
+                )
+            
+            # Get message numbers and sizes
+            sizes = await client.list()
+            uidls = await client.uidl()
+            
+            # Limit the number of emails
+            numbers = sorted(sizes)
+            # numbers[-0:] would be the whole maildrop
+            numbers = numbers[-limit:] if limit > 0 else []
+            
+            kind = "summary" if summary_only else "full"
+            account = f"{self.settings.POP3_USERNAME}@{self.settings.POP3_SERVER}:{self.settings.POP3_PORT}"
+            cache = self._get_cache() if uidls is not None else None
+            
+            cached: Dict[str, Dict[str, Any]] = {}
+            if cache is not None:
+                cache.prune_pop3(account, uidls.values())
+                cached = cache.get_pop3_messages(
+                    account, [uidls[n] for n in numbers if n in uidls], kind
+                )
+            
+            missing = [n for n in numbers if uidls is None or uidls.get(n) not in cached]
+            with POP3_PHASE_SECONDS.time("retrieve"):
+                raw_messages = await client.fetch_many(
+                    missing,
+                    top_lines=0 if summary_only else None,
+                    window=self.settings.POP3_PIPELINE_DEPTH
+                )
+            MESSAGES_TOTAL.inc("pop3", "received", amount=len(raw_messages))
+            BYTES_TOTAL.inc("pop3", "received", amount=sum(len(raw) for raw in raw_messages.values()))
+            
+            # Quit
+            await client.quit()
+            
+            parsed = await self._get_cpu_pool().run(
+                sum(len(raw) for raw in raw_messages.values()),
+                parse_raw_emails,
+                [(str(number), raw) for number, raw in raw_messages.items()]
+            )
+            
+            fetched: Dict[str, Dict[str, Any]] = {}
+            emails = []
+            hits = 0
+            for number in numbers:
+                uidl = uidls.get(number) if uidls else None
+                if uidl in cached:
+                    email_data = dict(cached[uidl], id=str(number))
+                    hits += 1
+                elif str(number) in parsed:
+                    email_data = parsed[str(number)]
+                    email_data["uidl"] = uidl
+                    email_data["size"] = sizes.get(number, 0)
+                    if uidl is not None:
+                        fetched[uidl] = email_data
+                else:
+                    continue
+                emails.append(email_data)
+            
+            if cache is not None:
+                cache.put_pop3_messages(account, fetched, kind)
+            
+            return {
+                "status": "success",
+                "count": len(emails),
+                "cached": hits,
+                "emails": emails
+            }
+            
+        except Exception as e:
+            record_error("pop3", e)
+            await client.close()
+            return {
+                "status": "error",
+                "message": f"Failed to receive emails via POP3: {str(e)}"
+            }
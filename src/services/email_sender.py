@@ -2,25 +2,177 @@
 Email sending service using SMTP.
 """
 
-import aiosmtplib
+import asyncio
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from typing import List, Optional, Dict, Any
+from typing import Awaitable, Callable, List, Optional, Dict, Any, Tuple, Union
+import logging
 import os
 from pathlib import Path
 
-from ..config import get_settings
-from ..utils.validators import validate_email_address, format_email_address
+import aiosmtplib
+
+from ..config import Settings, get_settings
+from ..utils.validators import (
+    validate_email_address,
+    validate_email_batch,
+    format_email_address
+)
+from . import tracing
+from .cpu_pool import CPUPool, get_cpu_pool
+from .metrics import record_error
+from .mime_stream import EncodedAttachmentCache, FileAttachment, has_file_attachments, render_message
+from .outbound_queue import QUEUE_FILENAME, OutboundQueue
+from .rate_limiter import RateLimitExceeded, RateLimiterManager, SendRateLimiter
+from .smtp_pool import SMTPConnectionPool
+from .templates import MailTemplate, TemplateError, TemplateRegistry
+
+
+logger = logging.getLogger(__name__)
+
+
+# To header of fan-out messages, which must not disclose the recipient list
+UNDISCLOSED_RECIPIENTS = "undisclosed-recipients:;"
+
+# Keys accepted in a message spec passed to EmailSender.send_many
+BULK_SPEC_FIELDS = frozenset({
+    "recipient", "subject", "body", "attachments", "cc", "bcc",
+    "is_html", "from_email", "from_name"
+})
 
 
 class EmailSender:
     """Service for sending emails via SMTP."""
     
-    def __init__(self):
-        """Initialize the email sender with configuration."""
-        self.settings = get_settings()
+    def __init__(self, settings: Optional[Settings] = None):
+        """
+        Initialize the email sender with configuration.
+        
+        Args:
+            settings: Account settings (default: the global settings)
+        """
+        self.settings = settings or get_settings()
+        self._pool: Optional[SMTPConnectionPool] = None
+        self._queue: Optional[OutboundQueue] = None
+        self._rate_limits: Optional[RateLimiterManager] = None
+        self.templates = TemplateRegistry()
+        self.attachment_cache: Optional[EncodedAttachmentCache] = None
+        self._queue_workers: List[asyncio.Task] = []
+        self._queue_wakeup: Optional[asyncio.Event] = None
+        # Awaited by queue workers before each delivery; AccountManager uses
+        # it to count background sends as use of the account
+        self.activate: Optional[Callable[[], Awaitable[None]]] = None
+    
+    def _get_pool(self) -> SMTPConnectionPool:
+        """
+        Get the SMTP connection pool, creating it on first use.
+        
+        The pool is built lazily so that settings overridden after the
+        service is constructed (see ``main.set_values_from_env``) are honoured.
+        """
+        if self._pool is None:
+            # Port 465 requires SSL, port 587 requires STARTTLS
+            implicit_tls = self.settings.SMTP_PORT == 465
+            self._pool = SMTPConnectionPool(
+                hostname=self.settings.SMTP_SERVER,
+                port=self.settings.SMTP_PORT,
+                username=self.settings.SMTP_USERNAME,
+                password=self.settings.SMTP_PASSWORD,
+                use_tls=implicit_tls,
+                start_tls=not implicit_tls and self.settings.SMTP_USE_TLS,
+                min_size=self.settings.SMTP_POOL_MIN_SIZE,
+                max_size=self.settings.SMTP_POOL_MAX_SIZE,
+                idle_timeout=self.settings.SMTP_POOL_IDLE_TIMEOUT,
+                max_messages_per_connection=self.settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION,
+                health_check_interval=self.settings.SMTP_POOL_HEALTH_CHECK_INTERVAL
+            )
+        return self._pool
+    
+    def _get_rate_limiter(self) -> Optional[SendRateLimiter]:
+        """
+        Get the send rate limiter for the configured SMTP account.
+        
+        Returns:
+            The account's limiter, or None if rate limiting is disabled
+        """
+        if not self.settings.SMTP_RATE_LIMIT_ENABLED:
+            return None
+        if self._rate_limits is None:
+            self._rate_limits = RateLimiterManager(
+                per_minute=self.settings.SMTP_RATE_LIMIT_PER_MINUTE,
+                burst=self.settings.SMTP_RATE_LIMIT_BURST,
+                per_day=self.settings.SMTP_RATE_LIMIT_PER_DAY,
+                max_wait=self.settings.SMTP_RATE_LIMIT_MAX_WAIT
+            )
+        return self._rate_limits.get_limiter(
+            self.settings.SMTP_SERVER, self.settings.SMTP_USERNAME
+        )
+    
+    def _get_attachment_cache(self) -> Optional[EncodedAttachmentCache]:
+        """
+        Get the cache of encoded attachment bodies, creating it on first use.
+        
+        Returns:
+            The cache, or None if ATTACHMENT_CACHE_MAX_MB is 0
+        """
+        if self.settings.ATTACHMENT_CACHE_MAX_MB <= 0:
+            return None
+        if self.attachment_cache is None:
+            self.attachment_cache = EncodedAttachmentCache(
+                self.settings.ATTACHMENT_CACHE_MAX_MB * 1024 * 1024
+            )
+        return self.attachment_cache
+    
+    def _get_cpu_pool(self) -> CPUPool:
+        """Get the worker pool that builds and renders large messages."""
+        return get_cpu_pool(self.settings)
+    
+    def _get_queue(self) -> OutboundQueue:
+        """Get the durable outbound queue, opening it on first use."""
+        if self._queue is None:
+            self._queue = OutboundQueue(self.settings.SEND_QUEUE_DIR)
+        return self._queue
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report SMTP pool occupancy and outbound queue depth.
+        
+        Nothing is opened to answer: an unused pool reports no connections
+        and an unopened queue reports zero depth.
+        
+        Returns:
+            Dictionary with ``pool`` occupancy and ``queue_depth``
+        """
+        if self._pool is not None:
+            pool = self._pool.stats()
+        else:
+            pool = {"size": 0, "in_use": 0, "idle": 0, "max_size": self.settings.SMTP_POOL_MAX_SIZE}
+        return {
+            "pool": pool,
+            "queue_depth": self._queue.pending_count() if self._queue is not None else 0
+        }
+    
+    async def close_connections(self) -> None:
+        """Close pooled SMTP connections; a new pool is opened on next use."""
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await pool.close()
+    
+    async def stop_queue_workers(self) -> None:
+        """Stop the background queue workers; they restart on the next
+        queued send, status lookup or ``resume_queue``."""
+        workers, self._queue_workers = self._queue_workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def close(self) -> None:
+        """Stop queue workers and close pooled SMTP connections."""
+        await self.stop_queue_workers()
+        if self._queue is not None:
+            self._queue.close()
+            self._queue = None
+        await self.close_connections()
     
     async def send_email(
         self,
@@ -32,7 +184,8 @@ class EmailSender:
         bcc: Optional[List[str]] = None,
         is_html: bool = False,
         from_email: Optional[str] = None,
-        from_name: Optional[str] = None
+        from_name: Optional[str] = None,
+        trace: bool = False
     ) -> Dict[str, Any]:
         """
         Send an email via SMTP.
@@ -47,10 +200,675 @@ class EmailSender:
             is_html: Whether the body is HTML (default: False for plain text)
             from_email: Optional sender email (uses default if not provided)
             from_name: Optional sender name (uses default if not provided)
+            trace: Time each phase (DNS, connect, STARTTLS, AUTH, MIME
+                building, attachment encoding, DATA) and return the spans in
+                ``details["trace"]``; always on when TRACING_ENABLED is set
             
         Returns:
             Dictionary with status and message
         """
+        operation = self._send_email(
+            recipient, subject, body, attachments, cc, bcc, is_html, from_email, from_name
+        )
+        if not (trace or self.settings.TRACING_ENABLED):
+            return await operation
+        return await tracing.run_traced("send_email", operation, self.settings.TRACE_EXPORT_FILE)
+    
+    async def _send_email(
+        self,
+        recipient: str,
+        subject: str,
+        body: str,
+        attachments: Optional[List[str]],
+        cc: Optional[List[str]],
+        bcc: Optional[List[str]],
+        is_html: bool,
+        from_email: Optional[str],
+        from_name: Optional[str]
+    ) -> Dict[str, Any]:
+        """Validate the addresses, then build and send the message."""
+        with tracing.span("validate"):
+            addresses = self._validate_addresses(recipient, cc, bcc, from_email)
+        if addresses["status"] == "error":
+            return addresses
+        
+        return await self._compose_and_send(
+            recipient=addresses["recipient"],
+            subject=subject,
+            body=body,
+            attachments=attachments,
+            cc=addresses["cc"],
+            bcc=addresses["bcc"],
+            is_html=is_html,
+            sender_email=addresses["sender_email"],
+            sender_name=from_name or self.settings.DEFAULT_FROM_NAME
+        )
+    
+    async def send_many(
+        self,
+        messages: List[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Send many emails over a fixed number of concurrent SMTP sessions.
+        
+        Every message spec is validated before anything is sent; specs that
+        fail validation are reported without being dispatched.
+        
+        Args:
+            messages: List of message specs, each a dictionary with the
+                keyword arguments accepted by ``send_email``
+            concurrency: Number of concurrent SMTP sessions (defaults to
+                BULK_SEND_CONCURRENCY, capped at SMTP_POOL_MAX_SIZE)
+            
+        Returns:
+            Dictionary with overall status, counts and per-message results
+            in the same order as ``messages``
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        # Validate every spec up front
+        for index, spec in enumerate(messages):
+            prepared = self._prepare_spec(spec)
+            if prepared["status"] == "error":
+                results[index] = prepared
+            else:
+                queue.put_nowait((index, prepared["kwargs"]))
+        
+        workers = concurrency or self.settings.BULK_SEND_CONCURRENCY
+        workers = max(1, min(workers, self.settings.SMTP_POOL_MAX_SIZE, queue.qsize() or 1))
+        
+        async def worker() -> None:
+            while True:
+                try:
+                    index, kwargs = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    results[index] = await self._compose_and_send(**kwargs)
+                except Exception as e:
+                    results[index] = {
+                        "status": "error",
+                        "message": f"Failed to send email: {str(e)}"
+                    }
+        
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        
+        return self._bulk_summary(results)
+    
+    @staticmethod
+    def _bulk_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the overall result of a multi-message send from per-message results."""
+        sent = sum(1 for result in results if result["status"] == "success")
+        failed = len(results) - sent
+        if failed == 0:
+            status = "success"
+        elif sent == 0:
+            status = "error"
+        else:
+            status = "partial"
+        
+        return {
+            "status": status,
+            "message": f"Sent {sent} of {len(results)} email(s)",
+            "sent": sent,
+            "failed": failed,
+            "results": [
+                {"index": index, **result} for index, result in enumerate(results)
+            ]
+        }
+    
+    def register_template(
+        self,
+        subject: str,
+        body: str,
+        is_html: bool = False,
+        template_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Compile a mail-merge template and keep it for later sends.
+        
+        Args:
+            subject: Subject template with ``{{ name }}`` placeholders
+            body: Body template with ``{{ name }}`` placeholders
+            is_html: Whether the body is HTML (values are HTML-escaped)
+            template_id: ID to register under (generated if omitted)
+            
+        Returns:
+            Dictionary with status, ``template_id`` and the placeholder names
+        """
+        template = self.templates.register(subject, body, is_html, template_id)
+        return {
+            "status": "success",
+            "message": f"Template {template.template_id} registered",
+            "template_id": template.template_id,
+            "variables": template.variables
+        }
+    
+    async def send_merge(
+        self,
+        template_id: str,
+        rows: List[Dict[str, Any]],
+        attachments: Optional[List[str]] = None,
+        from_email: Optional[str] = None,
+        from_name: Optional[str] = None,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Render a registered template per row and send the results.
+        
+        Rendering and sending are pipelined: rows are rendered one at a time
+        into a bounded queue drained by the send workers, so only a few
+        rendered messages exist at once.
+        
+        Args:
+            template_id: ID returned by ``register_template``
+            rows: Per-recipient variables; each row must include ``recipient``
+                and may include ``cc`` and ``bcc`` lists
+            attachments: Optional list of file paths attached to every message
+            from_email: Optional sender email (uses default if not provided)
+            from_name: Optional sender name (uses default if not provided)
+            concurrency: Number of concurrent SMTP sessions (defaults to
+                BULK_SEND_CONCURRENCY, capped at SMTP_POOL_MAX_SIZE)
+            
+        Returns:
+            Dictionary with overall status, counts and per-row results in
+            the same order as ``rows``
+        """
+        template = self.templates.get(template_id)
+        if template is None:
+            return {
+                "status": "error",
+                "message": f"Unknown template: {template_id}"
+            }
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        workers = concurrency or self.settings.BULK_SEND_CONCURRENCY
+        workers = max(1, min(workers, self.settings.SMTP_POOL_MAX_SIZE, len(rows) or 1))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=workers * 2)
+        failed_row: Optional[int] = None
+        
+        async def producer() -> None:
+            nonlocal failed_row
+            index = 0
+            try:
+                for index, row in enumerate(rows):
+                    prepared = self._render_merge_row(template, row, attachments, from_email, from_name)
+                    if prepared["status"] == "error":
+                        results[index] = prepared
+                    else:
+                        await queue.put((index, prepared["kwargs"]))
+            except Exception as e:
+                # Stop rendering, but let the workers finish the queued rows
+                logger.exception(f"Mail merge stopped at row {index}")
+                failed_row = index
+                results[index] = {
+                    "status": "error",
+                    "message": f"Failed to render row: {str(e)}"
+                }
+            # Without the sentinels the workers would wait on the queue forever
+            for _ in range(workers):
+                await queue.put(None)
+        
+        async def worker() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, kwargs = item
+                try:
+                    results[index] = await self._compose_and_send(**kwargs)
+                except Exception as e:
+                    results[index] = {
+                        "status": "error",
+                        "message": f"Failed to send email: {str(e)}"
+                    }
+        
+        await asyncio.gather(producer(), *(worker() for _ in range(workers)))
+        
+        if failed_row is not None:
+            for index, result in enumerate(results):
+                if result is None:
+                    results[index] = {
+                        "status": "error",
+                        "message": f"Not sent: mail merge stopped at row {failed_row}"
+                    }
+            summary = self._bulk_summary(results)
+            summary["status"] = "error"
+            summary["message"] = (
+                f"Mail merge stopped at row {failed_row}: {results[failed_row]['message']}. "
+                f"{summary['message']}"
+            )
+            return summary
+        
+        return self._bulk_summary(results)
+    
+    def _render_merge_row(
+        self,
+        template: MailTemplate,
+        row: Dict[str, Any],
+        attachments: Optional[List[str]],
+        from_email: Optional[str],
+        from_name: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Render one mail-merge row into validated send arguments.
+        
+        Returns:
+            Dictionary with status and, on success, the ``kwargs`` for
+            ``_compose_and_send``
+        """
+        if not isinstance(row, dict) or not row.get("recipient"):
+            return {
+                "status": "error",
+                "message": "Each row must be an object with a recipient"
+            }
+        
+        try:
+            subject, body = template.render(row)
+        except TemplateError as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+        
+        return self._prepare_spec({
+            "recipient": row["recipient"],
+            "subject": subject,
+            "body": body,
+            "attachments": attachments,
+            "cc": row.get("cc"),
+            "bcc": row.get("bcc"),
+            "is_html": template.is_html,
+            "from_email": from_email,
+            "from_name": from_name
+        })
+    
+    async def send_fanout(
+        self,
+        recipients: List[str],
+        subject: str,
+        body: str,
+        attachments: Optional[List[str]] = None,
+        is_html: bool = False,
+        from_email: Optional[str] = None,
+        from_name: Optional[str] = None,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Send the same message to many recipients with few SMTP transactions.
+        
+        The message is rendered once. Recipients are grouped by domain and
+        each group is sent in transactions of at most
+        SMTP_MAX_RECIPIENTS_PER_TRANSACTION ``RCPT TO`` commands; the server's
+        reply to each ``RCPT TO`` is reported per recipient. The To header
+        does not list the recipients.
+        
+        Args:
+            recipients: Recipient email addresses
+            subject: Email subject
+            body: Email body content
+            attachments: Optional list of file paths to attach
+            is_html: Whether the body is HTML (default: False for plain text)
+            from_email: Optional sender email (uses default if not provided)
+            from_name: Optional sender name (uses default if not provided)
+            concurrency: Number of concurrent SMTP transactions (defaults to
+                BULK_SEND_CONCURRENCY, capped at SMTP_POOL_MAX_SIZE)
+            
+        Returns:
+            Dictionary with overall status, counts and per-recipient results
+            in the same order as ``recipients``
+        """
+        if not recipients:
+            return {
+                "status": "error",
+                "message": "No recipients given"
+            }
+        
+        sender = self._resolve_sender(from_email)
+        if sender["status"] == "error":
+            return sender
+        sender_email = sender["sender_email"]
+        
+        # Validate and de-duplicate; invalid addresses never reach the server
+        results: List[Dict[str, Any]] = []
+        by_address: Dict[str, Dict[str, Any]] = {}
+        groups: Dict[str, List[str]] = {}
+        for address, (is_valid, normalized) in zip(recipients, validate_email_batch(recipients)):
+            if not is_valid:
+                results.append({
+                    "recipient": address,
+                    "status": "rejected",
+                    "code": None,
+                    "message": f"Invalid recipient email: {normalized}"
+                })
+                continue
+            key = normalized.lower()
+            if key in by_address:
+                results.append(by_address[key])
+                continue
+            result = {"recipient": normalized, "status": "pending", "code": None, "message": ""}
+            by_address[key] = result
+            results.append(result)
+            groups.setdefault(key.rsplit("@", 1)[1], []).append(normalized)
+        
+        if not by_address:
+            return self._fanout_summary(results, 0)
+        
+        composed = await self._compose_message(
+            UNDISCLOSED_RECIPIENTS, subject, body, attachments, None, None,
+            is_html, sender_email, from_name or self.settings.DEFAULT_FROM_NAME
+        )
+        if composed["status"] == "error":
+            return composed
+        
+        # Render once; attachments stay streamable instead of being flattened
+        message = composed["mime"]
+        if not has_file_attachments(message):
+            message = await self._get_cpu_pool().run(len(body), render_message, message)
+        
+        size = self.settings.SMTP_MAX_RECIPIENTS_PER_TRANSACTION
+        queue: asyncio.Queue = asyncio.Queue()
+        for group in groups.values():
+            for start in range(0, len(group), size):
+                queue.put_nowait(group[start:start + size])
+        transactions = queue.qsize()
+        
+        workers = concurrency or self.settings.BULK_SEND_CONCURRENCY
+        workers = max(1, min(workers, self.settings.SMTP_POOL_MAX_SIZE, transactions))
+        
+        async def worker() -> None:
+            while True:
+                try:
+                    batch = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._send_fanout_batch(message, sender_email, batch, by_address)
+        
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        
+        return self._fanout_summary(results, transactions)
+    
+    async def _send_fanout_batch(
+        self,
+        message: Union[MIMEMultipart, bytes],
+        sender_email: str,
+        batch: List[str],
+        by_address: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """Send one fan-out transaction and record each recipient's outcome."""
+        def record(address: str, status: str, code: Optional[int], text: str) -> None:
+            by_address[address.lower()].update(status=status, code=code, message=text)
+        
+        try:
+            refused, reply = await self._send_smtp_message(message, sender_email, batch)
+        except aiosmtplib.SMTPRecipientsRefused as e:
+            for refusal in e.recipients:
+                record(refusal.recipient, "rejected", refusal.code, refusal.message)
+            return
+        except Exception as e:
+            for address in batch:
+                record(address, "error", getattr(e, "code", None), f"Failed to send email: {str(e)}")
+            return
+        
+        refused = {address.lower(): response for address, response in refused.items()}
+        for address in batch:
+            response = refused.get(address.lower())
+            if response is None:
+                record(address, "accepted", 250, reply)
+            else:
+                record(address, "rejected", response.code, response.message)
+    
+    @staticmethod
+    def _fanout_summary(results: List[Dict[str, Any]], transactions: int) -> Dict[str, Any]:
+        """Build the overall fan-out result from per-recipient outcomes."""
+        accepted = sum(1 for result in results if result["status"] == "accepted")
+        if accepted == len(results):
+            status = "success"
+        elif accepted == 0:
+            status = "error"
+        else:
+            status = "partial"
+        
+        return {
+            "status": status,
+            "message": (
+                f"Accepted {accepted} of {len(results)} recipient(s) "
+                f"in {transactions} transaction(s)"
+            ),
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "transactions": transactions,
+            "results": [dict(result) for result in results]
+        }
+    
+    async def enqueue_email(self, **spec: Any) -> Dict[str, Any]:
+        """
+        Validate an email and add it to the durable outbound queue.
+        
+        The message is sent in the background by the queue workers, which
+        retry transient (4xx and connection) failures with exponential
+        backoff. Attachments are read when the message is sent, so the files
+        must remain in place until then.
+        
+        Args:
+            **spec: The keyword arguments accepted by ``send_email``
+            
+        Returns:
+            Dictionary with status and, on success, the queued ``message_id``
+        """
+        prepared = self._prepare_spec(spec)
+        if prepared["status"] == "error":
+            return prepared
+        
+        message_id = self._get_queue().enqueue(prepared["kwargs"])
+        self._ensure_queue_workers()
+        self._queue_wakeup.set()
+        
+        return {
+            "status": "success",
+            "message": f"Email to {prepared['kwargs']['recipient']} queued for delivery",
+            "message_id": message_id
+        }
+    
+    async def get_send_status(self, message_id: str) -> Dict[str, Any]:
+        """
+        Look up the delivery state of a queued email.
+        
+        Args:
+            message_id: ID returned by ``enqueue_email``
+            
+        Returns:
+            Dictionary with status and the message's delivery ``details``
+        """
+        # Resume any backlog left over from a previous run
+        self._ensure_queue_workers()
+        details = self._get_queue().get(message_id)
+        if details is None:
+            return {
+                "status": "error",
+                "message": f"Unknown message ID: {message_id}"
+            }
+        return {
+            "status": "success",
+            "message": f"Message {message_id} is {details['status']}",
+            "details": details
+        }
+    
+    def resume_queue(self) -> int:
+        """
+        Start the queue workers if a previous run left messages unsent.
+        
+        Called at server start-up, so a backlog is delivered without waiting
+        for the next queued send or status lookup. An account that has never
+        queued anything has no database, and none is created for it.
+        
+        Returns:
+            Number of messages waiting to be sent
+        """
+        queue_path = os.path.join(self.settings.SEND_QUEUE_DIR, QUEUE_FILENAME)
+        if self._queue is None and not os.path.exists(queue_path):
+            return 0
+        pending = self._get_queue().pending_count()
+        if pending:
+            self._ensure_queue_workers()
+        return pending
+    
+    def _ensure_queue_workers(self) -> None:
+        """Start the background queue workers if they are not running."""
+        self._queue_workers = [task for task in self._queue_workers if not task.done()]
+        if self._queue_wakeup is None:
+            self._queue_wakeup = asyncio.Event()
+        for _ in range(self.settings.SEND_QUEUE_WORKERS - len(self._queue_workers)):
+            self._queue_workers.append(asyncio.ensure_future(self._queue_worker()))
+    
+    async def _queue_worker(self) -> None:
+        """Send queued messages until cancelled."""
+        queue = self._get_queue()
+        while True:
+            job = queue.claim_next()
+            if job is None:
+                self._queue_wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._queue_wakeup.wait(),
+                        self.settings.SEND_QUEUE_POLL_INTERVAL
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                if self.activate is not None:
+                    await self.activate()
+                await self._deliver_queued(queue, job)
+            except Exception as e:
+                # Never let one message take the worker down
+                logger.exception(f"Queued message {job['id']} could not be processed")
+                queue.mark_failed(job["id"], str(e))
+    
+    async def _deliver_queued(self, queue: OutboundQueue, job: Dict[str, Any]) -> None:
+        """Make one delivery attempt for a claimed queue entry."""
+        kwargs = job["payload"]
+        composed = await self._compose_message(**kwargs)
+        if composed["status"] == "error":
+            queue.mark_failed(job["id"], composed["message"])
+            return
+        
+        try:
+            await self._send_smtp_message(
+                composed["mime"], kwargs["sender_email"], composed["recipients"]
+            )
+        except Exception as e:
+            error = f"Failed to send email: {str(e)}"
+            if self._is_transient(e) and job["attempts"] < self.settings.SEND_QUEUE_MAX_ATTEMPTS:
+                delay = self._retry_delay(job["attempts"])
+                if isinstance(e, RateLimitExceeded):
+                    delay = max(delay, e.retry_after)
+                logger.info(f"Queued message {job['id']} deferred for {delay:.0f}s: {str(e)}")
+                queue.mark_retry(job["id"], error, delay)
+            else:
+                logger.warning(f"Queued message {job['id']} failed: {str(e)}")
+                queue.mark_failed(job["id"], error)
+            return
+        
+        queue.mark_sent(job["id"])
+    
+    def _retry_delay(self, attempts: int) -> float:
+        """Exponential backoff before the next attempt, capped at SEND_QUEUE_MAX_BACKOFF."""
+        delay = self.settings.SEND_QUEUE_RETRY_BACKOFF * (2 ** (attempts - 1))
+        return min(delay, self.settings.SEND_QUEUE_MAX_BACKOFF)
+    
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Whether a send error is worth retrying later (4xx reply, connection failure or rate limit)."""
+        if isinstance(error, RateLimitExceeded):
+            return True
+        if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+            return all(400 <= refusal.code < 500 for refusal in error.recipients)
+        if isinstance(error, aiosmtplib.SMTPResponseException):
+            return 400 <= error.code < 500
+        # Covers SMTPServerDisconnected, SMTPConnectError and SMTPTimeoutError
+        return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+    
+    def _prepare_spec(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Validate a bulk message spec and resolve it into send arguments.
+        
+        Args:
+            spec: Message spec as accepted by ``send_many``
+            
+        Returns:
+            Dictionary with status and, on success, the ``kwargs`` for
+            ``_compose_and_send``
+        """
+        if not isinstance(spec, dict):
+            return {
+                "status": "error",
+                "message": "Message spec must be an object"
+            }
+        
+        unknown = set(spec) - BULK_SPEC_FIELDS
+        if unknown:
+            return {
+                "status": "error",
+                "message": f"Unknown message fields: {', '.join(sorted(unknown))}"
+            }
+        
+        missing = [field for field in ("recipient", "body") if not spec.get(field)]
+        if missing:
+            return {
+                "status": "error",
+                "message": f"Missing required fields: {', '.join(missing)}"
+            }
+        
+        addresses = self._validate_addresses(
+            spec["recipient"], spec.get("cc"), spec.get("bcc"), spec.get("from_email")
+        )
+        if addresses["status"] == "error":
+            return addresses
+        
+        for file_path in spec.get("attachments") or []:
+            if not Path(file_path).exists():
+                return {
+                    "status": "error",
+                    "message": f"Attachment file not found: {file_path}"
+                }
+        
+        return {
+            "status": "success",
+            "kwargs": {
+                "recipient": addresses["recipient"],
+                "subject": spec.get("subject", ""),
+                "body": spec["body"],
+                "attachments": spec.get("attachments"),
+                "cc": addresses["cc"],
+                "bcc": addresses["bcc"],
+                "is_html": bool(spec.get("is_html", False)),
+                "sender_email": addresses["sender_email"],
+                "sender_name": spec.get("from_name") or self.settings.DEFAULT_FROM_NAME
+            }
+        }
+    
+    def _validate_addresses(
+        self,
+        recipient: str,
+        cc: Optional[List[str]],
+        bcc: Optional[List[str]],
+        from_email: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Validate and normalize the recipient, CC, BCC and sender addresses.
+        
+        Args:
+            recipient: Email address of the recipient
+            cc: Optional list of CC recipients
+            bcc: Optional list of BCC recipients
+            from_email: Optional sender email (uses default if not provided)
+            
+        Returns:
+            Dictionary with status and the normalized addresses
+        """
         # Validate recipient email
         is_valid, result = validate_email_address(recipient)
         if not is_valid:
@@ -63,8 +881,7 @@ class EmailSender:
         # Validate CC emails if provided
         if cc:
             valid_cc = []
-            for email in cc:
-                is_valid, result = validate_email_address(email)
+            for is_valid, result in validate_email_batch(cc):
                 if not is_valid:
                     return {
                         "status": "error",
@@ -76,8 +893,7 @@ class EmailSender:
         # Validate BCC emails if provided
         if bcc:
             valid_bcc = []
-            for email in bcc:
-                is_valid, result = validate_email_address(email)
+            for is_valid, result in validate_email_batch(bcc):
                 if not is_valid:
                     return {
                         "status": "error",
@@ -86,9 +902,30 @@ class EmailSender:
                 valid_bcc.append(result)
             bcc = valid_bcc
         
-        # Set from email and name
+        sender = self._resolve_sender(from_email)
+        if sender["status"] == "error":
+            return sender
+        
+        return {
+            "status": "success",
+            "recipient": recipient,
+            "cc": cc,
+            "bcc": bcc,
+            "sender_email": sender["sender_email"]
+        }
+    
+    def _resolve_sender(self, from_email: Optional[str]) -> Dict[str, Any]:
+        """
+        Validate the sender address, falling back to DEFAULT_FROM_EMAIL.
+        
+        Args:
+            from_email: Optional sender email
+            
+        Returns:
+            Dictionary with status and the normalized ``sender_email``
+        """
+        # Set from email
         sender_email = from_email or self.settings.DEFAULT_FROM_EMAIL
-        sender_name = from_name or self.settings.DEFAULT_FROM_NAME
         
         if not sender_email:
             return {
@@ -103,8 +940,81 @@ class EmailSender:
                 "status": "error",
                 "message": f"Invalid sender email: {result}"
             }
-        sender_email = result
         
+        return {"status": "success", "sender_email": result}
+    
+    async def _compose_and_send(
+        self,
+        recipient: str,
+        subject: str,
+        body: str,
+        attachments: Optional[List[str]],
+        cc: Optional[List[str]],
+        bcc: Optional[List[str]],
+        is_html: bool,
+        sender_email: str,
+        sender_name: str
+    ) -> Dict[str, Any]:
+        """
+        Build the MIME message for already validated addresses and send it.
+        
+        Returns:
+            Dictionary with status and message
+        """
+        with tracing.span("mime_build"):
+            composed = await self._compose_message(
+                recipient, subject, body, attachments, cc, bcc, is_html, sender_email, sender_name
+            )
+        if composed["status"] == "error":
+            return composed
+        
+        message = composed["mime"]
+        pool = self._get_cpu_pool()
+        if not has_file_attachments(message) and pool.offloads(len(body)):
+            # Flattening a large body is as slow as building it; do it in the pool too
+            with tracing.span("mime_render"):
+                message = await pool.run(len(body), render_message, message)
+        
+        # Send email
+        try:
+            await self._send_smtp_message(message, sender_email, composed["recipients"])
+            
+            return {
+                "status": "success",
+                "message": f"Email sent successfully to {recipient}",
+                "details": {
+                    "recipient": recipient,
+                    "subject": subject,
+                    "cc": cc,
+                    "bcc": bcc,
+                    "attachments": len(attachments) if attachments else 0
+                }
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": f"Failed to send email: {str(e)}"
+            }
+    
+    async def _compose_message(
+        self,
+        recipient: str,
+        subject: str,
+        body: str,
+        attachments: Optional[List[str]],
+        cc: Optional[List[str]],
+        bcc: Optional[List[str]],
+        is_html: bool,
+        sender_email: str,
+        sender_name: str
+    ) -> Dict[str, Any]:
+        """
+        Build the MIME message and envelope recipients.
+        
+        Returns:
+            Dictionary with status and, on success, the ``mime`` message and
+            the envelope ``recipients``
+        """
         # Create message
         message = MIMEMultipart()
         message["From"] = format_email_address(sender_email, sender_name)
@@ -114,9 +1024,9 @@ class EmailSender:
         if cc:
             message["Cc"] = ", ".join(cc)
         
-        # Add body
+        # Add body; encoding a large one is moved off the event loop
         body_type = "html" if is_html else "plain"
-        message.attach(MIMEText(body, body_type))
+        message.attach(await self._get_cpu_pool().run(len(body), MIMEText, body, body_type))
         
         # Add attachments if provided
         if attachments:
@@ -131,37 +1041,22 @@ class EmailSender:
                         "message": f"Error adding attachment {file_path}: {str(e)}"
                     }
         
-        # Send email
-        try:
-            recipients = [recipient]
-            if cc:
-                recipients.extend(cc)
-            if bcc:
-                recipients.extend(bcc)
-            
-            await self._send_smtp_message(message, sender_email, recipients)
-            
-            return {
-                "status": "success",
-                "message": f"Email sent successfully to {recipient}",
-                "details": {
-                    "recipient": recipient,
-                    "subject": subject,
-                    "cc": cc,
-                    "bcc": bcc,
-                    "attachments": len(attachments) if attachments else 0
-                }
-            }
-        except Exception as e:
-            return {
-                "status": "error",
-                "message": f"Failed to send email: {str(e)}"
-            }
+        recipients = [recipient]
+        if cc:
+            recipients.extend(cc)
+        if bcc:
+            recipients.extend(bcc)
+        
+        return {"status": "success", "mime": message, "recipients": recipients}
     
     async def _add_attachment(self, message: MIMEMultipart, file_path: str) -> Dict[str, str]:
         """
         Add an attachment to the email message.
         
+        The file is not read here; it is base64-encoded chunk by chunk while
+        the message is written to the SMTP DATA stream. Files that fit the
+        attachment cache are encoded once and reused by later sends.
+        
         Args:
             message: The MIME message to add attachment to
             file_path: Path to the file to attach
@@ -186,52 +1081,35 @@ class EmailSender:
                 "message": f"Attachment {path.name} exceeds maximum size of {self.settings.MAX_ATTACHMENT_SIZE_MB}MB"
             }
         
-        # Read and attach file
-        with open(path, "rb") as f:
-            part = MIMEBase("application", "octet-stream")
-            part.set_payload(f.read())
-        
-        encoders.encode_base64(part)
-        part.add_header(
-            "Content-Disposition",
-            f"attachment; filename= {path.name}"
-        )
-        
-        message.attach(part)
+        message.attach(FileAttachment(path, cache=self._get_attachment_cache()))
         return {"status": "success"}
     
     async def _send_smtp_message(
         self,
-        message: MIMEMultipart,
+        message: Union[MIMEMultipart, bytes],
         sender: str,
         recipients: List[str]
-    ) -> None:
+    ) -> Tuple[Dict[str, aiosmtplib.SMTPResponse], str]:
         """
-        Send the SMTP message.
+        Send the SMTP message over a pooled connection.
+        
+        Waits for the account's rate limiter first, so concurrent and bulk
+        sends are spread out to the provider's allowed throughput.
         
         Args:
-            message: The MIME message to send
+            message: The MIME message to send, or its bytes from ``render_message``
             sender: Sender email address
             recipients: List of recipient email addresses
+            
+        Returns:
+            Recipients refused by the server and the server's final reply
         """
-        # Port 465 requires SSL, port 587 requires STARTTLS
-        if self.settings.SMTP_PORT == 465:
-            # Direct SSL connection for port 465
-            async with aiosmtplib.SMTP(
-                hostname=self.settings.SMTP_SERVER,
-                port=self.settings.SMTP_PORT,
-                username=self.settings.SMTP_USERNAME,
-                password=self.settings.SMTP_PASSWORD,
-                use_tls=True
-            ) as smtp:
-                await smtp.send_message(message, sender=sender, recipients=recipients)
-        else:
-            # STARTTLS for port 587
-            async with aiosmtplib.SMTP(
-                hostname=self.settings.SMTP_SERVER,
-                port=self.settings.SMTP_PORT,
-                username=self.settings.SMTP_USERNAME,
-                password=self.settings.SMTP_PASSWORD,
-                start_tls=True if self.settings.SMTP_USE_TLS else False
-            ) as smtp:
-                await smtp.send_message(message, sender=sender, recipients=recipients)
+        try:
+            limiter = self._get_rate_limiter()
+            if limiter is not None:
+                with tracing.span("rate_limit"):
+                    await limiter.acquire(len(recipients))
+            return await self._get_pool().send_message(message, sender, recipients)
+        except Exception as e:
+            record_error("smtp", e)
+            raise
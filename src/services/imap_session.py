@@ -0,0 +1,412 @@
+"""
+Long-lived IMAP sessions with IDLE-based new mail notification.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import aioimaplib
+
+from . import tracing
+from .metrics import IMAP_PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+EXISTS_RE = re.compile(rb"^(\d+) EXISTS")
+UIDVALIDITY_RE = re.compile(rb"\[UIDVALIDITY (\d+)\]")
+
+
+class IMAPSession:
+    """
+    A persistent, authenticated IMAP connection for one account.
+
+    Commands are serialized through ``checkout``. While the session is not
+    checked out it sits in IDLE (when the server supports it) and records
+    ``EXISTS`` pushes so callers can learn about new mail without polling.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        use_ssl: bool = True,
+        idle_enabled: bool = True,
+        idle_timeout: float = 1740.0,
+        reconnect_attempts: int = 3,
+        reconnect_backoff: float = 1.0
+    ):
+        """
+        Initialize the session. The connection is opened on first checkout.
+
+        Args:
+            host: IMAP server hostname
+            port: IMAP server port
+            username: Login username
+            password: Login password
+            use_ssl: Connect with implicit TLS
+            idle_enabled: Enter IDLE between checkouts if the server supports it
+            idle_timeout: Seconds before an IDLE command is renewed
+            reconnect_attempts: Connection attempts before giving up
+            reconnect_backoff: Initial reconnect delay in seconds (doubles per attempt)
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.idle_enabled = idle_enabled
+        self.idle_timeout = idle_timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+
+        self.imap: Optional[aioimaplib.IMAP4] = None
+        self.selected: Optional[str] = None
+        self.exists: Optional[int] = None
+        self.uidvalidity: Optional[int] = None
+        self.last_used = time.monotonic()
+
+        self._lock = asyncio.Lock()
+        self._new_mail = asyncio.Event()
+        self._idle_task: Optional[asyncio.Task] = None
+        self._idle_future: Optional[asyncio.Future] = None
+        # (mailbox, criteria) -> (uidvalidity, stored at, matching UIDs)
+        self._searches: Dict[Tuple[str, str], Tuple[Optional[int], float, List[int]]] = {}
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether the session holds a live, authenticated connection."""
+        if self.imap is None:
+            return False
+        transport = getattr(self.imap.protocol, "transport", None)
+        if transport is None or transport.is_closing():
+            return False
+        return self.imap.get_state() in ("AUTH", "SELECTED")
+
+    @property
+    def in_use(self) -> bool:
+        """Whether the session is checked out (or being connected or closed)."""
+        return self._lock.locked()
+
+    def _create_client(self) -> aioimaplib.IMAP4:
+        """Create an unconnected aioimaplib client."""
+        if self.use_ssl:
+            return aioimaplib.IMAP4_SSL(host=self.host, port=self.port)
+        return aioimaplib.IMAP4(host=self.host, port=self.port)
+
+    async def _connect_once(self) -> None:
+        """Open the connection and log in."""
+        imap = self._create_client()
+        try:
+            await imap.wait_hello_from_server()
+            with IMAP_PHASE_SECONDS.time("login"):
+                response = await imap.login(self.username, self.password)
+            if response.result != "OK":
+                raise aioimaplib.Abort(f"IMAP login failed: {response.lines}")
+        except BaseException:
+            await self._drop_client(imap)
+            raise
+        self.imap = imap
+        self.selected = None
+        self.exists = None
+        self.uidvalidity = None
+        self._searches = {}
+        logger.debug(f"Opened IMAP session to {self.host}:{self.port}")
+
+    async def connect(self) -> None:
+        """Connect with exponential backoff between attempts."""
+        delay = self.reconnect_backoff
+        for attempt in range(1, self.reconnect_attempts + 1):
+            try:
+                await self._connect_once()
+                return
+            except (OSError, asyncio.TimeoutError, aioimaplib.AioImapException) as e:
+                if attempt == self.reconnect_attempts:
+                    raise
+                logger.warning(
+                    f"IMAP connection attempt {attempt} failed ({str(e)}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                delay *= 2
+
+    async def select(self, mailbox: str) -> None:
+        """
+        Select a mailbox, skipping the round-trip if it is already selected.
+
+        Args:
+            mailbox: Mailbox name
+        """
+        if self.selected == mailbox and self.imap.get_state() == "SELECTED":
+            return
+        with IMAP_PHASE_SECONDS.time("select"):
+            response = await self.imap.select(mailbox)
+        if response.result != "OK":
+            self.selected = None
+            raise aioimaplib.Abort(f"Failed to select mailbox {mailbox}")
+        self.selected = mailbox
+        self.exists = aioimaplib.extract_exists(response)
+        self.uidvalidity = None
+        for line in response.lines:
+            match = UIDVALIDITY_RE.search(bytes(line))
+            if match:
+                self.uidvalidity = int(match.group(1))
+                break
+        self._new_mail.clear()
+
+    @asynccontextmanager
+    async def checkout(self, mailbox: Optional[str] = None) -> AsyncIterator[aioimaplib.IMAP4]:
+        """
+        Get exclusive use of the connection, reconnecting if it was dropped.
+
+        Any exception raised inside the block discards the connection so the
+        next checkout starts from a fresh login.
+
+        Args:
+            mailbox: Mailbox to select before yielding (optional)
+        """
+        async with self._lock:
+            with tracing.span("imap.checkout"):
+                await self._stop_idle()
+                if not self.is_connected:
+                    await self.close_connection()
+                    with tracing.span("imap.connect"):
+                        await self.connect()
+            try:
+                if mailbox is not None:
+                    await self.select(mailbox)
+                yield self.imap
+            except BaseException:
+                await self.close_connection()
+                raise
+            finally:
+                self.last_used = time.monotonic()
+            self._start_idle()
+
+    def cached_search(self, mailbox: str, criteria: str, max_age: float) -> Optional[List[int]]:
+        """
+        Return the UIDs of an earlier SEARCH if it is still usable.
+
+        Args:
+            mailbox: Mailbox the search ran in
+            criteria: SEARCH criteria
+            max_age: Seconds after which a stored result is discarded
+
+        Returns:
+            Sorted UIDs, or None if there is no fresh result
+        """
+        key = (mailbox, criteria)
+        entry = self._searches.get(key)
+        if entry is None:
+            return None
+        uidvalidity, stored_at, uids = entry
+        if uidvalidity != self.uidvalidity or time.monotonic() - stored_at > max_age:
+            del self._searches[key]
+            return None
+        return uids
+
+    def remember_search(self, mailbox: str, criteria: str, uids: List[int]) -> None:
+        """Store a SEARCH result for later pages of the same listing."""
+        self._searches[(mailbox, criteria)] = (self.uidvalidity, time.monotonic(), sorted(uids))
+
+    def has_new_mail(self) -> bool:
+        """Whether IDLE reported new messages since the last check."""
+        return self._new_mail.is_set()
+
+    async def wait_for_new_mail(self, timeout: float) -> bool:
+        """
+        Wait until IDLE reports new messages in the selected mailbox.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if new mail arrived, False on timeout
+        """
+        try:
+            await asyncio.wait_for(self._new_mail.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self._new_mail.clear()
+        return True
+
+    def handle_push(self, lines) -> None:
+        """Record untagged responses pushed by the server during IDLE."""
+        for line in lines:
+            if not isinstance(line, (bytes, bytearray)):
+                continue
+            match = EXISTS_RE.match(bytes(line))
+            if match:
+                count = int(match.group(1))
+                if self.exists is not None and count > self.exists:
+                    self._new_mail.set()
+                if count != self.exists:
+                    # Stored SEARCH results no longer cover the mailbox
+                    self._searches = {
+                        key: entry for key, entry in self._searches.items()
+                        if key[0] != self.selected
+                    }
+                self.exists = count
+
+    def _start_idle(self) -> None:
+        """Enter IDLE in the background if enabled and supported."""
+        if (
+            not self.idle_enabled
+            or self.selected is None
+            or not self.is_connected
+            or not self.imap.has_capability("IDLE")
+        ):
+            return
+        self._idle_task = asyncio.ensure_future(self._idle_loop())
+
+    async def _idle_loop(self) -> None:
+        """Keep the connection in IDLE, renewing it every ``idle_timeout``."""
+        imap = self.imap
+        try:
+            while True:
+                self._idle_future = await imap.idle_start(timeout=self.idle_timeout)
+                while imap.has_pending_idle():
+                    push = await imap.wait_server_push()
+                    if push == aioimaplib.STOP_WAIT_SERVER_PUSH:
+                        break
+                    self.handle_push(push)
+                imap.idle_done()
+                await asyncio.wait_for(self._idle_future, imap.timeout)
+                self._idle_future = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The server dropped us; the next checkout reconnects
+            logger.info(f"IMAP IDLE ended ({str(e)}), session will reconnect")
+            await self.close_connection()
+
+    async def _stop_idle(self) -> None:
+        """Leave IDLE so regular commands can be issued."""
+        task, self._idle_task = self._idle_task, None
+        if task is None:
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        if self.imap is not None and self.imap.has_pending_idle():
+            self.imap.idle_done()
+            if self._idle_future is not None:
+                try:
+                    await asyncio.wait_for(self._idle_future, self.imap.timeout)
+                except Exception:
+                    await self.close_connection()
+        self._idle_future = None
+
+    @staticmethod
+    async def _drop_client(imap: aioimaplib.IMAP4) -> None:
+        """Close a client's transport without waiting for the server."""
+        transport = getattr(imap.protocol, "transport", None)
+        if transport is not None:
+            transport.close()
+
+    async def close_connection(self) -> None:
+        """Drop the current connection, if any."""
+        imap, self.imap = self.imap, None
+        self.selected = None
+        if imap is not None:
+            await self._drop_client(imap)
+
+    async def close(self) -> None:
+        """Stop IDLE and log out."""
+        async with self._lock:
+            await self._stop_idle()
+            if self.is_connected:
+                try:
+                    await self.imap.logout()
+                except Exception:
+                    pass
+            await self.close_connection()
+
+
+class IMAPSessionManager:
+    """
+    Keeps persistent ``IMAPSession`` objects per account.
+
+    Each account has a primary session (slot 0) and, for work that reads
+    several mailboxes at once, optional extra sessions in higher slots.
+    Only the primary session idles between checkouts.
+    """
+
+    def __init__(
+        self,
+        idle_enabled: bool = True,
+        idle_timeout: float = 1740.0,
+        reconnect_attempts: int = 3,
+        reconnect_backoff: float = 1.0
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            idle_enabled: Enter IDLE between checkouts if the server supports it
+            idle_timeout: Seconds before an IDLE command is renewed
+            reconnect_attempts: Connection attempts before giving up
+            reconnect_backoff: Initial reconnect delay in seconds
+        """
+        self.idle_enabled = idle_enabled
+        self.idle_timeout = idle_timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_backoff = reconnect_backoff
+        self._sessions: Dict[Tuple[str, int, str, int], IMAPSession] = {}
+
+    def get_session(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        use_ssl: bool = True,
+        slot: int = 0
+    ) -> IMAPSession:
+        """
+        Get a session for an account, creating it if needed.
+
+        Args:
+            host: IMAP server hostname
+            port: IMAP server port
+            username: Login username
+            password: Login password
+            use_ssl: Connect with implicit TLS
+            slot: Which of the account's sessions to get (0 is the primary)
+
+        Returns:
+            The account's session (not necessarily connected yet)
+        """
+        key = (host, port, username, slot)
+        session = self._sessions.get(key)
+        if session is None:
+            session = IMAPSession(
+                host=host,
+                port=port,
+                username=username,
+                password=password,
+                use_ssl=use_ssl,
+                idle_enabled=self.idle_enabled and slot == 0,
+                idle_timeout=self.idle_timeout,
+                reconnect_attempts=self.reconnect_attempts,
+                reconnect_backoff=self.reconnect_backoff
+            )
+            self._sessions[key] = session
+        return session
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many sessions are checked out and how many sit idle."""
+        sessions = list(self._sessions.values())
+        return {
+            "in_use": sum(1 for session in sessions if session.in_use),
+            "idle": sum(1 for session in sessions if not session.in_use and session.is_connected)
+        }
+
+    async def close(self) -> None:
+        """Log out of every session."""
+        sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            await session.close()
@@ -0,0 +1,264 @@
+"""
+On-disk cache of parsed messages keyed by IMAP UID or POP3 UIDL.
+"""
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    account TEXT NOT NULL,
+    mailbox TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    PRIMARY KEY (account, mailbox)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    account TEXT NOT NULL,
+    mailbox TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, mailbox, uid, kind)
+);
+CREATE TABLE IF NOT EXISTS pop3_messages (
+    account TEXT NOT NULL,
+    uidl TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (account, uidl, kind)
+);
+"""
+
+
+class MessageCache:
+    """
+    SQLite-backed store of parsed messages per account and mailbox.
+
+    Entries are only valid for the UIDVALIDITY they were stored under; when
+    the server reports a new UIDVALIDITY the mailbox's entries are dropped.
+    Messages are stored per ``kind`` ("full" or "summary") because the two
+    listing modes return different fields.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            directory: Directory holding ``messages.db``
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "messages.db")
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._db.close()
+
+    def sync_mailbox(self, account: str, mailbox: str, uidvalidity: int) -> None:
+        """
+        Record the mailbox's current UIDVALIDITY, invalidating stale entries.
+
+        Args:
+            account: Account identifier
+            mailbox: Mailbox name
+            uidvalidity: UIDVALIDITY reported by SELECT
+        """
+        row = self._db.execute(
+            "SELECT uidvalidity FROM mailboxes WHERE account = ? AND mailbox = ?",
+            (account, mailbox)
+        ).fetchone()
+        if row is not None and row[0] == uidvalidity:
+            return
+
+        with self._db:
+            self._db.execute(
+                "DELETE FROM messages WHERE account = ? AND mailbox = ?",
+                (account, mailbox)
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO mailboxes (account, mailbox, uidvalidity) "
+                "VALUES (?, ?, ?)",
+                (account, mailbox, uidvalidity)
+            )
+
+    def get_messages(
+        self,
+        account: str,
+        mailbox: str,
+        uids: Iterable[int],
+        kind: str
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Look up cached messages.
+
+        Args:
+            account: Account identifier
+            mailbox: Mailbox name
+            uids: UIDs to look up
+            kind: "full" or "summary"
+
+        Returns:
+            Mapping of UID to parsed message for the UIDs found
+        """
+        found: Dict[int, Dict[str, Any]] = {}
+        uid_list = list(uids)
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(uid_list), 500):
+            batch = uid_list[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT uid, data FROM messages WHERE account = ? AND mailbox = ? "
+                f"AND kind = ? AND uid IN ({placeholders})",
+                (account, mailbox, kind, *batch)
+            )
+            for uid, data in rows:
+                found[uid] = json.loads(data)
+        return found
+
+    def put_messages(
+        self,
+        account: str,
+        mailbox: str,
+        messages: Dict[int, Dict[str, Any]],
+        kind: str
+    ) -> None:
+        """
+        Store parsed messages.
+
+        Args:
+            account: Account identifier
+            mailbox: Mailbox name
+            messages: Mapping of UID to parsed message
+            kind: "full" or "summary"
+        """
+        if not messages:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO messages (account, mailbox, uid, kind, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (account, mailbox, uid, kind, json.dumps(data, ensure_ascii=False))
+                    for uid, data in messages.items()
+                ]
+            )
+
+    def prune(self, account: str, mailbox: str, live_uids: Iterable[int]) -> int:
+        """
+        Drop cached messages whose UIDs no longer exist on the server.
+
+        Args:
+            account: Account identifier
+            mailbox: Mailbox name
+            live_uids: Every UID currently in the mailbox
+
+        Returns:
+            Number of cache rows removed
+        """
+        live = set(live_uids)
+        cached = [
+            uid for (uid,) in self._db.execute(
+                "SELECT DISTINCT uid FROM messages WHERE account = ? AND mailbox = ?",
+                (account, mailbox)
+            )
+        ]
+        stale = [(account, mailbox, uid) for uid in cached if uid not in live]
+        if not stale:
+            return 0
+        with self._db:
+            cursor = self._db.executemany(
+                "DELETE FROM messages WHERE account = ? AND mailbox = ? AND uid = ?",
+                stale
+            )
+        return cursor.rowcount
+
+    def get_pop3_messages(
+        self,
+        account: str,
+        uidls: Iterable[str],
+        kind: str
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Look up cached POP3 messages by UIDL.
+
+        Args:
+            account: Account identifier
+            uidls: Unique ids reported by UIDL
+            kind: "full" or "summary"
+
+        Returns:
+            Mapping of UIDL to parsed message for the UIDLs found
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        uidl_list = list(uidls)
+        for start in range(0, len(uidl_list), 500):
+            batch = uidl_list[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self._db.execute(
+                f"SELECT uidl, data FROM pop3_messages WHERE account = ? "
+                f"AND kind = ? AND uidl IN ({placeholders})",
+                (account, kind, *batch)
+            )
+            for uidl, data in rows:
+                found[uidl] = json.loads(data)
+        return found
+
+    def put_pop3_messages(
+        self,
+        account: str,
+        messages: Dict[str, Dict[str, Any]],
+        kind: str
+    ) -> None:
+        """
+        Store parsed POP3 messages by UIDL.
+
+        Args:
+            account: Account identifier
+            messages: Mapping of UIDL to parsed message
+            kind: "full" or "summary"
+        """
+        if not messages:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO pop3_messages (account, uidl, kind, data) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (account, uidl, kind, json.dumps(data, ensure_ascii=False))
+                    for uidl, data in messages.items()
+                ]
+            )
+
+    def prune_pop3(self, account: str, live_uidls: Iterable[str]) -> int:
+        """
+        Drop cached POP3 messages no longer on the server.
+
+        Args:
+            account: Account identifier
+            live_uidls: Every UIDL currently in the maildrop
+
+        Returns:
+            Number of cache rows removed
+        """
+        live = set(live_uidls)
+        cached = [
+            uidl for (uidl,) in self._db.execute(
+                "SELECT DISTINCT uidl FROM pop3_messages WHERE account = ?",
+                (account,)
+            )
+        ]
+        stale = [(account, uidl) for uidl in cached if uidl not in live]
+        if not stale:
+            return 0
+        with self._db:
+            cursor = self._db.executemany(
+                "DELETE FROM pop3_messages WHERE account = ? AND uidl = ?",
+                stale
+            )
+        return cursor.rowcount
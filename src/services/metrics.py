@@ -0,0 +1,340 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+"""
+
+import bisect
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import tracing
+
+
+# Upper bounds (seconds) of latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the exposition format."""
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Render ``{name="value",...}``, or nothing when there are no labels."""
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integral values free of a fraction."""
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base class for a named metric family with fixed label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Create a metric family.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels every sample carries
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        """Sample lines of the family."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """HELP, TYPE and sample lines of the family."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """
+        Increase the counter.
+
+        Args:
+            *labels: Label values, in the order of ``labelnames``
+            amount: Non-negative increment
+        """
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current value for a label set."""
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(Metric):
+    """A value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the gauge for a label set."""
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        """Current value for a label set."""
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class _Timer:
+    """
+    Context manager observing its elapsed time into a histogram.
+
+    While a trace is active the block is also recorded as a span named
+    after the histogram's ``span_prefix`` and first label value.
+    """
+
+    __slots__ = ("histogram", "labels", "started", "scope")
+
+    def __init__(self, histogram: "Histogram", labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+        self.scope = None
+
+    def __enter__(self) -> "_Timer":
+        if self.histogram.span_prefix is not None and tracing.is_tracing():
+            self.scope = tracing.span(self.histogram.span_prefix + self.labels[0])
+            self.scope.__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+        if self.scope is not None:
+            self.scope.__exit__(*exc_info)
+
+
+class Histogram(Metric):
+    """
+    Observations counted into fixed buckets per label set.
+
+    Each observation costs one bisect and two additions; buckets are made
+    cumulative only when the family is rendered.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        span_prefix: Optional[str] = None
+    ):
+        """
+        Create a histogram family.
+
+        Args:
+            name: Metric name
+            documentation: HELP text
+            labelnames: Names of the labels every sample carries
+            buckets: Sorted bucket upper bounds (``+Inf`` is implicit)
+            span_prefix: Prefix of the trace spans opened by ``time``
+                (no spans when None)
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.span_prefix = span_prefix
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value, e.g. seconds
+            *labels: Label values, in the order of ``labelnames``
+        """
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels: str) -> _Timer:
+        """Context manager that observes the duration of its block."""
+        return _Timer(self, labels)
+
+    def count(self, *labels: str) -> int:
+        """Number of observations for a label set."""
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        bucket_names = self.labelnames + ("le",)
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, labels + (bound,))} {cumulative}"
+                )
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """A set of metric families rendered together."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._metrics: Dict[str, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Create and register a gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        span_prefix: Optional[str] = None
+    ) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets, span_prefix))
+
+    def render(self) -> str:
+        """
+        Render every family in the Prometheus text exposition format.
+
+        Returns:
+            The exposition text, newline-terminated
+        """
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+# Process-wide registry used by the services and served at /api/metrics
+registry = MetricsRegistry()
+
+SMTP_PHASE_SECONDS = registry.histogram(
+    "email_smtp_phase_seconds",
+    "Duration of SMTP connect, STARTTLS, auth and DATA phases",
+    ("phase",),
+    span_prefix="smtp."
+)
+IMAP_PHASE_SECONDS = registry.histogram(
+    "email_imap_phase_seconds",
+    "Duration of IMAP login, select, search and fetch phases",
+    ("phase",),
+    span_prefix="imap."
+)
+POP3_PHASE_SECONDS = registry.histogram(
+    "email_pop3_phase_seconds",
+    "Duration of POP3 connect, login and retrieve phases",
+    ("phase",),
+    span_prefix="pop3."
+)
+MESSAGES_TOTAL = registry.counter(
+    "email_messages_total",
+    "Messages sent or retrieved",
+    ("protocol", "direction")
+)
+BYTES_TOTAL = registry.counter(
+    "email_bytes_total",
+    "Message bytes sent or retrieved",
+    ("protocol", "direction")
+)
+ERRORS_TOTAL = registry.counter(
+    "email_errors_total",
+    "Failed operations by protocol and error class",
+    ("protocol", "error")
+)
+SMTP_POOL_CONNECTIONS = registry.gauge(
+    "email_smtp_pool_connections",
+    "Open SMTP pool connections by state",
+    ("account", "state")
+)
+SMTP_POOL_MAX_SIZE = registry.gauge(
+    "email_smtp_pool_max_size",
+    "Maximum SMTP pool connections",
+    ("account",)
+)
+IMAP_SESSION_CONNECTIONS = registry.gauge(
+    "email_imap_session_connections",
+    "Open IMAP mailbox sessions by state",
+    ("account", "state")
+)
+IMAP_SESSION_MAX_SIZE = registry.gauge(
+    "email_imap_session_max_size",
+    "Maximum IMAP mailbox sessions",
+    ("account",)
+)
+SEND_QUEUE_DEPTH = registry.gauge(
+    "email_send_queue_depth",
+    "Messages waiting in the outbound queue",
+    ("account",)
+)
+
+CPU_OFFLOAD_TOTAL = registry.counter(
+    "email_cpu_offload_total",
+    "CPU-bound MIME tasks run in the worker pool",
+    ("task", "mode")
+)
+
+
+def record_error(protocol: str, error: BaseException) -> None:
+    """Count a failed operation under the class name of its exception."""
+    ERRORS_TOTAL.inc(protocol, type(error).__name__)
@@ -0,0 +1,389 @@
+"""
+Streaming MIME serialization and SMTP DATA transfer for large attachments.
+"""
+
+import asyncio
+import base64
+import os
+import re
+import time
+import uuid
+from collections import OrderedDict
+from email.message import Message
+from email.mime.base import MIMEBase
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import aiosmtplib
+from aiosmtplib.protocol import SMTPProtocol
+
+from . import tracing
+from .metrics import BYTES_TOTAL, SMTP_PHASE_SECONDS
+
+
+CRLF = b"\r\n"
+
+# Bytes read per attachment chunk; a multiple of 57 so every chunk encodes to
+# whole 76-character base64 lines
+ATTACHMENT_CHUNK_SIZE = 57 * 1024
+
+# Bytes written per DATA chunk when sending an already rendered message
+DATA_CHUNK_SIZE = 64 * 1024
+
+# Lines beginning with a period must be doubled inside DATA (RFC 5321, 4.5.2)
+PERIOD_RE = re.compile(rb"(?m)^\.")
+
+# Seconds between write-buffer checks when the protocol offers no drain hook
+DRAIN_POLL_INTERVAL = 0.005
+
+
+# Identifies a file's content: (resolved path, mtime in ns, size)
+CacheKey = Tuple[str, int, int]
+
+# Files remembered as sent once, so a second send can be cached
+SEEN_KEYS_LIMIT = 1024
+
+
+def encoded_size(size: int) -> int:
+    """Bytes of CRLF-terminated base64 lines for ``size`` bytes of input."""
+    full_lines, remainder = divmod(size, 57)
+    return full_lines * 78 + (((remainder + 2) // 3) * 4 + 2 if remainder else 0)
+
+
+class EncodedAttachmentCache:
+    """
+    Size-bounded LRU cache of base64-encoded attachment bodies.
+
+    Entries are keyed by path, modification time and size, so an edited file
+    is re-encoded and its stale entry ages out. A file is only cached the
+    second time it is sent: caching means holding its whole encoding while
+    it is sent, so one-off attachments keep streaming a chunk at a time.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        Initialize the cache.
+
+        Args:
+            max_bytes: Total encoded bytes kept; larger files are never cached
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, bytes]" = OrderedDict()
+        self._seen: "OrderedDict[CacheKey, None]" = OrderedDict()
+
+    @staticmethod
+    def key_for(path: Path) -> CacheKey:
+        """Build the cache key for a file from its current metadata."""
+        stat = os.stat(path)
+        return (str(Path(path).resolve()), stat.st_mtime_ns, stat.st_size)
+
+    def accepts(self, key: CacheKey) -> bool:
+        """Whether a file of this key's size can be cached at all."""
+        return encoded_size(key[2]) <= self.max_bytes
+
+    def admit(self, key: CacheKey) -> bool:
+        """
+        Whether a missed file should be buffered and stored while it is sent.
+
+        The first miss only remembers the key; a file sent again is admitted
+        if it fits.
+        """
+        if key not in self._seen:
+            self._seen[key] = None
+            if len(self._seen) > SEEN_KEYS_LIMIT:
+                self._seen.popitem(last=False)
+            return False
+        del self._seen[key]
+        return self.accepts(key)
+
+    def get(self, key: CacheKey) -> Optional[bytes]:
+        """Return a cached encoding, marking it most recently used."""
+        data = self._entries.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: CacheKey, data: bytes) -> None:
+        """Store an encoding, evicting least recently used entries to fit."""
+        if len(data) > self.max_bytes or key in self._entries:
+            return
+        while self._entries and self.size + len(data) > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+        self._entries[key] = data
+        self.size += len(data)
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of cache usage."""
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class FileAttachment(MIMEBase):
+    """
+    Attachment part whose body is read from disk only while it is sent.
+
+    The part carries its headers like any other ``MIMEBase`` but no payload;
+    ``iter_message_bytes`` base64-encodes the file chunk by chunk instead.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        maintype: str = "application",
+        subtype: str = "octet-stream",
+        cache: Optional[EncodedAttachmentCache] = None
+    ):
+        """
+        Create the attachment part.
+
+        Args:
+            path: File to attach
+            maintype: MIME main type
+            subtype: MIME subtype
+            cache: Cache of encoded bodies shared across sends (optional)
+        """
+        super().__init__(maintype, subtype)
+        self.path = Path(path)
+        self.cache = cache
+        self["Content-Transfer-Encoding"] = "base64"
+        self.add_header("Content-Disposition", "attachment", filename=self.path.name)
+
+    def iter_encoded(self, chunk_size: int = ATTACHMENT_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Yield the file as CRLF-terminated base64 lines, one chunk at a time.
+
+        With a cache, a file already encoded by an earlier send is replayed
+        from memory, and a file sent again that is small enough to cache is
+        stored once fully encoded.
+        """
+        key = None
+        encoded: Optional[List[bytes]] = None
+        if self.cache is not None:
+            key = self.cache.key_for(self.path)
+            data = self.cache.get(key)
+            if data is not None:
+                step = encoded_size(chunk_size)
+                view = memoryview(data)
+                for start in range(0, len(data), step):
+                    yield bytes(view[start:start + step])
+                return
+            if self.cache.admit(key):
+                encoded = []
+
+        traced = tracing.is_tracing()
+        with open(self.path, "rb") as f:
+            while True:
+                started = time.perf_counter() if traced else 0.0
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                lines = base64.encodebytes(chunk).replace(b"\n", CRLF)
+                if traced:
+                    tracing.add_time("attachment_encoding", time.perf_counter() - started)
+                if encoded is not None:
+                    encoded.append(lines)
+                yield lines
+
+        if encoded is not None:
+            self.cache.put(key, b"".join(encoded))
+
+
+def has_file_attachments(message: Message) -> bool:
+    """Whether a message contains parts that must be streamed."""
+    return any(isinstance(part, FileAttachment) for part in message.walk())
+
+
+def render_message(message: Message) -> bytes:
+    """
+    Flatten a message without file attachments to CRLF-terminated bytes.
+
+    Large messages are rendered in the CPU worker pool; the result can be
+    passed to ``send_streaming`` as is.
+    """
+    return message.as_bytes(policy=message.policy.clone(linesep="\r\n"))
+
+
+def iter_rendered_bytes(data: bytes, chunk_size: int = DATA_CHUNK_SIZE) -> Iterator[bytes]:
+    """Split an already rendered message into DATA-sized chunks."""
+    for start in range(0, len(data), chunk_size):
+        yield data[start:start + chunk_size]
+
+
+def _header_bytes(part: Message) -> bytes:
+    """Serialize a part's header block, including the blank separator line."""
+    policy = part.policy.clone(linesep="\r\n")
+    return b"".join(policy.fold_binary(name, value) for name, value in part.items()) + CRLF
+
+
+def iter_message_bytes(message: Message) -> Iterator[bytes]:
+    """
+    Serialize a message as CRLF-terminated chunks without buffering attachments.
+
+    Multipart containers and ``FileAttachment`` parts are written piecewise;
+    every other leaf part is small and is serialized by the stdlib generator.
+
+    Args:
+        message: The MIME message to serialize
+
+    Yields:
+        Consecutive pieces of the wire-format message
+    """
+    if isinstance(message, FileAttachment):
+        yield _header_bytes(message)
+        yield from message.iter_encoded()
+        return
+
+    if not message.is_multipart():
+        data = message.as_bytes(policy=message.policy.clone(linesep="\r\n"))
+        yield data if data.endswith(CRLF) else data + CRLF
+        return
+
+    boundary = message.get_boundary()
+    if boundary is None:
+        boundary = "=" * 15 + uuid.uuid4().hex + "=="
+        message.set_boundary(boundary)
+    delimiter = f"--{boundary}".encode()
+
+    yield _header_bytes(message)
+    if message.preamble:
+        yield message.preamble.encode() + CRLF
+    for part in message.get_payload():
+        yield delimiter + CRLF
+        yield from iter_message_bytes(part)
+    yield delimiter + b"--" + CRLF
+    if message.epilogue:
+        yield message.epilogue.encode() + CRLF
+
+
+async def send_streaming(
+    smtp: aiosmtplib.SMTP,
+    message: Union[Message, bytes],
+    sender: str,
+    recipients: List[str],
+    on_data_end: Optional[Callable[[], None]] = None
+) -> Tuple[Dict[str, aiosmtplib.SMTPResponse], str]:
+    """
+    Send a message, writing its body straight into the DATA stream.
+
+    Peak memory per send is one attachment chunk plus its encoding, instead
+    of the whole flattened message; only an attachment sent a second time
+    is collected whole, into the ``EncodedAttachmentCache``. Writes wait on transport flow control,
+    so a slow server applies backpressure to the file reads. Rendered
+    messages are written a chunk at a time too, so dot-stuffing a large one
+    never holds the event loop for long.
+
+    Args:
+        smtp: Connected, authenticated SMTP client
+        message: The MIME message to send, or its CRLF-terminated bytes
+            from ``render_message``
+        sender: Envelope sender
+        recipients: Envelope recipients
+        on_data_end: Called just before the terminating dot is written;
+            from then on the server may have accepted the message
+
+    Returns:
+        Refused recipients and the final server reply, like ``SMTP.sendmail``
+    """
+    try:
+        await smtp.mail(sender)
+        errors: Dict[str, aiosmtplib.SMTPResponse] = {}
+        for recipient in recipients:
+            try:
+                await smtp.rcpt(recipient)
+            except aiosmtplib.SMTPRecipientRefused as e:
+                errors[e.recipient] = aiosmtplib.SMTPResponse(e.code, e.message)
+        if len(errors) == len(recipients):
+            raise aiosmtplib.SMTPRecipientsRefused([
+                aiosmtplib.SMTPRecipientRefused(response.code, response.message, recipient)
+                for recipient, response in errors.items()
+            ])
+        response = await _stream_data(smtp, message, on_data_end)
+    except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+        try:
+            await smtp.rset()
+        except (ConnectionError, aiosmtplib.SMTPException):
+            pass
+        raise
+    return errors, response.message
+
+
+async def _stream_data(
+    smtp: aiosmtplib.SMTP,
+    message: Union[Message, bytes],
+    on_data_end: Optional[Callable[[], None]] = None
+) -> aiosmtplib.SMTPResponse:
+    """Run the DATA command, writing the message chunk by chunk."""
+    protocol = smtp.protocol
+    if protocol is None:
+        raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+
+    sent = 0
+    try:
+        with SMTP_PHASE_SECONDS.time("data"):
+            protocol.write(b"DATA" + CRLF)
+            response = await protocol.read_response(timeout=smtp.timeout)
+            if response.code != aiosmtplib.SMTPStatus.start_input:
+                raise aiosmtplib.SMTPDataError(response.code, response.message)
+
+            at_line_start = True
+            if isinstance(message, bytes):
+                chunks = iter_rendered_bytes(message)
+            else:
+                chunks = iter_message_bytes(message)
+            for chunk in chunks:
+                if not chunk:
+                    continue
+                stuffed = PERIOD_RE.sub(b"..", chunk)
+                if not at_line_start and chunk.startswith(b"."):
+                    stuffed = stuffed[1:]
+                at_line_start = chunk.endswith(b"\n")
+                protocol.write(stuffed)
+                sent += len(stuffed)
+                await _drain(protocol)
+
+            if on_data_end is not None:
+                on_data_end()
+            protocol.write(b"." + CRLF if at_line_start else CRLF + b"." + CRLF)
+            response = await protocol.read_response(timeout=smtp.timeout)
+            if response.code != aiosmtplib.SMTPStatus.completed:
+                raise aiosmtplib.SMTPDataError(response.code, response.message)
+    except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPTimeoutError, ConnectionError):
+        smtp.close()
+        raise
+    BYTES_TOTAL.inc("smtp", "sent", amount=sent)
+    return response
+
+
+async def _drain(protocol: SMTPProtocol) -> None:
+    """
+    Wait until the transport accepts more data.
+
+    Uses the flow-control hook StreamWriter.drain() relies on, which
+    aiosmtplib's protocol inherits today; it is private, so if a release
+    drops it the transport's write buffer is polled down to its low-water
+    mark instead.
+    """
+    drain_helper = getattr(protocol, "_drain_helper", None)
+    if drain_helper is not None:
+        await drain_helper()
+        return
+    transport = protocol.transport
+    if transport is None:
+        raise aiosmtplib.SMTPServerDisconnected("Connection lost")
+    low_water, _ = transport.get_write_buffer_limits()
+    while transport.get_write_buffer_size() > low_water:
+        if transport.is_closing():
+            raise ConnectionResetError("Connection lost")
+        await asyncio.sleep(DRAIN_POLL_INTERVAL)
@@ -0,0 +1,192 @@
+"""
+Durable SQLite-backed queue of outbound messages.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, next_attempt_at);
+"""
+
+# Delivery states stored in the ``status`` column
+STATUS_QUEUED = "queued"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+# Name of the database file inside the queue directory
+QUEUE_FILENAME = "outbox.db"
+
+
+def _timestamp(value: Optional[float]) -> Optional[str]:
+    """Format a stored epoch time as an ISO 8601 UTC string."""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=timezone.utc).isoformat()
+
+
+class OutboundQueue:
+    """
+    Append-mostly store of messages waiting to be sent.
+
+    Every state change is committed before it is acted on, so a message is
+    never lost on restart. Messages that were mid-send when the process died
+    are put back in the queue when the store is reopened; delivery is
+    therefore at-least-once.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            directory: Directory holding ``outbox.db``
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, QUEUE_FILENAME)
+        self._db = sqlite3.connect(self.path)
+        self._db.executescript(SCHEMA)
+        with self._db:
+            self._db.execute(
+                "UPDATE outbox SET status = ? WHERE status = ?",
+                (STATUS_QUEUED, STATUS_SENDING)
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._db.close()
+
+    def enqueue(self, payload: Dict[str, Any]) -> str:
+        """
+        Add a message to the queue.
+
+        Args:
+            payload: JSON-serializable send arguments
+
+        Returns:
+            The new message ID
+        """
+        message_id = uuid.uuid4().hex
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                "INSERT INTO outbox (id, payload, status, created_at, updated_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (message_id, json.dumps(payload, ensure_ascii=False), STATUS_QUEUED, now, now, now)
+            )
+        return message_id
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """
+        Take the oldest message that is due and mark it as being sent.
+
+        Returns:
+            Dictionary with ``id``, ``payload`` and ``attempts`` (including
+            this one), or None if nothing is due
+        """
+        now = time.time()
+        row = self._db.execute(
+            "SELECT id, payload, attempts FROM outbox WHERE status = ? AND next_attempt_at <= ? "
+            "ORDER BY next_attempt_at, created_at LIMIT 1",
+            (STATUS_QUEUED, now)
+        ).fetchone()
+        if row is None:
+            return None
+        message_id, payload, attempts = row
+        with self._db:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, updated_at = ? WHERE id = ?",
+                (STATUS_SENDING, attempts + 1, now, message_id)
+            )
+        return {"id": message_id, "payload": json.loads(payload), "attempts": attempts + 1}
+
+    def mark_sent(self, message_id: str) -> None:
+        """Record a successful delivery."""
+        self._update(message_id, STATUS_SENT, None)
+
+    def mark_failed(self, message_id: str, error: str) -> None:
+        """Record a permanent failure."""
+        self._update(message_id, STATUS_FAILED, error)
+
+    def mark_retry(self, message_id: str, error: str, delay: float) -> None:
+        """
+        Put a message back in the queue after a transient failure.
+
+        Args:
+            message_id: Message ID
+            error: Error from the failed attempt
+            delay: Seconds to wait before the next attempt
+        """
+        self._update(message_id, STATUS_QUEUED, error, next_attempt_at=time.time() + delay)
+
+    def _update(
+        self,
+        message_id: str,
+        status: str,
+        error: Optional[str],
+        next_attempt_at: Optional[float] = None
+    ) -> None:
+        """Change a message's status."""
+        now = time.time()
+        with self._db:
+            self._db.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, updated_at = ?, "
+                "next_attempt_at = COALESCE(?, next_attempt_at) WHERE id = ?",
+                (status, error, now, next_attempt_at, message_id)
+            )
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a message's delivery state.
+
+        Args:
+            message_id: Message ID returned by ``enqueue``
+
+        Returns:
+            Delivery state, or None if the ID is unknown
+        """
+        row = self._db.execute(
+            "SELECT status, attempts, last_error, created_at, updated_at, next_attempt_at, payload "
+            "FROM outbox WHERE id = ?",
+            (message_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, attempts, last_error, created_at, updated_at, next_attempt_at, payload = row
+        payload = json.loads(payload)
+        return {
+            "id": message_id,
+            "status": status,
+            "attempts": attempts,
+            "last_error": last_error,
+            "recipient": payload.get("recipient"),
+            "subject": payload.get("subject"),
+            "created_at": _timestamp(created_at),
+            "updated_at": _timestamp(updated_at),
+            "next_attempt_at": _timestamp(next_attempt_at) if status == STATUS_QUEUED else None
+        }
+
+    def pending_count(self) -> int:
+        """Number of messages not yet sent or failed."""
+        (count,) = self._db.execute(
+            "SELECT COUNT(*) FROM outbox WHERE status IN (?, ?)",
+            (STATUS_QUEUED, STATUS_SENDING)
+        ).fetchone()
+        return count
@@ -0,0 +1,236 @@
+"""
+Minimal asyncio POP3 client (RFC 1939, RFC 2449 PIPELINING).
+"""
+
+import asyncio
+import ssl
+from typing import Dict, List, Optional, Set
+
+
+CRLF = b"\r\n"
+TERMINATOR = b"\r\n.\r\n"
+
+# Largest multi-line response (e.g. one RETR) buffered by the stream reader
+MAX_RESPONSE_BYTES = 64 * 1024 * 1024
+
+
+class POP3Error(Exception):
+    """Raised when the server answers -ERR or the session breaks."""
+
+
+class POP3ConnectionError(POP3Error):
+    """
+    Raised when the connection times out or closes mid-response.
+
+    The position in the response stream is unknown afterwards, so the
+    session cannot be used for further commands.
+    """
+
+
+class POP3Client:
+    """
+    Non-blocking POP3 client built on asyncio streams.
+
+    Multi-line responses are read as a single buffer up to the ``.``
+    terminator and un-dot-stuffed in one pass, instead of being assembled
+    line by line. When the server advertises PIPELINING, ``fetch_many``
+    sends a window of TOP/RETR commands before reading their responses.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        use_ssl: bool = True,
+        timeout: float = 30.0
+    ):
+        """
+        Initialize the client. No connection is opened until ``connect``.
+
+        Args:
+            host: POP3 server hostname
+            port: POP3 server port
+            use_ssl: Connect with implicit TLS (POP3S)
+            timeout: Seconds to wait for any single response
+        """
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.capabilities: Set[str] = set()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self) -> str:
+        """
+        Open the connection and read the greeting.
+
+        Returns:
+            The server greeting
+        """
+        ssl_context = ssl.create_default_context() if self.use_ssl else None
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(
+                self.host, self.port, ssl=ssl_context, limit=MAX_RESPONSE_BYTES
+            ),
+            self.timeout
+        )
+        return await self._read_status()
+
+    async def login(self, username: str, password: str) -> None:
+        """Authenticate with USER/PASS and discover capabilities."""
+        await self._command(f"USER {username}")
+        await self._command(f"PASS {password}")
+        try:
+            lines = (await self._command_multiline("CAPA")).split(CRLF)
+            self.capabilities = {
+                line.split(b" ", 1)[0].decode(errors="ignore").upper()
+                for line in lines if line
+            }
+        except POP3ConnectionError:
+            raise
+        except POP3Error:
+            self.capabilities = set()
+
+    async def list(self) -> Dict[int, int]:
+        """Return message sizes keyed by message number."""
+        data = await self._command_multiline("LIST")
+        return {
+            int(number): int(size)
+            for number, size in (line.split()[:2] for line in data.split(CRLF) if line)
+        }
+
+    async def uidl(self) -> Optional[Dict[int, str]]:
+        """Return unique ids keyed by message number, or None if unsupported."""
+        try:
+            data = await self._command_multiline("UIDL")
+        except POP3ConnectionError:
+            raise
+        except POP3Error:
+            return None
+        return {
+            int(number): uid.decode(errors="ignore")
+            for number, uid in (line.split()[:2] for line in data.split(CRLF) if line)
+        }
+
+    async def retr(self, number: int) -> bytes:
+        """Retrieve a full message."""
+        return await self._command_multiline(f"RETR {number}")
+
+    async def top(self, number: int, lines: int = 0) -> bytes:
+        """Retrieve a message's headers and its first ``lines`` body lines."""
+        return await self._command_multiline(f"TOP {number} {lines}")
+
+    async def fetch_many(
+        self,
+        numbers: List[int],
+        top_lines: Optional[int] = None,
+        window: int = 20
+    ) -> Dict[int, bytes]:
+        """
+        Retrieve several messages, pipelining commands when supported.
+
+        Args:
+            numbers: Message numbers to fetch
+            top_lines: Use ``TOP n top_lines`` instead of ``RETR``
+            window: Commands in flight at once when pipelining
+
+        Returns:
+            Raw messages keyed by message number (messages the server
+            refuses with -ERR are omitted)
+
+        Raises:
+            POP3ConnectionError: If the connection breaks; the remaining
+                pipelined responses cannot be matched to their commands
+        """
+        def command(number: int) -> str:
+            if top_lines is None:
+                return f"RETR {number}"
+            return f"TOP {number} {top_lines}"
+
+        if "PIPELINING" not in self.capabilities:
+            window = 1
+
+        results: Dict[int, bytes] = {}
+        for start in range(0, len(numbers), max(1, window)):
+            batch = numbers[start:start + window]
+            self._writer.write(b"".join(command(number).encode() + CRLF for number in batch))
+            await self._writer.drain()
+            for number in batch:
+                try:
+                    await self._read_status()
+                except POP3ConnectionError:
+                    raise
+                except POP3Error:
+                    continue
+                results[number] = await self._read_multiline()
+        return results
+
+    async def quit(self) -> None:
+        """Send QUIT and close the connection."""
+        try:
+            await self._command("QUIT")
+        finally:
+            await self.close()
+
+    async def close(self) -> None:
+        """Close the connection without QUIT."""
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _command(self, line: str) -> str:
+        """Send a command and read its single-line status."""
+        self._writer.write(line.encode() + CRLF)
+        await self._writer.drain()
+        return await self._read_status()
+
+    async def _command_multiline(self, line: str) -> bytes:
+        """Send a command and read its multi-line response body."""
+        await self._command(line)
+        return await self._read_multiline()
+
+    async def _read_status(self) -> str:
+        """Read a ``+OK``/``-ERR`` status line."""
+        try:
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+        except asyncio.TimeoutError:
+            raise POP3ConnectionError("Timed out waiting for POP3 server")
+        if not line:
+            raise POP3ConnectionError("POP3 server closed the connection")
+        text = line.rstrip(CRLF).decode(errors="ignore")
+        if not text.startswith("+OK"):
+            raise POP3Error(text)
+        return text
+
+    async def _read_multiline(self) -> bytes:
+        """Read a dot-terminated response body as one buffer."""
+        try:
+            first = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if first == b"." + CRLF:
+                return b""
+            # The first line's CRLF is already consumed, so the terminator is
+            # looked for in everything read so far; ".\r\n" ending a data line
+            # just means one more read. Nothing past the terminator is read,
+            # which keeps pipelined responses apart.
+            buffer = bytearray(first)
+            while not buffer.endswith(TERMINATOR):
+                buffer += await asyncio.wait_for(
+                    self._reader.readuntil(b"." + CRLF), self.timeout
+                )
+        except asyncio.TimeoutError:
+            raise POP3ConnectionError("Timed out waiting for POP3 server")
+        except asyncio.IncompleteReadError:
+            raise POP3ConnectionError("POP3 server closed the connection")
+        except asyncio.LimitOverrunError:
+            raise POP3ConnectionError("POP3 response exceeds the maximum supported size")
+
+        # Drop the terminator and undo dot-stuffing (RFC 1939, section 3)
+        data = bytes(buffer[:-len(TERMINATOR) + 2])
+        if data.startswith(b".."):
+            data = data[1:]
+        return data.replace(b"\r\n..", b"\r\n.")
@@ -0,0 +1,206 @@
+"""
+Token-bucket rate limiting of outbound mail per SMTP account.
+"""
+
+import asyncio
+import math
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class ProviderLimits(NamedTuple):
+    """Send limits for an SMTP provider."""
+
+    per_minute: float
+    burst: int
+    per_day: Optional[int]
+
+
+# Conservative defaults for well-known providers, matched on the SMTP host
+# suffix. Daily caps count recipients, as the providers do.
+PROVIDER_LIMITS: Dict[str, ProviderLimits] = {
+    "gmail.com": ProviderLimits(per_minute=20, burst=10, per_day=500),
+    "office365.com": ProviderLimits(per_minute=30, burst=10, per_day=10000),
+    "outlook.com": ProviderLimits(per_minute=30, burst=10, per_day=300),
+    "yahoo.com": ProviderLimits(per_minute=20, burst=5, per_day=500),
+    "kakao.com": ProviderLimits(per_minute=20, burst=5, per_day=None),
+    "daum.net": ProviderLimits(per_minute=20, burst=5, per_day=None),
+}
+
+DEFAULT_LIMITS = ProviderLimits(per_minute=60, burst=10, per_day=None)
+
+
+def provider_limits(hostname: str) -> ProviderLimits:
+    """Return the default limits for an SMTP host."""
+    hostname = hostname.lower().rstrip(".")
+    for suffix, limits in PROVIDER_LIMITS.items():
+        if hostname == suffix or hostname.endswith("." + suffix):
+            return limits
+    return DEFAULT_LIMITS
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a send would have to wait longer than allowed."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Send rate limit reached, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Bucket of ``capacity`` tokens refilled continuously at ``rate`` per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Create a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Maximum tokens held (the burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last update."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay_for(self, tokens: float) -> float:
+        """
+        Seconds until ``tokens`` can be taken.
+
+        Requests larger than the bucket are treated as a full bucket so they
+        are delayed rather than blocked forever.
+        """
+        self._refill()
+        tokens = min(tokens, self.capacity)
+        if self.tokens >= tokens:
+            return 0.0
+        if self.rate <= 0:
+            return math.inf
+        return (tokens - self.tokens) / self.rate
+
+    def consume(self, tokens: float) -> None:
+        """Take tokens; the balance may go negative for oversized requests."""
+        self._refill()
+        self.tokens -= tokens
+
+
+class SendRateLimiter:
+    """
+    Limits one account to a sustained per-minute message rate with bursts,
+    and optionally to a daily recipient budget.
+    """
+
+    def __init__(
+        self,
+        per_minute: float,
+        burst: int,
+        per_day: Optional[int] = None,
+        max_wait: float = 60.0
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            per_minute: Sustained messages per minute
+            burst: Messages that may be sent back to back
+            per_day: Recipients per rolling day (None or 0 for no cap)
+            max_wait: Longest a send may be delayed before RateLimitExceeded
+        """
+        self.per_minute = per_minute
+        self.burst = burst
+        self.per_day = per_day or None
+        self.max_wait = max_wait
+        self._messages = TokenBucket(per_minute / 60.0, burst)
+        self._recipients = TokenBucket(per_day / 86400.0, per_day) if per_day else None
+        self._lock = asyncio.Lock()
+
+    def _buckets(self, recipients: int) -> List[Tuple[TokenBucket, int]]:
+        """Buckets charged for one message and what each is charged."""
+        buckets = [(self._messages, 1)]
+        if self._recipients is not None:
+            buckets.append((self._recipients, recipients))
+        return buckets
+
+    async def acquire(self, recipients: int = 1) -> float:
+        """
+        Wait until one message to ``recipients`` addresses may be sent.
+
+        Callers are served in arrival order.
+
+        Args:
+            recipients: Number of envelope recipients
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitExceeded: If the wait would exceed ``max_wait``
+        """
+        started = time.monotonic()
+        async with self._lock:
+            while True:
+                delay = max(bucket.delay_for(tokens) for bucket, tokens in self._buckets(recipients))
+                if delay <= 0:
+                    break
+                if time.monotonic() - started + delay > self.max_wait:
+                    raise RateLimitExceeded(delay)
+                await asyncio.sleep(delay)
+            for bucket, tokens in self._buckets(recipients):
+                bucket.consume(tokens)
+        return time.monotonic() - started
+
+
+class RateLimiterManager:
+    """Keeps one ``SendRateLimiter`` per SMTP account."""
+
+    def __init__(
+        self,
+        per_minute: Optional[float] = None,
+        burst: Optional[int] = None,
+        per_day: Optional[int] = None,
+        max_wait: float = 60.0
+    ):
+        """
+        Initialize the manager. Limits left as None use the provider defaults.
+
+        Args:
+            per_minute: Sustained messages per minute
+            burst: Messages that may be sent back to back
+            per_day: Recipients per rolling day (0 for no cap)
+            max_wait: Longest a send may be delayed before RateLimitExceeded
+        """
+        self.per_minute = per_minute
+        self.burst = burst
+        self.per_day = per_day
+        self.max_wait = max_wait
+        self._limiters: Dict[Tuple[str, str], SendRateLimiter] = {}
+
+    def get_limiter(self, hostname: str, username: str) -> SendRateLimiter:
+        """
+        Get the limiter for an account, creating it if needed.
+
+        Args:
+            hostname: SMTP server hostname
+            username: SMTP login
+
+        Returns:
+            The account's rate limiter
+        """
+        key = (hostname.lower(), username.lower())
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            defaults = provider_limits(hostname)
+            limiter = SendRateLimiter(
+                per_minute=self.per_minute if self.per_minute is not None else defaults.per_minute,
+                burst=self.burst if self.burst is not None else defaults.burst,
+                per_day=self.per_day if self.per_day is not None else defaults.per_day,
+                max_wait=self.max_wait
+            )
+            self._limiters[key] = limiter
+        return limiter
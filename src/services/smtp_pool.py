@@ -0,0 +1,410 @@
+"""
+Bounded asynchronous SMTP connection pool.
+"""
+
+import asyncio
+import logging
+import socket
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import AsyncIterator, Callable, Dict, List, Tuple, Union
+
+import aiosmtplib
+
+from . import tracing
+from .metrics import BYTES_TOTAL, MESSAGES_TOTAL, SMTP_PHASE_SECONDS
+from .mime_stream import DATA_CHUNK_SIZE, has_file_attachments, send_streaming
+
+logger = logging.getLogger(__name__)
+
+# SMTP reply code for "service not available, closing transmission channel"
+SMTP_SERVICE_UNAVAILABLE = 421
+
+
+class PooledSMTPConnection:
+    """An authenticated SMTP connection owned by a pool."""
+
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        """Wrap a connected SMTP client with usage bookkeeping."""
+        self.smtp = smtp
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.messages_sent = 0
+        # Set once the current message's data may have reached the server
+        self.data_sent = False
+
+    @property
+    def idle_for(self) -> float:
+        """Seconds since the connection was last used."""
+        return time.monotonic() - self.last_used
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether the underlying transport is still open."""
+        return self.smtp.is_connected
+
+    def _mark_data_sent(self) -> None:
+        """Record that the message may have been handed to the server."""
+        self.data_sent = True
+
+
+class SMTPConnectionPool:
+    """
+    Pool of authenticated SMTP connections to a single server.
+
+    At most ``max_size`` connections are open at once. Idle connections are
+    reused LIFO, health-checked with NOOP when they have been idle for longer
+    than ``health_check_interval`` and closed after ``idle_timeout`` (never
+    shrinking below ``min_size``). A connection is retired once it has sent
+    ``max_messages_per_connection`` messages.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        use_tls: bool = False,
+        start_tls: bool = False,
+        min_size: int = 0,
+        max_size: int = 5,
+        idle_timeout: float = 60.0,
+        max_messages_per_connection: int = 100,
+        health_check_interval: float = 15.0
+    ):
+        """
+        Initialize the pool. No connection is opened until first use.
+
+        Args:
+            hostname: SMTP server hostname
+            port: SMTP server port
+            username: Username for AUTH (skipped when empty)
+            password: Password for AUTH
+            use_tls: Connect with implicit TLS (port 465)
+            start_tls: Upgrade the connection with STARTTLS
+            min_size: Connections to keep open even when idle
+            max_size: Maximum number of simultaneously open connections
+            idle_timeout: Seconds after which an idle connection is closed
+            max_messages_per_connection: Messages sent before a connection is recycled
+            health_check_interval: Idle seconds after which NOOP is sent before reuse
+        """
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_messages_per_connection = max_messages_per_connection
+        self.health_check_interval = health_check_interval
+
+        self._idle: List[PooledSMTPConnection] = []
+        self._slots = asyncio.Semaphore(max_size)
+        self._warm_lock = asyncio.Lock()
+        self._in_use = 0
+        self._warmed = False
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, idle or checked out."""
+        return self._in_use + len(self._idle)
+
+    @property
+    def in_use(self) -> int:
+        """Number of connections currently checked out."""
+        return self._in_use
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of pool occupancy."""
+        return {
+            "size": self.size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "max_size": self.max_size
+        }
+
+    async def _connect(self) -> PooledSMTPConnection:
+        """Open and authenticate a new SMTP connection."""
+        if tracing.is_tracing():
+            await self._trace_dns()
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=False
+        )
+        # STARTTLS and AUTH run separately so each is timed as its own phase
+        with SMTP_PHASE_SECONDS.time("connect"):
+            await smtp.connect()
+        try:
+            if self.start_tls:
+                with SMTP_PHASE_SECONDS.time("tls"):
+                    await smtp.starttls()
+            if self.username:
+                with SMTP_PHASE_SECONDS.time("auth"):
+                    await smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        conn = PooledSMTPConnection(smtp)
+        smtp.data = self._timed_data(smtp.data, conn._mark_data_sent)
+        logger.debug(f"Opened SMTP connection to {self.hostname}:{self.port}")
+        return conn
+
+    async def _trace_dns(self) -> None:
+        """
+        Resolve the server name as its own trace span.
+
+        Only done while tracing: connect() resolves the name again, normally
+        from the resolver's cache, so the lookup cost shows up here.
+        """
+        with tracing.span("smtp.dns"):
+            try:
+                await asyncio.get_running_loop().getaddrinfo(
+                    self.hostname, self.port, type=socket.SOCK_STREAM
+                )
+            except OSError:
+                # connect() reports the failure
+                pass
+
+    @staticmethod
+    def _timed_data(data, on_data: Callable[[], None]):
+        """
+        Wrap ``SMTP.data`` to time the DATA phase and count message bytes.
+
+        ``on_data`` is called first: once DATA starts, the terminating dot
+        may reach the server before any failure is seen.
+        """
+        async def timed_data(message, *args, **kwargs):
+            on_data()
+            with SMTP_PHASE_SECONDS.time("data"):
+                response = await data(message, *args, **kwargs)
+            BYTES_TOTAL.inc("smtp", "sent", amount=len(message))
+            return response
+        return timed_data
+
+    async def _disconnect(self, conn: PooledSMTPConnection) -> None:
+        """Close a connection, politely if it is still alive."""
+        try:
+            if conn.is_connected:
+                await conn.smtp.quit()
+        except Exception:
+            conn.smtp.close()
+
+    async def _warm_up(self) -> None:
+        """
+        Open ``min_size`` connections on first use.
+
+        Runs before the first slot is handed out, and concurrent first
+        callers wait for it, so warm connections and connections opened by
+        checkouts together never exceed ``max_size``.
+        """
+        async with self._warm_lock:
+            if self._warmed:
+                return
+            try:
+                for _ in range(self.min_size - self.size):
+                    try:
+                        self._idle.append(await self._connect())
+                    except Exception as e:
+                        logger.warning(f"SMTP pool warm-up failed: {str(e)}")
+                        break
+            finally:
+                self._warmed = True
+
+    async def _prune_idle(self) -> None:
+        """Close idle connections past ``idle_timeout``, keeping ``min_size``."""
+        keep: List[PooledSMTPConnection] = []
+        expired: List[PooledSMTPConnection] = []
+        # Oldest connections sit at the front of the LIFO stack
+        for conn in self._idle:
+            if (
+                conn.idle_for > self.idle_timeout
+                and self.size - len(expired) > self.min_size
+            ):
+                expired.append(conn)
+            else:
+                keep.append(conn)
+        self._idle = keep
+        for conn in expired:
+            await self._disconnect(conn)
+
+    async def _is_healthy(self, conn: PooledSMTPConnection) -> bool:
+        """Check an idle connection before handing it out."""
+        if not conn.is_connected:
+            return False
+        if conn.idle_for < self.health_check_interval:
+            return True
+        try:
+            response = await conn.smtp.noop()
+            return response.code == 250
+        except Exception:
+            return False
+
+    async def acquire(self) -> PooledSMTPConnection:
+        """
+        Check a connection out of the pool, opening one if none is idle.
+
+        Returns:
+            A connected, authenticated pooled connection
+        """
+        if self._closed:
+            raise RuntimeError("SMTP connection pool is closed")
+
+        if not self._warmed:
+            await self._warm_up()
+        await self._slots.acquire()
+        try:
+            await self._prune_idle()
+
+            while self._idle:
+                conn = self._idle.pop()
+                if await self._is_healthy(conn):
+                    self._in_use += 1
+                    return conn
+                await self._disconnect(conn)
+
+            conn = await self._connect()
+            self._in_use += 1
+            return conn
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn: PooledSMTPConnection, discard: bool = False) -> None:
+        """
+        Return a connection to the pool.
+
+        Args:
+            conn: Connection previously returned by ``acquire``
+            discard: Close the connection instead of keeping it for reuse
+        """
+        self._in_use -= 1
+        try:
+            conn.last_used = time.monotonic()
+            retire = (
+                discard
+                or self._closed
+                or not conn.is_connected
+                or conn.messages_sent >= self.max_messages_per_connection
+            )
+            if retire:
+                await self._disconnect(conn)
+            else:
+                self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[PooledSMTPConnection]:
+        """Context manager that checks a connection out and back in.
+
+        The connection is discarded if the block fails, unless the server
+        merely refused the message (see ``_keeps_connection``).
+        """
+        conn = await self.acquire()
+        discard = False
+        try:
+            yield conn
+        except BaseException as e:
+            discard = not self._keeps_connection(e)
+            raise
+        finally:
+            await self.release(conn, discard=discard)
+
+    async def send_message(
+        self,
+        message: Union[Message, bytes],
+        sender: str,
+        recipients: List[str]
+    ) -> Tuple[Dict[str, aiosmtplib.SMTPResponse], str]:
+        """
+        Send a message over a pooled connection.
+
+        A stale connection (server disconnect or 421) is discarded and the
+        send is retried once on a fresh one. A disconnect is only retried if
+        it happened before the message data could have reached the server;
+        after that the message may have been delivered, and sending it again
+        would duplicate it.
+        Messages with ``FileAttachment`` parts are streamed into DATA rather
+        than flattened in memory; rendered messages larger than one DATA
+        chunk are written chunk by chunk.
+
+        Args:
+            message: The MIME message to send, or its bytes from
+                ``render_message``
+            sender: Envelope sender
+            recipients: Envelope recipients
+
+        Returns:
+            Refused recipients and the final server reply, as returned by
+            aiosmtplib ``send_message``
+        """
+        retried = False
+        while True:
+            with tracing.span("smtp.pool_acquire"):
+                conn = await self.acquire()
+            conn.data_sent = False
+            try:
+                with tracing.span("smtp.transaction"):
+                    if isinstance(message, bytes) and len(message) <= DATA_CHUNK_SIZE:
+                        result = await conn.smtp.sendmail(sender, recipients, message)
+                    elif isinstance(message, bytes) or has_file_attachments(message):
+                        result = await send_streaming(
+                            conn.smtp, message, sender, recipients, on_data_end=conn._mark_data_sent
+                        )
+                    else:
+                        result = await conn.smtp.send_message(
+                            message, sender=sender, recipients=recipients
+                        )
+            except (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPResponseException) as e:
+                await self.release(conn, discard=not self._keeps_connection(e))
+                if retried or not self._is_retryable(e, conn.data_sent):
+                    raise
+                logger.info(f"SMTP connection dropped ({str(e)}), reconnecting")
+                retried = True
+                continue
+            except BaseException as e:
+                await self.release(conn, discard=not self._keeps_connection(e))
+                raise
+            conn.messages_sent += 1
+            MESSAGES_TOTAL.inc("smtp", "sent")
+            await self.release(conn)
+            return result
+
+    @staticmethod
+    def _keeps_connection(error: BaseException) -> bool:
+        """
+        Whether a connection is still reusable after ``error``.
+
+        A refused sender, recipient or message is an ordinary reply; the
+        envelope has been reset with RSET and the session is fine. Anything
+        else (disconnects, timeouts, 421, cancellation mid-transaction)
+        leaves the session in an unknown state.
+        """
+        if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+            return True
+        return (
+            isinstance(error, aiosmtplib.SMTPResponseException)
+            and error.code != SMTP_SERVICE_UNAVAILABLE
+        )
+
+    @staticmethod
+    def _is_retryable(error: Exception, data_sent: bool = False) -> bool:
+        """Whether an error means the connection, not the message, was at
+        fault, and resending cannot deliver the message twice."""
+        if isinstance(error, aiosmtplib.SMTPServerDisconnected):
+            return not data_sent
+        return getattr(error, "code", None) == SMTP_SERVICE_UNAVAILABLE
+
+    async def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await self._disconnect(conn)
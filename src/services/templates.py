@@ -0,0 +1,157 @@
+"""
+Email templates compiled once and rendered per recipient.
+"""
+
+import html
+import re
+import uuid
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+# Placeholders look like {{ name }}
+PLACEHOLDER_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+
+class TemplateError(Exception):
+    """Raised when a template cannot be rendered."""
+
+
+class CompiledTemplate:
+    """
+    A template string split into literal text and placeholder names.
+
+    Parsing happens once; rendering is a single join over the pieces.
+    """
+
+    def __init__(self, source: str):
+        """
+        Compile a template.
+
+        Args:
+            source: Template text containing ``{{ name }}`` placeholders
+        """
+        self.source = source
+        self._pieces: List[Tuple[bool, str]] = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(source):
+            if match.start() > position:
+                self._pieces.append((False, source[position:match.start()]))
+            self._pieces.append((True, match.group(1)))
+            position = match.end()
+        if position < len(source):
+            self._pieces.append((False, source[position:]))
+        self.variables: FrozenSet[str] = frozenset(
+            text for is_field, text in self._pieces if is_field
+        )
+
+    def render(
+        self,
+        variables: Dict[str, Any],
+        escape: Optional[Callable[[str], str]] = None
+    ) -> str:
+        """
+        Substitute variables into the template.
+
+        Args:
+            variables: Values for the placeholders
+            escape: Optional function applied to every substituted value
+
+        Returns:
+            The rendered text
+
+        Raises:
+            TemplateError: If a placeholder has no value
+        """
+        missing = self.variables - variables.keys()
+        if missing:
+            raise TemplateError(f"Missing template variables: {', '.join(sorted(missing))}")
+        parts = []
+        for is_field, text in self._pieces:
+            if is_field:
+                value = "" if variables[text] is None else str(variables[text])
+                parts.append(escape(value) if escape else value)
+            else:
+                parts.append(text)
+        return "".join(parts)
+
+
+class MailTemplate:
+    """A registered subject and body template pair."""
+
+    def __init__(self, template_id: str, subject: str, body: str, is_html: bool = False):
+        """
+        Compile the subject and body.
+
+        Args:
+            template_id: Registry key
+            subject: Subject template
+            body: Body template
+            is_html: Whether the body is HTML (substituted values are escaped)
+        """
+        self.template_id = template_id
+        self.subject = CompiledTemplate(subject)
+        self.body = CompiledTemplate(body)
+        self.is_html = is_html
+
+    @property
+    def variables(self) -> List[str]:
+        """Placeholder names used by the subject or body."""
+        return sorted(self.subject.variables | self.body.variables)
+
+    def render(self, variables: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Render the subject and body for one recipient.
+
+        Args:
+            variables: Values for the placeholders
+
+        Returns:
+            Tuple of (subject, body)
+        """
+        return (
+            self.subject.render(variables),
+            self.body.render(variables, escape=html.escape if self.is_html else None)
+        )
+
+
+class TemplateRegistry:
+    """In-memory store of compiled templates, kept for the server's lifetime."""
+
+    def __init__(self):
+        """Initialize an empty registry."""
+        self._templates: Dict[str, MailTemplate] = {}
+
+    def register(
+        self,
+        subject: str,
+        body: str,
+        is_html: bool = False,
+        template_id: Optional[str] = None
+    ) -> MailTemplate:
+        """
+        Compile and store a template, replacing any with the same ID.
+
+        Args:
+            subject: Subject template
+            body: Body template
+            is_html: Whether the body is HTML
+            template_id: ID to register under (generated if omitted)
+
+        Returns:
+            The compiled template
+        """
+        template = MailTemplate(template_id or uuid.uuid4().hex[:12], subject, body, is_html)
+        self._templates[template.template_id] = template
+        return template
+
+    def get(self, template_id: str) -> Optional[MailTemplate]:
+        """Look up a template by ID."""
+        return self._templates.get(template_id)
+
+    def remove(self, template_id: str) -> bool:
+        """Remove a template, returning whether it existed."""
+        return self._templates.pop(template_id, None) is not None
+
+    def list(self) -> List[MailTemplate]:
+        """Return all registered templates."""
+        return list(self._templates.values())
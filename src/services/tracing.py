@@ -0,0 +1,250 @@
+"""
+Opt-in per-phase timing traces for individual tool calls.
+"""
+
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "email-send-mcp"
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("email_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("email_span", default=None)
+
+
+class Span:
+    """One timed phase of a trace."""
+
+    __slots__ = ("name", "span_id", "parent", "start", "end", "count", "attributes")
+
+    def __init__(self, name: str, parent: Optional["Span"], start: float):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent = parent
+        self.start = start
+        self.end = start
+        self.count = 1
+        self.attributes: Dict[str, Any] = {}
+
+
+class _SpanScope:
+    """Context manager that opens a span in the active trace, if any."""
+
+    __slots__ = ("name", "attributes", "span", "token")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        trace = _current_trace.get()
+        if trace is not None:
+            self.span = trace.start_span(self.name, **self.attributes)
+            self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.span is not None:
+            self.span.end = time.perf_counter()
+            if exc_type is not None:
+                self.span.attributes["error"] = exc_type.__name__
+            _current_span.reset(self.token)
+
+
+class Trace:
+    """
+    Span timings of one operation, collected while it runs.
+
+    Use as a context manager around the operation; code it calls (directly
+    or through other services) records phases with ``span`` and
+    ``add_time``, which cost one context variable lookup when no trace is
+    active.
+    """
+
+    def __init__(self, name: str):
+        """
+        Create a trace.
+
+        Args:
+            name: Name of the root span, e.g. the traced method
+        """
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._wall_start = time.time_ns()
+        self._perf_start = time.perf_counter()
+        self.root = Span(name, None, self._perf_start)
+        self._token = None
+        self._span_token = None
+
+    def __enter__(self) -> "Trace":
+        self._token = _current_trace.set(self)
+        self._span_token = _current_span.set(self.root)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.root.end = time.perf_counter()
+        _current_span.reset(self._span_token)
+        _current_trace.reset(self._token)
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        """Open a span under the current span; the caller sets its ``end``."""
+        span = Span(name, _current_span.get() or self.root, time.perf_counter())
+        span.attributes.update(attributes)
+        self.spans.append(span)
+        return span
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """
+        Add to an aggregate span, for phases made of many small steps.
+
+        The span starts at the first call and its duration is the sum of all
+        calls, so it can be shorter than its start-to-finish interval.
+        """
+        parent = _current_span.get() or self.root
+        for span in reversed(self.spans):
+            if span.name == name and span.parent is parent:
+                span.end += seconds
+                span.count += 1
+                return
+        now = time.perf_counter()
+        span = Span(name, parent, now - seconds)
+        span.end = now
+        self.spans.append(span)
+
+    def _offset_ms(self, moment: float) -> float:
+        return round((moment - self._perf_start) * 1000, 3)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the trace for a tool result's ``details``.
+
+        Returns:
+            Dictionary with the trace ID, total duration and one entry per
+            span (start offset and duration in milliseconds, nesting depth)
+        """
+        spans = []
+        for span in self.spans:
+            depth, parent = 0, span.parent
+            while parent is not None and parent is not self.root:
+                depth, parent = depth + 1, parent.parent
+            entry = {
+                "name": span.name,
+                "start_ms": self._offset_ms(span.start),
+                "duration_ms": round((span.end - span.start) * 1000, 3),
+                "depth": depth
+            }
+            if span.count > 1:
+                entry["count"] = span.count
+            if span.attributes:
+                entry["attributes"] = dict(span.attributes)
+            spans.append(entry)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round((self.root.end - self.root.start) * 1000, 3),
+            "spans": spans
+        }
+
+    def _unix_nano(self, moment: float) -> str:
+        return str(self._wall_start + int((moment - self._perf_start) * 1e9))
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """
+        Render the trace as an OTLP/JSON ``ExportTraceServiceRequest``.
+
+        Returns:
+            Dictionary in the layout written by the OpenTelemetry
+            Collector's file exporter
+        """
+        spans = []
+        for span in [self.root] + self.spans:
+            record = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": self._unix_nano(span.start),
+                "endTimeUnixNano": self._unix_nano(span.end),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(value)}}
+                    for key, value in span.attributes.items()
+                ]
+            }
+            if span.parent is not None:
+                record["parentSpanId"] = span.parent.span_id
+            if "error" in span.attributes:
+                record["status"] = {"code": 2, "message": str(span.attributes["error"])}
+            spans.append(record)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                ]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}]
+            }]
+        }
+
+    def export(self, path: str) -> None:
+        """Append the trace to ``path`` as one line of OTLP/JSON."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.to_otlp(), separators=(",", ":")) + "\n")
+
+
+def span(name: str, **attributes: Any) -> _SpanScope:
+    """
+    Time a block as a span of the active trace (a no-op when not tracing).
+
+    Args:
+        name: Span name, e.g. "smtp.connect"
+        **attributes: Extra span attributes
+    """
+    return _SpanScope(name, attributes)
+
+
+def add_time(name: str, seconds: float) -> None:
+    """Add ``seconds`` to an aggregate span of the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_time(name, seconds)
+
+
+def is_tracing() -> bool:
+    """Whether a trace is being collected in the current context."""
+    return _current_trace.get() is not None
+
+
+async def run_traced(
+    name: str,
+    operation: Awaitable[Dict[str, Any]],
+    export_file: str = ""
+) -> Dict[str, Any]:
+    """
+    Await a service call under a new trace and attach the trace to its result.
+
+    Args:
+        name: Root span name
+        operation: Coroutine returning a result dictionary
+        export_file: Append the trace as OTLP/JSON to this file (optional)
+
+    Returns:
+        The result, with the trace summary under ``details["trace"]``
+    """
+    with Trace(name) as trace:
+        result = await operation
+    result.setdefault("details", {})["trace"] = trace.summary()
+    if export_file:
+        try:
+            trace.export(export_file)
+        except OSError as e:
+            logger.warning(f"Could not export trace to {export_file}: {str(e)}")
+    return result
@@ -0,0 +1,469 @@
+"""
+Helpers for building IMAP requests and parsing FETCH responses.
+"""
+
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+
+# Untagged FETCH data as delivered by aioimaplib ("* " already stripped)
+FETCH_LINE_RE = re.compile(rb"^(\d+) FETCH \(")
+LITERAL_RE = re.compile(rb"\{(\d+)\}$")
+
+ImapValue = Union[None, str, bytes, List[Any]]
+
+# Structured filters accepted by ``build_search_criteria``
+SEARCH_FILTERS = ("from_address", "subject", "since", "before", "larger_than", "headers", "gmail_query")
+
+# Header field names are atoms: printable ASCII except space and colon
+HEADER_NAME_RE = re.compile(r"^[!-9;-~]+$")
+
+# IMAP dates use English month abbreviations regardless of locale
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def sequence_set(ids: Sequence[Union[int, str, bytes]]) -> str:
+    """
+    Build a compact IMAP sequence set from message numbers or UIDs.
+
+    Consecutive runs are collapsed, e.g. ``[1, 2, 3, 5, 7, 8]`` becomes
+    ``"1:3,5,7:8"``.
+
+    Args:
+        ids: Message sequence numbers or UIDs
+
+    Returns:
+        IMAP sequence set string
+    """
+    numbers = sorted({int(i) for i in ids})
+    ranges: List[str] = []
+    index = 0
+    while index < len(numbers):
+        start = numbers[index]
+        while index + 1 < len(numbers) and numbers[index + 1] == numbers[index] + 1:
+            index += 1
+        end = numbers[index]
+        ranges.append(str(start) if start == end else f"{start}:{end}")
+        index += 1
+    return ",".join(ranges)
+
+
+def quote_string(value: str) -> str:
+    """
+    Quote a SEARCH argument as an IMAP quoted string.
+
+    Raises:
+        ValueError: If the value contains a line break, which a quoted
+            string cannot carry
+    """
+    if "\r" in value or "\n" in value:
+        raise ValueError("Search values cannot contain line breaks")
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def imap_date(value: Union[str, date]) -> str:
+    """
+    Format a date for SINCE/BEFORE, e.g. ``2024-03-05`` becomes ``5-Mar-2024``.
+
+    Raises:
+        ValueError: If a string is not an ISO date (YYYY-MM-DD)
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = date.fromisoformat(str(value))
+    return f"{value.day}-{MONTHS[value.month - 1]}-{value.year}"
+
+
+def build_search_criteria(
+    filters: Optional[Dict[str, Any]] = None,
+    unread_only: bool = False
+) -> str:
+    """
+    Compile structured filters into a single IMAP SEARCH criteria string.
+
+    All filters are ANDed, so the server returns only messages that match
+    every one of them.
+
+    Args:
+        filters: Any of ``from_address``, ``subject`` (substring matches),
+            ``since``/``before`` (ISO dates; SINCE is inclusive, BEFORE is
+            exclusive), ``larger_than`` (bytes), ``headers`` (mapping of
+            header name to substring) and ``gmail_query`` (Gmail search
+            syntax, sent as X-GM-RAW)
+        unread_only: Only match unread messages
+
+    Returns:
+        SEARCH criteria, ``"ALL"`` when nothing is filtered
+
+    Raises:
+        ValueError: If a filter is unknown or has an invalid value
+    """
+    filters = {key: value for key, value in (filters or {}).items() if value not in (None, "", {})}
+    unknown = set(filters) - set(SEARCH_FILTERS)
+    if unknown:
+        raise ValueError(
+            f"Unknown search filter(s): {', '.join(sorted(unknown))}. "
+            f"Use any of: {', '.join(SEARCH_FILTERS)}"
+        )
+
+    criteria: List[str] = []
+    if unread_only:
+        criteria.append("UNSEEN")
+    if "from_address" in filters:
+        criteria.append(f"FROM {quote_string(str(filters['from_address']))}")
+    if "subject" in filters:
+        criteria.append(f"SUBJECT {quote_string(str(filters['subject']))}")
+    if "since" in filters:
+        criteria.append(f"SINCE {imap_date(filters['since'])}")
+    if "before" in filters:
+        criteria.append(f"BEFORE {imap_date(filters['before'])}")
+    if "larger_than" in filters:
+        size = int(filters["larger_than"])
+        if size < 0:
+            raise ValueError("larger_than must not be negative")
+        criteria.append(f"LARGER {size}")
+    for name, value in filters.get("headers", {}).items():
+        if not HEADER_NAME_RE.match(name):
+            raise ValueError(f"Invalid header name: {name!r}")
+        criteria.append(f"HEADER {name} {quote_string(str(value))}")
+    if "gmail_query" in filters:
+        criteria.append(f"X-GM-RAW {quote_string(str(filters['gmail_query']))}")
+
+    return " ".join(criteria) or "ALL"
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    """Yield successive ``size``-long slices of ``items``."""
+    for start in range(0, len(items), max(1, size)):
+        yield items[start:start + size]
+
+
+def parse_fetch_response(lines: Sequence[Union[bytes, bytearray]]) -> List[Tuple[int, Dict[str, ImapValue]]]:
+    """
+    Parse the lines of a (possibly multi-message) FETCH response.
+
+    aioimaplib returns untagged response lines as ``bytes`` and literal
+    payloads as ``bytearray`` immediately after the line announcing them.
+
+    Args:
+        lines: ``Response.lines`` from a FETCH or UID FETCH command
+
+    Returns:
+        List of ``(sequence_number, items)`` in server order, where ``items``
+        maps upper-cased data item names (``"RFC822"``, ``"UID"``,
+        ``"BODY[TEXT]<0>"`` ...) to their parsed values
+    """
+    messages: List[Tuple[int, Dict[str, ImapValue]]] = []
+    index = 0
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if isinstance(line, bytearray):
+            continue
+        match = FETCH_LINE_RE.match(line)
+        if not match:
+            continue
+
+        # Gather the text and literals making up this message's data
+        chunks: List[Union[bytes, bytearray]] = [line[match.end() - 1:]]
+        while _open_parens(chunks) > 0 and index < len(lines):
+            chunks.append(lines[index])
+            index += 1
+
+        parsed = _Tokenizer(chunks).parse_list()
+        items: Dict[str, ImapValue] = {}
+        for key_index in range(0, len(parsed) - 1, 2):
+            key = parsed[key_index]
+            if isinstance(key, str):
+                items[key.upper()] = parsed[key_index + 1]
+        messages.append((int(match.group(1)), items))
+    return messages
+
+
+def _open_parens(chunks: List[Union[bytes, bytearray]]) -> int:
+    """Count unbalanced parentheses in the text parts of a response."""
+    depth = 0
+    for chunk in chunks:
+        if isinstance(chunk, bytearray):
+            continue
+        depth += _paren_depth(bytes(chunk))
+    return depth
+
+
+def _paren_depth(text: bytes) -> int:
+    """Net parenthesis depth of ``text``, ignoring quoted strings."""
+    depth = 0
+    quoted = False
+    escaped = False
+    for byte in text:
+        if quoted:
+            if escaped:
+                escaped = False
+            elif byte == 0x5C:  # backslash
+                escaped = True
+            elif byte == 0x22:  # double quote
+                quoted = False
+        elif byte == 0x22:
+            quoted = True
+        elif byte == 0x28:
+            depth += 1
+        elif byte == 0x29:
+            depth -= 1
+    return depth
+
+
+class _Tokenizer:
+    """Recursive-descent parser for IMAP parenthesized data with literals."""
+
+    def __init__(self, chunks: List[Union[bytes, bytearray]]):
+        self.chunks = chunks
+        self.chunk = 0
+        self.pos = 0
+
+    def _text(self) -> bytes:
+        return self.chunks[self.chunk]
+
+    def _skip_space(self) -> None:
+        while True:
+            if self.chunk >= len(self.chunks):
+                return
+            text = self._text()
+            if isinstance(text, bytearray):
+                return
+            while self.pos < len(text) and text[self.pos:self.pos + 1] == b" ":
+                self.pos += 1
+            if self.pos < len(text):
+                return
+            self.chunk += 1
+            self.pos = 0
+
+    def parse_list(self) -> List[ImapValue]:
+        """Parse a parenthesized list starting at the current position."""
+        self._skip_space()
+        text = self._text()
+        if text[self.pos:self.pos + 1] != b"(":
+            raise ValueError(f"Expected '(' in IMAP response: {bytes(text)[:80]!r}")
+        self.pos += 1
+        values: List[ImapValue] = []
+        while True:
+            self._skip_space()
+            if self.chunk >= len(self.chunks):
+                return values
+            text = self._text()
+            if text[self.pos:self.pos + 1] == b")":
+                self.pos += 1
+                return values
+            values.append(self.parse_value())
+
+    def parse_value(self) -> ImapValue:
+        """Parse a single atom, string, literal or list."""
+        self._skip_space()
+        text = self._text()
+        if isinstance(text, bytearray):
+            # A literal with no preceding {n} marker in this chunk
+            self.chunk += 1
+            self.pos = 0
+            return bytes(text)
+
+        head = text[self.pos:self.pos + 1]
+        if head == b"(":
+            return self.parse_list()
+        if head == b'"':
+            return self._parse_quoted()
+
+        literal = LITERAL_RE.match(text, self.pos)
+        if literal and literal.end() == len(text):
+            # The literal payload is the next chunk
+            self.chunk += 1
+            self.pos = 0
+            payload = self.chunks[self.chunk] if self.chunk < len(self.chunks) else b""
+            self.chunk += 1
+            return bytes(payload)
+
+        return self._parse_atom()
+
+    def _parse_quoted(self) -> str:
+        text = self._text()
+        self.pos += 1
+        out = bytearray()
+        while self.pos < len(text):
+            byte = text[self.pos]
+            self.pos += 1
+            if byte == 0x5C and self.pos < len(text):
+                out.append(text[self.pos])
+                self.pos += 1
+            elif byte == 0x22:
+                break
+            else:
+                out.append(byte)
+        return out.decode("utf-8", errors="replace")
+
+    def _parse_atom(self) -> ImapValue:
+        text = self._text()
+        start = self.pos
+        brackets = 0
+        while self.pos < len(text):
+            char = text[self.pos:self.pos + 1]
+            if char == b"[":
+                brackets += 1
+            elif char == b"]":
+                brackets -= 1
+            elif brackets == 0 and char in (b" ", b"(", b")"):
+                break
+            self.pos += 1
+        atom = bytes(text[start:self.pos]).decode("utf-8", errors="replace")
+        return None if atom.upper() == "NIL" else atom
+
+
+def _as_text(value: ImapValue) -> str:
+    """Render an atom, string or literal as text."""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return value.decode("utf-8", errors="replace")
+    if isinstance(value, str):
+        return value
+    return ""
+
+
+def _params(value: ImapValue) -> Dict[str, str]:
+    """Convert a ``("key" "value" ...)`` parameter list into a dict."""
+    if not isinstance(value, list):
+        return {}
+    return {
+        _as_text(value[i]).lower(): _as_text(value[i + 1])
+        for i in range(0, len(value) - 1, 2)
+    }
+
+
+def parse_envelope(envelope: ImapValue) -> Dict[str, Any]:
+    """
+    Parse an ENVELOPE structure (RFC 3501, section 7.4.2).
+
+    Header values are returned undecoded (RFC 2047 encoded words intact).
+
+    Args:
+        envelope: Parsed ENVELOPE value from ``parse_fetch_response``
+
+    Returns:
+        Dictionary with date, subject, message_id, in_reply_to and the
+        address fields (from, sender, reply_to, to, cc, bcc) as lists of
+        ``(name, address)`` tuples
+    """
+    fields = list(envelope) if isinstance(envelope, list) else []
+    fields += [None] * (10 - len(fields))
+
+    def addresses(value: ImapValue) -> List[Tuple[str, str]]:
+        result: List[Tuple[str, str]] = []
+        for address in value if isinstance(value, list) else []:
+            if not isinstance(address, list) or len(address) < 4:
+                continue
+            name, _, mailbox, host = address[:4]
+            if host is None:
+                # Start or end of an RFC 2822 group
+                continue
+            result.append((_as_text(name), f"{_as_text(mailbox)}@{_as_text(host)}"))
+        return result
+
+    return {
+        "date": _as_text(fields[0]),
+        "subject": _as_text(fields[1]),
+        "from": addresses(fields[2]),
+        "sender": addresses(fields[3]),
+        "reply_to": addresses(fields[4]),
+        "to": addresses(fields[5]),
+        "cc": addresses(fields[6]),
+        "bcc": addresses(fields[7]),
+        "in_reply_to": _as_text(fields[8]),
+        "message_id": _as_text(fields[9]),
+    }
+
+
+def parse_bodystructure(structure: ImapValue, section: str = "") -> Dict[str, Any]:
+    """
+    Parse a BODYSTRUCTURE into a tree of MIME part descriptions.
+
+    Args:
+        structure: Parsed BODYSTRUCTURE value from ``parse_fetch_response``
+        section: IMAP section number of this part (empty for the top level)
+
+    Returns:
+        Dictionary with content_type, params, encoding, size, disposition,
+        filename, section (as used in ``BODY[section]``) and, for
+        multiparts, the list of child ``parts``
+    """
+    if not isinstance(structure, list) or not structure:
+        # Missing or unparseable: treat as a plain text body of unknown size
+        return {
+            "content_type": "text/plain",
+            "params": {},
+            "encoding": "7bit",
+            "size": 0,
+            "section": section or "1",
+            "disposition": "",
+            "filename": "",
+        }
+
+    if isinstance(structure[0], list):
+        # Multipart: child bodies followed by the subtype and extension data
+        parts: List[Dict[str, Any]] = []
+        index = 0
+        while index < len(structure) and isinstance(structure[index], list):
+            child_section = f"{section}.{index + 1}" if section else str(index + 1)
+            parts.append(parse_bodystructure(structure[index], child_section))
+            index += 1
+        subtype = _as_text(structure[index]) if index < len(structure) else "mixed"
+        extension = structure[index + 1:]
+        disposition = _disposition(extension[1] if len(extension) > 1 else None)
+        return {
+            "content_type": f"multipart/{subtype.lower()}",
+            "params": _params(extension[0]) if extension else {},
+            "section": section,
+            "disposition": disposition[0],
+            "filename": disposition[1].get("filename", ""),
+            "parts": parts,
+        }
+
+    fields = list(structure) + [None] * max(0, 7 - len(structure))
+    main_type = _as_text(fields[0]).lower()
+    subtype = _as_text(fields[1]).lower()
+    params = _params(fields[2])
+
+    # Type-specific fields precede the extension data
+    extension_start = 7
+    if main_type == "text":
+        extension_start = 8
+    elif main_type == "message" and subtype == "rfc822":
+        extension_start = 10
+    extension = structure[extension_start:]
+
+    # Extension data: md5, disposition, language, location
+    disposition = _disposition(extension[1] if len(extension) > 1 else None)
+    size = _as_text(fields[6])
+    return {
+        "content_type": f"{main_type}/{subtype}",
+        "params": params,
+        "encoding": _as_text(fields[5]).lower() or "7bit",
+        "size": int(size) if size.isdigit() else 0,
+        "section": section or "1",
+        "disposition": disposition[0],
+        "filename": disposition[1].get("filename") or params.get("name", ""),
+    }
+
+
+def _disposition(value: ImapValue) -> Tuple[str, Dict[str, str]]:
+    """Parse a ``("attachment" ("filename" "x.pdf"))`` disposition."""
+    if not isinstance(value, list) or not value:
+        return "", {}
+    return _as_text(value[0]).lower(), _params(value[1] if len(value) > 1 else None)
+
+
+def iter_parts(part: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Walk a parsed BODYSTRUCTURE depth-first, yielding leaf parts."""
+    if "parts" in part:
+        for child in part["parts"]:
+            yield from iter_parts(child)
+    else:
+        yield part
@@ -0,0 +1,168 @@
+"""
+Single-pass, lazily decoded view of a parsed email message.
+"""
+
+import binascii
+import email.message
+import quopri
+from email.header import decode_header
+from typing import Any, Dict, List, Optional
+
+
+# Characters of body text kept for previews
+PREVIEW_CHARS = 1000
+
+# Worst-case UTF-8 bytes per character, used to size partial decodes
+MAX_CHAR_BYTES = 4
+
+
+def decode_header_value(value: Any) -> str:
+    """Decode RFC 2047 encoded words in a header value."""
+    decoded = ""
+    for content, encoding in decode_header(str(value)):
+        if isinstance(content, bytes):
+            try:
+                decoded += content.decode(encoding or "utf-8", errors="ignore")
+            except LookupError:
+                decoded += content.decode("utf-8", errors="ignore")
+        else:
+            decoded += content
+    return decoded
+
+
+def _decode_text(payload: bytes, charset: Optional[str]) -> str:
+    """Decode bytes with the part's charset, falling back to UTF-8."""
+    try:
+        return payload.decode(charset or "utf-8", errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+
+class ParsedMessage:
+    """
+    Body preview and attachment metadata of a message, computed on demand.
+
+    The part tree is walked once, on first access, to find the first
+    text/plain part (falling back to text/html) and the attachments.
+    Only the leading bytes of the body part needed for the preview are
+    transfer-decoded, and attachment payloads are never decoded.
+    """
+
+    def __init__(self, message: email.message.Message, preview_chars: int = PREVIEW_CHARS):
+        """
+        Wrap a parsed message.
+
+        Args:
+            message: Message from ``email.message_from_bytes``
+            preview_chars: Characters of body text to decode
+        """
+        self.message = message
+        self.preview_chars = preview_chars
+        self._scanned = False
+        self._body_part: Optional[email.message.Message] = None
+        self._attachments: List[Dict[str, str]] = []
+        self._body: Optional[str] = None
+        self._body_length = 0
+
+    def _scan(self) -> None:
+        """Walk the part tree once, recording the body part and attachments."""
+        if self._scanned:
+            return
+        self._scanned = True
+        html_part = None
+        for part in self.message.walk():
+            if part.is_multipart():
+                continue
+            if part.get_content_disposition() == "attachment":
+                filename = part.get_filename()
+                if filename:
+                    self._attachments.append({
+                        "filename": decode_header_value(filename),
+                        "content_type": part.get_content_type()
+                    })
+                continue
+            content_type = part.get_content_type()
+            if content_type == "text/plain" and self._body_part is None:
+                self._body_part = part
+            elif content_type == "text/html" and html_part is None:
+                html_part = part
+        if self._body_part is None:
+            self._body_part = html_part
+
+    def _decode_body(self) -> None:
+        """Decode the start of the body part, enough for the preview."""
+        self._body = ""
+        part = self._body_part
+        if part is None:
+            return
+
+        budget = self.preview_chars * MAX_CHAR_BYTES
+        encoding = str(part.get("Content-Transfer-Encoding", "7bit")).strip().lower()
+        raw = part.get_payload(decode=False)
+
+        if encoding == "base64" and isinstance(raw, str):
+            # 4 characters per 3 bytes, plus a line break every 76 characters
+            prefix = raw[:(budget // 3 + 1) * 4 * 78 // 76 + 4]
+            truncated = len(prefix) < len(raw)
+            if truncated:
+                # Encoders write whole 4-character groups per line
+                prefix = prefix[:prefix.rfind("\n") + 1] or prefix
+            try:
+                payload = binascii.a2b_base64(prefix)
+            except binascii.Error:
+                compact = "".join(prefix.split())
+                try:
+                    payload = binascii.a2b_base64(compact[:len(compact) // 4 * 4])
+                except binascii.Error:
+                    payload = b""
+            if truncated:
+                tail = raw[-8:].rstrip()
+                padding = len(tail) - len(tail.rstrip("="))
+                whole = len(raw) - raw.count("\n") - raw.count("\r")
+                length = whole * 3 // 4 - padding
+        elif encoding == "quoted-printable" and isinstance(raw, str):
+            # An encoded byte takes at most three characters ("=XX")
+            prefix = raw[:budget * 3]
+            truncated = len(prefix) < len(raw)
+            payload = quopri.decodestring(prefix.encode("ascii", errors="ignore"))
+            if truncated:
+                length = len(raw)
+        else:
+            payload = part.get_payload(decode=True) or b""
+            truncated = len(payload) > budget
+            if truncated:
+                length = len(payload)
+                payload = payload[:budget]
+
+        text = _decode_text(payload, part.get_content_charset())
+        # Beyond the preview, the length is estimated from the decoded size
+        self._body_length = length if truncated else len(text)
+        self._body = text[:self.preview_chars]
+
+    @property
+    def body(self) -> str:
+        """Leading ``preview_chars`` characters of the body text."""
+        if self._body is None:
+            self._scan()
+            self._decode_body()
+        return self._body
+
+    @property
+    def body_length(self) -> int:
+        """Length of the body text (estimated for bodies beyond the preview)."""
+        if self._body is None:
+            self._scan()
+            self._decode_body()
+        return self._body_length
+
+    @property
+    def attachments(self) -> List[Dict[str, str]]:
+        """Filename and content type of each attachment."""
+        self._scan()
+        return self._attachments
+
+    @property
+    def subject(self) -> str:
+        """Decoded Subject header."""
+        subject = self.message["Subject"]
+        return decode_header_value(subject) if subject else ""
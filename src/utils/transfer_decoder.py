@@ -0,0 +1,62 @@
+"""
+Incremental Content-Transfer-Encoding decoding for streamed MIME parts.
+"""
+
+import binascii
+import quopri
+
+
+class TransferDecoder:
+    """
+    Decode a part's transfer encoding from arbitrarily split chunks.
+
+    Input that cannot be decoded yet (a partial base64 group or an
+    unfinished quoted-printable line) is carried over to the next chunk, so
+    memory stays bounded by the chunk size.
+    """
+
+    def __init__(self, encoding: str):
+        """
+        Create a decoder.
+
+        Args:
+            encoding: Content-Transfer-Encoding of the part (base64,
+                quoted-printable; anything else is passed through)
+        """
+        self.encoding = (encoding or "7bit").strip().lower()
+        self._carry = b""
+
+    def feed(self, chunk: bytes) -> bytes:
+        """
+        Decode the next piece of encoded data.
+
+        Args:
+            chunk: Encoded bytes, split anywhere
+
+        Returns:
+            Decoded bytes available so far
+        """
+        if self.encoding == "base64":
+            data = self._carry + b"".join(chunk.split())
+            end = len(data) // 4 * 4
+            self._carry = data[end:]
+            return binascii.a2b_base64(data[:end]) if end else b""
+        if self.encoding == "quoted-printable":
+            data = self._carry + chunk
+            end = data.rfind(b"\n") + 1
+            self._carry = data[end:]
+            return quopri.decodestring(data[:end]) if end else b""
+        return chunk
+
+    def flush(self) -> bytes:
+        """Decode whatever input is left once the part has ended."""
+        data, self._carry = self._carry, b""
+        if not data:
+            return b""
+        if self.encoding == "base64":
+            # Tolerate a truncated final group
+            data = data[:len(data) // 4 * 4]
+            return binascii.a2b_base64(data) if data else b""
+        if self.encoding == "quoted-printable":
+            return quopri.decodestring(data)
+        return data
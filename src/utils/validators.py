@@ -2,20 +2,54 @@
 Utility functions for email operations.
 """
 
+import re
+from functools import lru_cache
 from email_validator import validate_email, EmailNotValidError
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
 
-def validate_email_address(email: str) -> Tuple[bool, str]:
+# Distinct addresses whose validation result is remembered
+VALIDATION_CACHE_SIZE = 4096
+
+# Cheap shape check: something, one @-sign, something
+_ADDRESS_SHAPE_RE = re.compile(r"^[^@]+@[^@]+$")
+
+
+def _prefilter(email: str) -> Tuple[bool, str]:
     """
-    Validate if an email address is in a valid format.
+    Reject obviously malformed addresses without the full validator.
     
-    Args:
-        email: Email address to validate
-        
     Returns:
-        Tuple of (is_valid, normalized_email_or_error_message)
+        (False, error) for a rejected address, or (True, "") if the address
+        needs full validation. Error messages match ``email_validator``.
     """
+    if _ADDRESS_SHAPE_RE.match(email):
+        return True, ""
+    if "@" not in email:
+        return False, "An email address must have an @-sign."
+    if email.startswith("@"):
+        return False, "There must be something before the @-sign."
+    if email.endswith("@"):
+        return False, "There must be something after the @-sign."
+    # Several @-signs may still be valid (quoted local part); let the validator decide
+    return True, ""
+
+
+def _cache_key(email: str) -> str:
+    """
+    Normalize an address for the validation cache.
+    
+    Surrounding whitespace is dropped and the domain lower-cased, so spelling
+    variants of one address share a cache entry. The local part is kept as
+    is: it may be case-sensitive.
+    """
+    local, at, domain = email.strip().rpartition("@")
+    return f"{local}{at}{domain.lower()}"
+
+
+@lru_cache(maxsize=VALIDATION_CACHE_SIZE)
+def _validate_cached(email: str) -> Tuple[bool, str]:
+    """Run the full validator; results are memoized per ``_cache_key``."""
     try:
         # Validate and normalize the email
         validation = validate_email(email, check_deliverability=False)
@@ -24,6 +58,48 @@ def validate_email_address(email: str) -> Tuple[bool, str]:
         return False, str(e)
 
 
+def validate_email_address(email: str) -> Tuple[bool, str]:
+    """
+    Validate if an email address is in a valid format.
+    
+    Results are kept in a bounded LRU cache, so repeat recipients across
+    sends are validated once. Surrounding whitespace is ignored.
+    
+    Args:
+        email: Email address to validate
+        
+    Returns:
+        Tuple of (is_valid, normalized_email_or_error_message)
+    """
+    key = _cache_key(email)
+    plausible, error = _prefilter(key)
+    if not plausible:
+        return False, error
+    return _validate_cached(key)
+
+
+def validate_email_batch(emails: List[str]) -> List[Tuple[bool, str]]:
+    """
+    Validate many email addresses, checking each distinct address once.
+    
+    Args:
+        emails: Email addresses to validate
+        
+    Returns:
+        List of (is_valid, normalized_email_or_error_message) in input order
+    """
+    results: Dict[str, Tuple[bool, str]] = {}
+    for email in emails:
+        if email not in results:
+            results[email] = validate_email_address(email)
+    return [results[email] for email in emails]
+
+
+def clear_validation_cache() -> None:
+    """Forget memoized validation results."""
+    _validate_cached.cache_clear()
+
+
 def validate_email_addresses(emails: List[str]) -> Tuple[List[str], List[str]]:
     """
     Validate multiple email addresses.
@@ -37,8 +113,7 @@ def validate_email_addresses(emails: List[str]) -> Tuple[List[str], List[str]]:
     valid_emails = []
     invalid_emails = []
     
-    for email in emails:
-        is_valid, result = validate_email_address(email)
+    for email, (is_valid, result) in zip(emails, validate_email_batch(emails)):
         if is_valid:
             valid_emails.append(result)
         else:
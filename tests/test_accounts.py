@@ -0,0 +1,143 @@
+"""
+Tests for named account profiles.
+"""
+
+import asyncio
+import json
+import pytest
+
+from src.config import Settings, load_account_profiles
+from src.services.accounts import AccountManager, UnknownAccountError
+from src.services.email_sender import EmailSender
+from src.services.metrics import IMAP_SESSION_CONNECTIONS, IMAP_SESSION_MAX_SIZE
+
+
+@pytest.fixture
+def settings(tmp_path):
+    accounts_file = tmp_path / "accounts.json"
+    accounts_file.write_text(json.dumps({
+        "support": {"smtp_username": "support@example.com", "imap_username": "support@example.com"},
+        "sales": {"SMTP_USERNAME": "file@example.com"}
+    }))
+    return Settings(
+        _env_file=None,
+        SMTP_USERNAME="me@example.com",
+        SEND_QUEUE_DIR=str(tmp_path / "queue"),
+        ACCOUNTS={"sales": {"SMTP_USERNAME": "sales@example.com", "SMTP_PORT": 465}},
+        ACCOUNTS_FILE=str(accounts_file),
+        ACCOUNT_MAX_ACTIVE=2
+    )
+
+
+class TestAccountProfiles:
+    """Test loading and resolving account profiles."""
+
+    def test_inline_profiles_override_file(self, settings):
+        """Test ACCOUNTS wins over ACCOUNTS_FILE and keys are case-insensitive."""
+        profiles = load_account_profiles(settings)
+
+        assert profiles["sales"] == {"SMTP_USERNAME": "sales@example.com", "SMTP_PORT": 465}
+        assert profiles["support"]["IMAP_USERNAME"] == "support@example.com"
+
+    @pytest.mark.parametrize("accounts", [
+        {"default": {}},
+        {"../escape": {}},
+        {".": {}},
+        {"..": {}},
+        {"work": {"MODE": "Production"}},
+    ])
+    def test_invalid_profiles_rejected(self, accounts):
+        """Test reserved names, unsafe names and non-account settings are refused."""
+        with pytest.raises(ValueError):
+            load_account_profiles(Settings(_env_file=None, ACCOUNTS=accounts))
+
+    def test_account_settings_inherit_and_isolate(self, settings, tmp_path):
+        """Test accounts inherit base settings but get their own queue directory."""
+        manager = AccountManager(settings)
+
+        sales = manager.get_settings("sales")
+
+        assert manager.names() == ["default", "sales", "support"]
+        assert manager.get_settings() is settings
+        assert sales.SMTP_USERNAME == "sales@example.com"
+        assert sales.SMTP_PORT == 465
+        assert sales.SMTP_SERVER == settings.SMTP_SERVER
+        assert sales.SEND_QUEUE_DIR == str(tmp_path / "queue" / "sales")
+        with pytest.raises(UnknownAccountError):
+            manager.get_settings("missing")
+
+
+class TestAccountManager:
+    """Test per-account services and connection limits."""
+
+    async def test_services_created_once_per_account(self, settings):
+        """Test each account gets its own lazily created services."""
+        manager = AccountManager(settings)
+
+        sales = await manager.sender("sales")
+
+        assert await manager.sender("sales") is sales
+        assert await manager.sender() is not sales
+        assert sales.settings.SMTP_USERNAME == "sales@example.com"
+        assert sales.templates is (await manager.sender("support")).templates
+        assert sales._get_attachment_cache() is (await manager.sender("support"))._get_attachment_cache()
+        await manager.close()
+
+    async def test_least_recently_used_account_released(self, settings):
+        """Test connections beyond ACCOUNT_MAX_ACTIVE are closed, oldest first."""
+        manager = AccountManager(settings)
+        closed = []
+        for name in ("default", "sales", "support"):
+            sender = await manager.sender(name)
+
+            async def close_connections(name=name):
+                closed.append(name)
+
+            sender.close_connections = close_connections
+
+        await manager.sender("sales")
+        await manager.sender("default")
+
+        assert closed == ["default", "support"]
+        assert [account["name"] for account in manager.describe() if account["active"]] == ["default", "sales"]
+        await manager.close()
+
+    async def test_queue_workers_respect_active_limit(self, settings, monkeypatch):
+        """Test background sends re-activate their account and idle workers stop on eviction."""
+        sent = []
+
+        async def fake_send(self, message, sender, recipients):
+            sent.append((self.settings.SMTP_USERNAME, recipients))
+
+        monkeypatch.setattr(EmailSender, "_send_smtp_message", fake_send)
+        manager = AccountManager(settings.model_copy(update={
+            "ACCOUNT_MAX_ACTIVE": 1, "SEND_QUEUE_POLL_INTERVAL": 0.01, "DEFAULT_FROM_EMAIL": "me@example.com"
+        }))
+        idle = await manager.sender("support")
+        await idle.get_send_status("missing")
+        assert idle._queue_workers
+
+        sales = await manager.sender("sales")
+        await sales.enqueue_email(recipient="user@example.com", body="hi")
+        await manager.sender()
+        for _ in range(100):
+            if sent:
+                break
+            await asyncio.sleep(0.01)
+
+        assert sent == [("sales@example.com", ["user@example.com"])]
+        assert idle._queue_workers == []
+        assert [account["name"] for account in manager.describe() if account["active"]] == ["sales"]
+        await manager.close()
+
+    async def test_metrics_include_imap_sessions(self, settings):
+        """Test accounts that read mail report their IMAP session gauges."""
+        manager = AccountManager(settings.model_copy(update={"IMAP_MAILBOX_CONNECTIONS": 4}))
+        await manager.receiver("support")
+
+        manager.collect_metrics()
+
+        assert IMAP_SESSION_CONNECTIONS.value("support", "in_use") == 0
+        assert IMAP_SESSION_CONNECTIONS.value("support", "idle") == 0
+        assert IMAP_SESSION_MAX_SIZE.value("support") == 4
+        await manager.close()
@@ -35,6 +35,25 @@ class TestConfiguration:
         settings = Settings()
         assert settings.MAX_ATTACHMENT_SIZE_MB == 25
     
+    def test_smtp_pool_defaults(self):
+        """Test SMTP connection pool defaults."""
+        settings = Settings()
+        assert settings.SMTP_POOL_MIN_SIZE == 0
+        assert settings.SMTP_POOL_MAX_SIZE == 5
+        assert settings.SMTP_POOL_MAX_MESSAGES_PER_CONNECTION == 100
+        
+        with pytest.raises(Exception):
+            Settings(SMTP_POOL_MAX_SIZE=0)
+    
+    def test_rate_limits_must_be_positive(self):
+        """Test rate limits that are set must allow at least some sending."""
+        settings = Settings(SMTP_RATE_LIMIT_PER_MINUTE=0.5, SMTP_RATE_LIMIT_PER_DAY=100)
+        assert settings.SMTP_RATE_LIMIT_PER_MINUTE == 0.5
+        
+        for name in ("SMTP_RATE_LIMIT_PER_MINUTE", "SMTP_RATE_LIMIT_BURST", "SMTP_RATE_LIMIT_PER_DAY"):
+            with pytest.raises(Exception):
+                Settings(**{name: 0})
+    
     def test_port_validation(self):
         """Test port number validation."""
         # Valid port
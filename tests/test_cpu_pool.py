@@ -0,0 +1,68 @@
+"""
+Tests for the CPU worker pool.
+"""
+
+import threading
+import pytest
+from email.mime.text import MIMEText
+
+from src.config import Settings
+from src.services.cpu_pool import CPUPool, get_cpu_pool, shutdown_cpu_pools
+from src.services.email_receiver import parse_raw_emails
+
+
+def current_thread_name(_data=None) -> str:
+    return threading.current_thread().name
+
+
+@pytest.fixture(autouse=True)
+def stop_pools():
+    yield
+    shutdown_cpu_pools()
+
+
+class TestCPUPool:
+    """Test dispatching work inline or to workers."""
+
+    async def test_threshold(self):
+        """Test small inputs run inline and large ones in a worker thread."""
+        pool = CPUPool("thread", workers=1, threshold_bytes=1000)
+        try:
+            assert await pool.run(999, current_thread_name) == threading.current_thread().name
+            assert pool._executor is None
+
+            assert (await pool.run(1000, current_thread_name)).startswith("email-cpu")
+        finally:
+            pool.shutdown()
+
+    async def test_off_never_offloads(self):
+        """Test the "off" mode keeps even large work on the event loop."""
+        pool = CPUPool("off", threshold_bytes=0)
+
+        assert await pool.run(10 ** 9, current_thread_name) == threading.current_thread().name
+        assert pool._executor is None
+
+    async def test_process_mode_parses_batch(self):
+        """Test a batch of raw messages round-trips through a worker process."""
+        pool = CPUPool("process", workers=1, threshold_bytes=0)
+        raw = MIMEText("Hello from a worker").as_bytes()
+        try:
+            parsed = await pool.run(len(raw), parse_raw_emails, [("7", raw), ("8", b"\xff")])
+        finally:
+            pool.shutdown()
+
+        assert parsed["7"]["body"].startswith("Hello from a worker")
+        assert parsed["7"]["id"] == "7"
+
+    def test_shared_per_settings(self):
+        """Test services with the same pool settings share one pool."""
+        settings = Settings(_env_file=None, CPU_POOL_MODE="Process", CPU_POOL_WORKERS=3)
+
+        pool = get_cpu_pool(settings)
+
+        assert get_cpu_pool(Settings(_env_file=None, CPU_POOL_MODE="process", CPU_POOL_WORKERS=3)) is pool
+        assert get_cpu_pool(Settings(_env_file=None)) is not pool
+        assert (pool.mode, pool.workers) == ("process", 3)
+
+        with pytest.raises(ValueError):
+            Settings(_env_file=None, CPU_POOL_MODE="fibers")
@@ -0,0 +1,667 @@
+"""
+Tests for the email receiving service.
+"""
+
+import asyncio
+import base64
+import json
+import re
+import pytest
+from contextlib import asynccontextmanager
+from aioimaplib import Response
+
+from src.config import Settings
+from src.services.email_receiver import EmailReceiver, select_page
+from src.services.imap_session import IMAPSession
+from src.utils.imap_parser import parse_fetch_response
+
+
+def build_message(number: int) -> bytes:
+    return (
+        f"From: sender{number}@example.com\r\n"
+        f"To: me@example.com\r\n"
+        f"Subject: Message {number}\r\n"
+        f"\r\n"
+        f"Body {number}\r\n"
+    ).encode()
+
+
+def expand(sequence: str):
+    numbers = []
+    for part in sequence.split(","):
+        if ":" in part:
+            start, end = part.split(":")
+            numbers.extend(range(int(start), int(end) + 1))
+        else:
+            numbers.append(int(part))
+    return numbers
+
+
+class FakeIMAP:
+    """Records FETCH commands and answers from an in-memory mailbox."""
+
+    def __init__(self, count: int):
+        self.messages = {n: build_message(n) for n in range(1, count + 1)}
+        self.fetches = []
+
+    async def uid(self, command: str, message_set: str, message_parts: str) -> Response:
+        assert command == "fetch"
+        self.fetches.append((message_set, message_parts))
+        lines = []
+        for number in expand(message_set):
+            body = self.messages[number]
+            # Sequence numbers differ from UIDs to catch mix-ups
+            lines.append(f"{number + 100} FETCH (UID {number} RFC822 {{{len(body)}}}".encode())
+            lines.append(bytearray(body))
+            lines.append(b")")
+        lines.append(b"FETCH completed.")
+        return Response("OK", lines)
+
+
+@pytest.fixture
+def receiver():
+    email_receiver = EmailReceiver()
+    email_receiver.settings = Settings(
+        _env_file=None,
+        IMAP_FETCH_BATCH_SIZE=4,
+        MESSAGE_CACHE_ENABLED=False
+    )
+    return email_receiver
+
+
+class TestBatchedFetch:
+    """Test pipelined IMAP retrieval."""
+
+    async def test_fetch_uses_one_command_per_chunk(self, receiver):
+        """Test ten messages are fetched in three round-trips."""
+        imap = FakeIMAP(10)
+        ids = [str(n).encode() for n in range(1, 11)]
+
+        emails = await receiver._fetch_emails_imap(imap, ids)
+
+        assert [message_set for message_set, _ in imap.fetches] == ["1:4", "5:8", "9:10"]
+        assert [email_data["id"] for email_data in emails] == [str(n) for n in range(1, 11)]
+        assert emails[0]["subject"] == "Message 1"
+        assert emails[9]["body"].strip() == "Body 10"
+
+    async def test_fetch_preserves_requested_order(self, receiver):
+        """Test results follow the order of the requested ids."""
+        imap = FakeIMAP(6)
+
+        emails = await receiver._fetch_emails_imap(imap, [b"6", b"2", b"4"])
+
+        assert imap.fetches == [("2,4,6", "(UID RFC822)")]
+        assert [email_data["id"] for email_data in emails] == ["6", "2", "4"]
+
+    async def test_fake_response_round_trips(self):
+        """Test the fake server output parses back to the stored messages."""
+        imap = FakeIMAP(2)
+        response = await imap.uid("fetch", "1:2", "(UID RFC822)")
+
+        parsed = dict(parse_fetch_response(response.lines))
+
+        assert parsed[102]["UID"] == "2"
+        assert parsed[102]["RFC822"] == build_message(2)
+
+
+class TestIncrementalSync:
+    """Test UID-based caching of fetched messages."""
+
+    @pytest.fixture
+    def cached_receiver(self, tmp_path):
+        email_receiver = EmailReceiver()
+        email_receiver.settings = Settings(
+            _env_file=None,
+            MESSAGE_CACHE_ENABLED=True,
+            MESSAGE_CACHE_DIR=str(tmp_path)
+        )
+        yield email_receiver
+        email_receiver._cache.close()
+
+    async def test_only_new_uids_are_fetched(self, cached_receiver):
+        """Test a repeat call is served from cache and only new mail is fetched."""
+        imap = FakeIMAP(4)
+
+        emails, cached = await cached_receiver._fetch_emails_cached(imap, "INBOX", 7, [1, 2, 3], False)
+        assert cached == 0
+        assert [email_data["id"] for email_data in emails] == ["1", "2", "3"]
+
+        emails, cached = await cached_receiver._fetch_emails_cached(imap, "INBOX", 7, [1, 2, 3], False)
+        assert cached == 3
+        assert len(imap.fetches) == 1
+        assert emails[2]["subject"] == "Message 3"
+
+        emails, cached = await cached_receiver._fetch_emails_cached(imap, "INBOX", 7, [2, 3, 4], False)
+        assert cached == 2
+        assert imap.fetches[-1] == ("4", "(UID RFC822)")
+        assert [email_data["id"] for email_data in emails] == ["2", "3", "4"]
+
+    async def test_uidvalidity_change_invalidates(self, cached_receiver):
+        """Test a new UIDVALIDITY discards cached messages."""
+        imap = FakeIMAP(2)
+        await cached_receiver._fetch_emails_cached(imap, "INBOX", 7, [1, 2], False)
+
+        _, cached = await cached_receiver._fetch_emails_cached(imap, "INBOX", 8, [1, 2], False)
+
+        assert cached == 0
+        assert len(imap.fetches) == 2
+
+    async def test_summary_and_full_cached_separately(self, cached_receiver):
+        """Test full messages are not served for summary listings."""
+        imap = FakeIMAP(1)
+        await cached_receiver._fetch_emails_cached(imap, "INBOX", 7, [1], False)
+
+        _, cached = await cached_receiver._fetch_emails_cached(imap, "INBOX", 7, [1], True)
+
+        assert cached == 0
+
+
+class SummaryIMAP:
+    """Answers summary FETCHes for a multipart message with an attachment."""
+
+    TEXT = (
+        b"--XYZ\r\n"
+        b"Content-Type: text/plain; charset=utf-8\r\n"
+        b"Content-Transfer-Encoding: quoted-printable\r\n"
+        b"\r\n"
+        b"Caf=C3=A9 menu attached=\r\n"
+        b" today\r\n"
+        b"--XYZ\r\n"
+        b"Content-Type: application/pdf\r\n"
+        b"Content-Transfer-Encoding: base64\r\n"
+        b"\r\n"
+        b"JVBERi0xLjQK"
+    )
+
+    def __init__(self):
+        self.fetches = []
+
+    async def uid(self, command: str, message_set: str, message_parts: str) -> Response:
+        self.fetches.append((message_set, message_parts))
+        return Response("OK", [
+            b'1 FETCH (UID 5 RFC822.SIZE 88000 ENVELOPE ("Tue, 2 Jan 2024 10:00:00 +0000" '
+            b'"=?utf-8?q?Men=C3=BC?=" (("Ann" NIL "ann" "example.com")) NIL NIL '
+            b'((NIL NIL "me" "example.com")) NIL NIL NIL "<1@example.com>") '
+            b'BODYSTRUCTURE (("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 30 2 NIL NIL NIL NIL)'
+            b'("APPLICATION" "PDF" ("NAME" "menu.pdf") NIL NIL "BASE64" 86000 NIL '
+            b'("ATTACHMENT" ("FILENAME" "menu.pdf")) NIL NIL) "MIXED" ("BOUNDARY" "XYZ") NIL NIL NIL) '
+            + f"BODY[TEXT]<0> {{{len(self.TEXT)}}}".encode(),
+            bytearray(self.TEXT),
+            b")",
+            b"FETCH completed.",
+        ])
+
+
+class TestSummaryFetch:
+    """Test headers-only listing mode."""
+
+    async def test_summary_fetch_items(self, receiver):
+        """Test listing requests structure and a partial body, not RFC822."""
+        imap = SummaryIMAP()
+
+        emails = await receiver._fetch_emails_imap(imap, [b"5"], summary_only=True)
+
+        (_, message_parts), = imap.fetches
+        assert "RFC822)" not in message_parts
+        assert "BODY.PEEK[TEXT]<0.2048>" in message_parts
+        summary = emails[0]
+        assert summary["id"] == "5"
+        assert summary["subject"] == "Menü"
+        assert summary["from"] == "Ann <ann@example.com>"
+        assert summary["to"] == "me@example.com"
+        assert summary["size"] == 88000
+        assert summary["body"].startswith("Café menu attached today")
+        assert summary["body_length"] == len(summary["body"])
+        assert summary["attachments"] == [{
+            "filename": "menu.pdf",
+            "content_type": "application/pdf",
+            "size": 86000,
+            "section": "2"
+        }]
+        assert summary["has_attachments"] is True
+
+    async def test_summary_html_fallback(self, receiver):
+        """Test HTML-only messages are previewed and their decoded length estimated."""
+        html = "<p>" + "a" * 6000 + "</p>"
+        imap = HTMLSummaryIMAP(html)
+
+        summary, = await receiver._fetch_emails_imap(imap, [b"6"], summary_only=True)
+
+        assert summary["body"].startswith("<p>aaa")
+        assert abs(summary["body_length"] - len(html)) < 10
+
+    async def test_summary_without_bodystructure(self, receiver):
+        """Test a message whose structure is missing is still listed."""
+        summary, = await receiver._fetch_emails_imap(NoStructureIMAP(), [b"7"], summary_only=True)
+
+        assert summary["subject"] == "Plain"
+        assert summary["body"] == "Hello"
+        assert summary["attachments"] == []
+
+    async def test_summary_parse_failure_logged(self, receiver, monkeypatch, caplog):
+        """Test a summary that cannot be built is logged, not silently dropped."""
+        def broken(items, email_id):
+            raise ValueError("bad envelope")
+
+        monkeypatch.setattr(receiver, "_parse_summary", broken)
+
+        assert await receiver._fetch_emails_imap(NoStructureIMAP(), [b"7"], summary_only=True) == []
+        assert "message 7: bad envelope" in caplog.text
+
+
+class HTMLSummaryIMAP:
+    """Answers a summary FETCH for a long base64 HTML-only message."""
+
+    def __init__(self, html: str):
+        lines = base64.encodebytes(html.encode()).replace(b"\n", b"\r\n")
+        self.size = len(lines)
+        self.text = lines[:2048]
+
+    async def uid(self, command: str, message_set: str, message_parts: str) -> Response:
+        return Response("OK", [
+            b'1 FETCH (UID 6 RFC822.SIZE 9000 ENVELOPE (NIL "News" NIL NIL NIL NIL NIL NIL NIL NIL) '
+            + f'BODYSTRUCTURE ("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "BASE64" {self.size} 100 NIL NIL NIL NIL) '.encode()
+            + f"BODY[TEXT]<0> {{{len(self.text)}}}".encode(),
+            bytearray(self.text),
+            b")",
+            b"FETCH completed.",
+        ])
+
+
+class NoStructureIMAP:
+    """Answers a summary FETCH that carries no BODYSTRUCTURE."""
+
+    async def uid(self, command: str, message_set: str, message_parts: str) -> Response:
+        return Response("OK", [
+            b'1 FETCH (UID 7 ENVELOPE (NIL "Plain" NIL NIL NIL NIL NIL NIL NIL NIL) BODY[TEXT]<0> {5}',
+            bytearray(b"Hello"),
+            b")",
+            b"FETCH completed.",
+        ])
+
+
+class PagingIMAP(FakeIMAP):
+    """FakeIMAP that also answers UID SEARCH."""
+
+    def __init__(self, count: int):
+        super().__init__(count)
+        self.searches = 0
+
+    async def uid_search(self, criteria: str) -> Response:
+        self.searches += 1
+        uids = " ".join(str(uid) for uid in sorted(self.messages))
+        return Response("OK", [uids.encode(), b"SEARCH completed."])
+
+
+@pytest.fixture
+def paging_receiver(receiver):
+    """Receiver whose session hands out a PagingIMAP without connecting."""
+    imap = PagingIMAP(7)
+    session = IMAPSession("imap.example.com", 993, "me", "secret", idle_enabled=False)
+    session.uidvalidity = 42
+
+    @asynccontextmanager
+    async def checkout(mailbox=None):
+        yield imap
+
+    session.checkout = checkout
+    receiver._get_session = lambda: session
+    receiver.imap = imap
+    receiver.session = session
+    return receiver
+
+
+class TestPagination:
+    """Test cursor-based paging of IMAP listings."""
+
+    def test_select_page_directions(self):
+        """Test pages walk down from the newest or up from the oldest UID."""
+        uids = [2, 4, 6, 8, 10]
+
+        assert select_page(uids, 2) == ([8, 10], True)
+        assert select_page(uids, 2, position=8) == ([4, 6], True)
+        assert select_page(uids, 2, position=4) == ([2], False)
+        assert select_page(uids, 2, direction="newer") == ([2, 4], True)
+        assert select_page(uids, 2, position=5, direction="newer") == ([6, 8], True)
+        assert select_page(uids, 3, position=6, direction="newer") == ([8, 10], False)
+
+    async def test_later_pages_reuse_search(self, paging_receiver):
+        """Test following the cursor pages through the mailbox with one SEARCH."""
+        pages = []
+        cursor = None
+        while True:
+            result = await paging_receiver.receive_emails_imap(limit=3, cursor=cursor)
+            assert result["status"] == "success"
+            assert result["total"] == 7
+            pages.append([email_data["id"] for email_data in result["emails"]])
+            cursor = result["next_cursor"]
+            if not result["has_more"]:
+                break
+
+        assert pages == [["5", "6", "7"], ["2", "3", "4"], ["1"]]
+        assert cursor is None
+        assert paging_receiver.imap.searches == 1
+
+    async def test_first_page_searches_again(self, paging_receiver):
+        """Test a request without a cursor sees newly arrived mail."""
+        await paging_receiver.receive_emails_imap(limit=3)
+        paging_receiver.imap.messages[8] = build_message(8)
+
+        result = await paging_receiver.receive_emails_imap(limit=3, direction="newer")
+
+        assert paging_receiver.imap.searches == 2
+        assert result["total"] == 8
+        assert [email_data["id"] for email_data in result["emails"]] == ["1", "2", "3"]
+        assert result["next_cursor"] == "42:3"
+
+    async def test_stale_cursor_rejected(self, paging_receiver):
+        """Test a cursor from before a UIDVALIDITY change is refused."""
+        result = await paging_receiver.receive_emails_imap(limit=3)
+        paging_receiver.session.uidvalidity = 43
+
+        result = await paging_receiver.receive_emails_imap(limit=3, cursor=result["next_cursor"])
+
+        assert result["status"] == "error"
+        assert "UIDVALIDITY" in result["message"]
+
+    async def test_invalid_arguments(self, paging_receiver):
+        """Test malformed cursors and directions are reported."""
+        result = await paging_receiver.receive_emails_imap(cursor="abc")
+        assert result["status"] == "error"
+
+        result = await paging_receiver.receive_emails_imap(direction="sideways")
+        assert result["status"] == "error"
+        assert paging_receiver.imap.searches == 0
+
+    async def test_trace_export(self, paging_receiver, tmp_path):
+        """Test TRACING_ENABLED traces every listing and appends OTLP/JSON lines."""
+        export_file = tmp_path / "traces.jsonl"
+        paging_receiver.settings = Settings(
+            _env_file=None,
+            IMAP_FETCH_BATCH_SIZE=4,
+            MESSAGE_CACHE_ENABLED=False,
+            TRACING_ENABLED=True,
+            TRACE_EXPORT_FILE=str(export_file)
+        )
+
+        result = await paging_receiver.receive_emails_imap(limit=3)
+
+        names = [span["name"] for span in result["details"]["trace"]["spans"]]
+        assert names == ["imap.search", "imap.fetch", "parse"]
+        exported = json.loads(export_file.read_text())
+        spans = exported["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert [span["name"] for span in spans] == ["receive_emails_imap"] + names
+
+
+class TestSearchFilters:
+    """Test server-side filtering of IMAP listings."""
+
+    async def test_filters_sent_as_single_search(self, paging_receiver):
+        """Test filters reach the server as one SEARCH and results are paged."""
+        criteria = []
+        search = paging_receiver.imap.uid_search
+
+        async def recording_search(value):
+            criteria.append(value)
+            return await search(value)
+
+        paging_receiver.imap.uid_search = recording_search
+
+        result = await paging_receiver.receive_emails_imap(
+            limit=2,
+            unread_only=True,
+            filters={"from_address": "sender3@example.com", "since": "2024-01-02"}
+        )
+
+        assert result["status"] == "success"
+        assert criteria == ['UNSEEN FROM "sender3@example.com" SINCE 2-Jan-2024']
+
+    async def test_invalid_filter_reported(self, paging_receiver):
+        """Test bad filters are rejected before anything is sent."""
+        result = await paging_receiver.receive_emails_imap(filters={"since": "last week"})
+
+        assert result["status"] == "error"
+        assert "Invalid search filters" in result["message"]
+        assert paging_receiver.imap.searches == 0
+
+    async def test_gmail_query_requires_capability(self, paging_receiver):
+        """Test X-GM-RAW is only sent to servers advertising Gmail extensions."""
+        paging_receiver.imap.has_capability = lambda name: False
+
+        result = await paging_receiver.receive_emails_imap(filters={"gmail_query": "is:starred"})
+
+        assert result["status"] == "error"
+        assert "X-GM-RAW" in result["message"]
+
+        paging_receiver.imap.has_capability = lambda name: name == "X-GM-EXT-1"
+        result = await paging_receiver.receive_emails_imap(filters={"gmail_query": "is:starred"})
+
+        assert result["status"] == "success"
+
+
+class MailboxIMAP(PagingIMAP):
+    """PagingIMAP holding dated messages, one instance per mailbox."""
+
+    def __init__(self, days):
+        super().__init__(0)
+        self.messages = {
+            uid: build_message(uid).replace(
+                b"\r\n\r\n", f"\r\nDate: {day:02d} Jan 2024 12:00:00 +0000\r\n\r\n".encode(), 1
+            )
+            for uid, day in enumerate(days, 1)
+        }
+
+
+@pytest.fixture
+def multi_receiver(receiver):
+    """Receiver with one fake session per slot over three dated mailboxes."""
+    receiver.settings = Settings(
+        _env_file=None,
+        IMAP_FETCH_BATCH_SIZE=4,
+        IMAP_MAILBOX_CONNECTIONS=2,
+        MESSAGE_CACHE_ENABLED=False
+    )
+    receiver.mailboxes = {
+        "INBOX": MailboxIMAP([1, 3, 5]),
+        "Sent": MailboxIMAP([2, 4]),
+        "Archive": MailboxIMAP([6])
+    }
+    receiver.active = receiver.peak = 0
+    receiver.slots = []
+
+    def get_session(slot=0):
+        session = IMAPSession("imap.example.com", 993, "me", "secret", idle_enabled=False)
+        session.uidvalidity = 42
+
+        @asynccontextmanager
+        async def checkout(mailbox=None):
+            imap = receiver.mailboxes[mailbox]
+            if isinstance(imap, Exception):
+                raise imap
+            receiver.active += 1
+            receiver.peak = max(receiver.peak, receiver.active)
+            try:
+                await asyncio.sleep(0)
+                yield imap
+            finally:
+                receiver.active -= 1
+
+        session.checkout = checkout
+        receiver.slots.append(slot)
+        return session
+
+    receiver._get_session = get_session
+    return receiver
+
+
+class TestMultiMailbox:
+    """Test concurrent listing of several IMAP mailboxes."""
+
+    async def test_merged_newest_first(self, multi_receiver):
+        """Test emails from every mailbox are merged by date under one limit."""
+        result = await multi_receiver.receive_emails_multi(["INBOX", "Sent", "Archive"], limit=4)
+
+        assert result["status"] == "success"
+        assert [(e["mailbox"], e["id"]) for e in result["emails"]] == [
+            ("Archive", "1"), ("INBOX", "3"), ("Sent", "2"), ("INBOX", "2")
+        ]
+        assert result["mailboxes"]["INBOX"] == {"status": "success", "total": 3, "cached": 0}
+        # Each mailbox only downloads its own newest ``limit`` messages
+        assert multi_receiver.mailboxes["INBOX"].fetches[0][0] == "1:3"
+
+    async def test_connections_bounded(self, multi_receiver):
+        """Test mailboxes are read in parallel over IMAP_MAILBOX_CONNECTIONS sessions."""
+        await multi_receiver.receive_emails_multi(["INBOX", "Sent", "Archive", "INBOX"])
+
+        assert sorted(multi_receiver.slots) == [0, 1]
+        assert multi_receiver.peak == 2
+        assert multi_receiver.mailboxes["INBOX"].searches == 1
+
+    async def test_partial_failure(self, multi_receiver):
+        """Test a failing mailbox is reported without losing the others."""
+        multi_receiver.mailboxes["Sent"] = OSError("connection reset")
+
+        result = await multi_receiver.receive_emails_multi(["INBOX", "Sent"], limit=10)
+
+        assert result["status"] == "partial"
+        assert result["count"] == 3
+        assert result["mailboxes"]["Sent"]["status"] == "error"
+        assert "connection reset" in result["mailboxes"]["Sent"]["message"]
+
+    async def test_invalid_arguments(self, multi_receiver):
+        """Test an empty mailbox list and bad filters are rejected up front."""
+        assert (await multi_receiver.receive_emails_multi([]))["status"] == "error"
+
+        result = await multi_receiver.receive_emails_multi(["INBOX"], filters={"since": "soon"})
+
+        assert result["status"] == "error"
+        assert multi_receiver.slots == []
+
+
+class AttachmentIMAP:
+    """Serves one message with a base64 attachment in section 2."""
+
+    def __init__(self, payload: bytes):
+        encoded = base64.encodebytes(payload).replace(b"\n", b"\r\n")
+        self.sections = {"1": b"Hello\r\n", "2": encoded}
+        self.fetches = []
+
+    async def uid(self, command: str, message_set: str, message_parts: str) -> Response:
+        self.fetches.append(message_parts)
+        if message_parts == "(UID BODYSTRUCTURE)":
+            structure = (
+                '(("text" "plain" ("charset" "utf-8") NIL NIL "7bit" 7 1 NIL NIL NIL)'
+                f'("application" "pdf" ("name" "report.pdf") NIL NIL "base64" {len(self.sections["2"])} '
+                'NIL ("attachment" ("filename" "report.pdf")) NIL) "mixed" ("boundary" "b") NIL NIL)'
+            )
+            return Response("OK", [f"1 FETCH (UID {message_set} BODYSTRUCTURE {structure})".encode(), b"done"])
+        match = re.match(r"\(BODY\.PEEK\[(.+)\]<(\d+)\.(\d+)>\)", message_parts)
+        section, offset, length = match.group(1), int(match.group(2)), int(match.group(3))
+        chunk = self.sections[section][offset:offset + length]
+        return Response("OK", [
+            f"1 FETCH (UID {message_set} BODY[{section}]<{offset}> {{{len(chunk)}}}".encode(),
+            bytearray(chunk),
+            b")",
+            b"done"
+        ])
+
+
+class TestWaitForNewEmails:
+    """Test waiting for IDLE notifications."""
+
+    async def test_idle_disabled_reported(self, receiver):
+        """Test waiting fails at once instead of timing out when IDLE is off."""
+        receiver.settings = Settings(_env_file=None, IMAP_IDLE_ENABLED=False)
+
+        def no_session():
+            raise AssertionError("connected although IDLE is disabled")
+
+        receiver._get_session = no_session
+
+        result = await asyncio.wait_for(receiver.wait_for_new_emails(timeout=30), 1)
+
+        assert result["status"] == "error"
+        assert "IMAP_IDLE_ENABLED" in result["message"]
+
+
+class TestDownloadAttachment:
+    """Test chunked attachment downloads."""
+
+    @pytest.fixture
+    def download_receiver(self, paging_receiver, tmp_path):
+        paging_receiver.settings = Settings(
+            _env_file=None,
+            ATTACHMENT_DOWNLOAD_DIR=str(tmp_path),
+            IMAP_ATTACHMENT_CHUNK_BYTES=1000,
+            MESSAGE_CACHE_ENABLED=False
+        )
+        payload = bytes(range(256)) * 40
+        imap = AttachmentIMAP(payload)
+        session = paging_receiver.session
+
+        @asynccontextmanager
+        async def checkout(mailbox=None):
+            yield imap
+
+        session.checkout = checkout
+        paging_receiver.imap = imap
+        paging_receiver.payload = payload
+        return paging_receiver
+
+    async def test_part_streamed_in_chunks(self, download_receiver, tmp_path):
+        """Test only the attachment part is fetched, in bounded chunks."""
+        result = await download_receiver.download_attachment(7, section="2")
+
+        assert result["status"] == "success"
+        path = tmp_path / "report.pdf"
+        assert path.read_bytes() == download_receiver.payload
+        assert result["details"]["size"] == len(download_receiver.payload)
+        fetches = download_receiver.imap.fetches[1:]
+        assert len(fetches) == len(download_receiver.imap.sections["2"]) // 1000 + 1
+        assert all(fetch.startswith("(BODY.PEEK[2]<") for fetch in fetches)
+
+    async def test_found_by_filename_without_overwriting(self, download_receiver, tmp_path):
+        """Test lookup by filename and that existing files are kept."""
+        (tmp_path / "report.pdf").write_bytes(b"old")
+
+        result = await download_receiver.download_attachment(7, filename="report.pdf")
+
+        assert result["status"] == "success"
+        assert (tmp_path / "report.pdf").read_bytes() == b"old"
+        assert (tmp_path / "report (1).pdf").read_bytes() == download_receiver.payload
+
+    async def test_exact_size_part_needs_no_extra_fetch(self, download_receiver, tmp_path):
+        """Test the download stops once the part's BODYSTRUCTURE size is read."""
+        download_receiver.settings = download_receiver.settings.model_copy(
+            update={"IMAP_ATTACHMENT_CHUNK_BYTES": len(download_receiver.imap.sections["2"])}
+        )
+
+        result = await download_receiver.download_attachment(7, section="2")
+
+        assert result["status"] == "success"
+        assert (tmp_path / "report.pdf").read_bytes() == download_receiver.payload
+        assert len(download_receiver.imap.fetches) == 2
+
+    async def test_missing_body_item_fails(self, download_receiver, tmp_path):
+        """Test a FETCH reply without the part's data is an error, not a short file."""
+        uid = download_receiver.imap.uid
+
+        async def no_body(command, message_set, message_parts):
+            if message_parts.startswith("(BODY.PEEK["):
+                return Response("OK", [f"1 FETCH (UID {message_set})".encode(), b"done"])
+            return await uid(command, message_set, message_parts)
+
+        download_receiver.imap.uid = no_body
+
+        result = await download_receiver.download_attachment(7, section="2")
+
+        assert result["status"] == "error"
+        assert "no data for section 2" in result["message"]
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_missing_attachment(self, download_receiver):
+        """Test unknown sections are reported without downloading."""
+        result = await download_receiver.download_attachment(7, section="5")
+
+        assert result["status"] == "error"
+        assert download_receiver.imap.fetches == ["(UID BODYSTRUCTURE)"]
@@ -0,0 +1,213 @@
+"""
+Tests for the email sending service.
+"""
+
+import asyncio
+import pytest
+import aiosmtplib
+
+from src.config import Settings
+from src.services.email_sender import EmailSender
+
+
+@pytest.fixture
+def sender():
+    """EmailSender with isolated settings and SMTP delivery captured."""
+    email_sender = EmailSender()
+    email_sender.settings = Settings(
+        _env_file=None,
+        DEFAULT_FROM_EMAIL="sender@example.com",
+        SMTP_POOL_MAX_SIZE=3,
+        BULK_SEND_CONCURRENCY=10
+    )
+    email_sender.sent = []
+    email_sender.active = 0
+    email_sender.peak = 0
+
+    async def fake_send(message, sender_email, recipients):
+        email_sender.active += 1
+        email_sender.peak = max(email_sender.peak, email_sender.active)
+        await asyncio.sleep(0.01)
+        email_sender.active -= 1
+        if "fail@example.com" in recipients:
+            raise RuntimeError("550 mailbox unavailable")
+        email_sender.sent.append((message, sender_email, recipients))
+
+    email_sender._send_smtp_message = fake_send
+    return email_sender
+
+
+class TestSendEmail:
+    """Test single email sending."""
+
+    async def test_send_email(self, sender):
+        """Test a valid email is composed and delivered."""
+        result = await sender.send_email(
+            recipient="user@example.com",
+            subject="Hello",
+            body="Hi there",
+            cc=["cc@example.com"],
+            bcc=["bcc@example.com"]
+        )
+
+        assert result["status"] == "success"
+        message, sender_email, recipients = sender.sent[0]
+        assert sender_email == "sender@example.com"
+        assert recipients == ["user@example.com", "cc@example.com", "bcc@example.com"]
+        assert message["Cc"] == "cc@example.com"
+
+    async def test_large_body_rendered_in_pool(self, sender):
+        """Test bodies above the offload threshold are built and rendered in a worker."""
+        sender.settings = sender.settings.model_copy(update={"CPU_OFFLOAD_THRESHOLD_BYTES": 1000})
+
+        result = await sender.send_email(recipient="user@example.com", subject="Big", body="Grüße\n" * 500)
+
+        assert result["status"] == "success"
+        message = sender.sent[0][0]
+        assert isinstance(message, bytes)
+        assert b"\r\nTo: user@example.com\r\n" in message
+        assert b"\n" not in message.replace(b"\r\n", b"")
+
+    async def test_send_email_invalid_recipient(self, sender):
+        """Test an invalid recipient is rejected before sending."""
+        result = await sender.send_email(recipient="not-an-email", subject="", body="x")
+
+        assert result["status"] == "error"
+        assert "Invalid recipient" in result["message"]
+        assert sender.sent == []
+
+    async def test_send_email_trace(self, sender):
+        """Test a traced send reports its phases in the details."""
+        result = await sender.send_email(
+            recipient="user@example.com", subject="Hello", body="Hi", trace=True
+        )
+
+        trace = result["details"]["trace"]
+        assert [span["name"] for span in trace["spans"]] == ["validate", "mime_build"]
+        assert trace["total_ms"] >= trace["spans"][-1]["duration_ms"]
+        assert "trace" not in (await sender.send_email(
+            recipient="user@example.com", subject="Hello", body="Hi"
+        ))["details"]
+
+
+class TestSendMany:
+    """Test bulk email sending."""
+
+    async def test_send_many_results_in_order(self, sender):
+        """Test per-message results keep input order and report failures."""
+        messages = [
+            {"recipient": "a@example.com", "subject": "1", "body": "one"},
+            {"recipient": "invalid", "body": "two"},
+            {"recipient": "fail@example.com", "body": "three"},
+            {"recipient": "b@example.com", "body": "four", "bogus": True},
+            {"recipient": "c@example.com", "body": "five"},
+        ]
+
+        result = await sender.send_many(messages)
+
+        assert result["status"] == "partial"
+        assert result["sent"] == 2
+        assert result["failed"] == 3
+        statuses = [item["status"] for item in result["results"]]
+        assert statuses == ["success", "error", "error", "error", "success"]
+        assert [item["index"] for item in result["results"]] == [0, 1, 2, 3, 4]
+        assert "bogus" in result["results"][3]["message"]
+
+    async def test_send_many_validates_before_sending(self, sender):
+        """Test a missing body is caught without any SMTP traffic for that spec."""
+        result = await sender.send_many([{"recipient": "a@example.com"}])
+
+        assert result["status"] == "error"
+        assert "body" in result["results"][0]["message"]
+        assert sender.sent == []
+
+    async def test_send_many_concurrency_capped_by_pool(self, sender):
+        """Test dispatch never exceeds the SMTP pool size."""
+        messages = [
+            {"recipient": f"user{i}@example.com", "body": "hi"} for i in range(12)
+        ]
+
+        result = await sender.send_many(messages)
+
+        assert result["status"] == "success"
+        assert len(sender.sent) == 12
+        assert sender.peak == 3
+
+    async def test_send_many_explicit_concurrency(self, sender):
+        """Test an explicit concurrency below the pool size is honoured."""
+        messages = [
+            {"recipient": f"user{i}@example.com", "body": "hi"} for i in range(6)
+        ]
+
+        await sender.send_many(messages, concurrency=1)
+
+        assert sender.peak == 1
+
+
+class TestSendFanout:
+    """Test multi-recipient fan-out sending."""
+
+    @pytest.fixture
+    def fanout_sender(self):
+        email_sender = EmailSender()
+        email_sender.settings = Settings(
+            _env_file=None,
+            DEFAULT_FROM_EMAIL="sender@example.com",
+            SMTP_MAX_RECIPIENTS_PER_TRANSACTION=2
+        )
+        email_sender.transactions = []
+
+        async def fake_send(message, sender_email, recipients):
+            email_sender.transactions.append((message, recipients))
+            if all(address.startswith("gone") for address in recipients):
+                raise aiosmtplib.SMTPRecipientsRefused([
+                    aiosmtplib.SMTPRecipientRefused(550, "no such user", address)
+                    for address in recipients
+                ])
+            refused = {
+                address: aiosmtplib.SMTPResponse(550, "no such user")
+                for address in recipients if address.startswith("gone")
+            }
+            return refused, "queued"
+
+        email_sender._send_smtp_message = fake_send
+        return email_sender
+
+    async def test_groups_by_domain_and_caps_transaction_size(self, fanout_sender):
+        """Test recipients are batched per domain within the RCPT limit."""
+        recipients = [
+            "a1@a.com", "b1@b.com", "a2@a.com", "a3@a.com", "gone@b.com", "A1@a.com"
+        ]
+
+        result = await fanout_sender.send_fanout(recipients, subject="Hi", body="Hello")
+
+        batches = [batch for _, batch in fanout_sender.transactions]
+        assert sorted(batches) == [["a1@a.com", "a2@a.com"], ["a3@a.com"], ["b1@b.com", "gone@b.com"]]
+        assert result["transactions"] == 3
+        assert result["status"] == "partial"
+        assert [item["status"] for item in result["results"]] == [
+            "accepted", "accepted", "accepted", "accepted", "rejected", "accepted"
+        ]
+        assert result["results"][4]["code"] == 550
+
+    async def test_message_rendered_once(self, fanout_sender):
+        """Test every transaction carries the same pre-rendered body."""
+        await fanout_sender.send_fanout(
+            ["a@a.com", "b@b.com", "c@c.com"], subject="Hi", body="Hello"
+        )
+
+        bodies = {id(message) for message, _ in fanout_sender.transactions}
+        message = fanout_sender.transactions[0][0]
+        assert len(bodies) == 1
+        assert isinstance(message, bytes)
+        assert b"undisclosed-recipients" in message
+
+    async def test_all_refused_and_invalid(self, fanout_sender):
+        """Test refused and invalid recipients are reported without success."""
+        result = await fanout_sender.send_fanout(
+            ["gone1@a.com", "not-an-email"], subject="Hi", body="Hello"
+        )
+
+        assert result["status"] == "error"
+        assert result["results"][0]["status"] == "rejected"
+        assert result["results"][1]["message"].startswith("Invalid recipient")
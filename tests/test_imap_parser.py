@@ -0,0 +1,192 @@
+"""
+Tests for IMAP request building and FETCH response parsing.
+"""
+
+import pytest
+
+from src.utils.imap_parser import (
+    build_search_criteria,
+    chunked,
+    iter_parts,
+    parse_bodystructure,
+    parse_envelope,
+    parse_fetch_response,
+    sequence_set,
+)
+
+
+class TestSequenceSet:
+    """Test sequence set construction."""
+
+    def test_collapses_runs(self):
+        """Test consecutive ids are collapsed into ranges."""
+        assert sequence_set([1, 2, 3, 5, 7, 8]) == "1:3,5,7:8"
+
+    def test_accepts_bytes_and_strings(self):
+        """Test ids from SEARCH responses are accepted as-is."""
+        assert sequence_set([b"4", "2", 3]) == "2:4"
+
+    def test_chunked(self):
+        """Test ids are split into fixed-size chunks."""
+        assert list(chunked([1, 2, 3, 4, 5], 2)) == [[1, 2], [3, 4], [5]]
+
+
+class TestSearchCriteria:
+    """Test compiling structured filters into SEARCH criteria."""
+
+    def test_no_filters_matches_all(self):
+        """Test empty and unset filters fall back to ALL or UNSEEN."""
+        assert build_search_criteria() == "ALL"
+        assert build_search_criteria({"subject": None, "headers": {}}, unread_only=True) == "UNSEEN"
+
+    def test_filters_combined_in_one_search(self):
+        """Test every filter becomes one ANDed search key."""
+        criteria = build_search_criteria({
+            "from_address": "boss@example.com",
+            "subject": "Q3 report",
+            "since": "2024-03-05",
+            "before": "2024-12-31",
+            "larger_than": 1024,
+            "headers": {"List-Id": "announce"},
+            "gmail_query": "has:attachment"
+        }, unread_only=True)
+
+        assert criteria == (
+            'UNSEEN FROM "boss@example.com" SUBJECT "Q3 report" '
+            'SINCE 5-Mar-2024 BEFORE 31-Dec-2024 LARGER 1024 '
+            'HEADER List-Id "announce" X-GM-RAW "has:attachment"'
+        )
+
+    def test_values_are_quoted(self):
+        """Test quotes and backslashes are escaped inside quoted strings."""
+        assert build_search_criteria({"subject": 'say "hi" \\o/'}) == 'SUBJECT "say \\"hi\\" \\\\o/"'
+
+    @pytest.mark.parametrize("filters", [
+        {"subject": "a\r\nX LOGOUT"},
+        {"since": "yesterday"},
+        {"larger_than": -1},
+        {"headers": {"Bad Name": "x"}},
+        {"to_address": "me@example.com"},
+    ])
+    def test_invalid_filters_rejected(self, filters):
+        """Test injection attempts and malformed values raise ValueError."""
+        with pytest.raises(ValueError):
+            build_search_criteria(filters)
+
+
+class TestParseFetchResponse:
+    """Test FETCH response parsing."""
+
+    def test_multi_message_literals(self):
+        """Test several messages with literal bodies in one response."""
+        lines = [
+            b"1 FETCH (RFC822 {5}",
+            bytearray(b"hello"),
+            b")",
+            b"2 FETCH (UID 42 RFC822 {3}",
+            bytearray(b"abc"),
+            b")",
+            b"FETCH completed.",
+        ]
+
+        messages = parse_fetch_response(lines)
+
+        assert messages == [
+            (1, {"RFC822": b"hello"}),
+            (2, {"UID": "42", "RFC822": b"abc"}),
+        ]
+
+    def test_items_after_literal(self):
+        """Test data items that follow a literal on the closing line."""
+        lines = [
+            b"3 FETCH (BODY[TEXT]<0> {2}",
+            bytearray(b"hi"),
+            b" RFC822.SIZE 1024 FLAGS (\\Seen))",
+            b"FETCH completed.",
+        ]
+
+        (seq, items), = parse_fetch_response(lines)
+
+        assert seq == 3
+        assert items["BODY[TEXT]<0>"] == b"hi"
+        assert items["RFC822.SIZE"] == "1024"
+        assert items["FLAGS"] == ["\\Seen"]
+
+    def test_nested_lists_and_strings(self):
+        """Test quoted strings, NIL and nested lists."""
+        lines = [
+            b'7 FETCH (ENVELOPE ("Mon, 1 Jan 2024 00:00:00 +0000" "Hi \\"there\\"" '
+            b'(("Ann" NIL "ann" "example.com")) NIL NIL NIL NIL NIL NIL "<id@x>"))',
+            b"FETCH completed.",
+        ]
+
+        (seq, items), = parse_fetch_response(lines)
+        envelope = items["ENVELOPE"]
+
+        assert envelope[1] == 'Hi "there"'
+        assert envelope[2] == [["Ann", None, "ann", "example.com"]]
+        assert envelope[9] == "<id@x>"
+
+    def test_ignores_unrelated_lines(self):
+        """Test non-FETCH lines are skipped."""
+        assert parse_fetch_response([b"5 EXISTS", b"Done"]) == []
+
+
+BODYSTRUCTURE_LINE = (
+    b'9 FETCH (BODYSTRUCTURE (("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL '
+    b'"QUOTED-PRINTABLE" 12 1 NIL NIL NIL NIL)("APPLICATION" "PDF" ("NAME" "report.pdf") '
+    b'NIL NIL "BASE64" 4096 NIL ("ATTACHMENT" ("FILENAME" "report.pdf")) NIL NIL) '
+    b'"MIXED" ("BOUNDARY" "XYZ") NIL NIL NIL))'
+)
+
+
+class TestStructureParsing:
+    """Test ENVELOPE and BODYSTRUCTURE parsing."""
+
+    def test_parse_bodystructure_multipart(self):
+        """Test sections, encodings and attachment metadata are derived."""
+        (_, items), = parse_fetch_response([BODYSTRUCTURE_LINE, b"Done"])
+
+        structure = parse_bodystructure(items["BODYSTRUCTURE"])
+        text, pdf = list(iter_parts(structure))
+
+        assert structure["content_type"] == "multipart/mixed"
+        assert structure["params"]["boundary"] == "XYZ"
+        assert text["section"] == "1"
+        assert text["encoding"] == "quoted-printable"
+        assert text["params"]["charset"] == "utf-8"
+        assert pdf["section"] == "2"
+        assert pdf["disposition"] == "attachment"
+        assert pdf["filename"] == "report.pdf"
+        assert pdf["size"] == 4096
+
+    def test_parse_bodystructure_single_part(self):
+        """Test a non-multipart message is section 1."""
+        structure = parse_bodystructure(
+            ["TEXT", "HTML", ["CHARSET", "us-ascii"], None, None, "7BIT", "20", "2"]
+        )
+
+        assert structure["content_type"] == "text/html"
+        assert structure["section"] == "1"
+        assert structure["size"] == 20
+
+    def test_parse_bodystructure_missing(self):
+        """Test a missing structure still describes a complete part."""
+        structure = parse_bodystructure(None)
+
+        assert structure["content_type"] == "text/plain"
+        assert structure["encoding"] == "7bit"
+        assert (structure["size"], structure["disposition"], structure["filename"]) == (0, "", "")
+
+    def test_parse_envelope_addresses(self):
+        """Test address lists and groups in an ENVELOPE."""
+        envelope = parse_envelope([
+            "Tue, 2 Jan 2024 10:00:00 +0000", "Hi",
+            [["Ann", None, "ann", "example.com"]], None, None,
+            [[None, None, "team", None], ["Bob", None, "bob", "example.com"], [None, None, None, None]],
+            None, None, None, "<1@example.com>",
+        ])
+
+        assert envelope["from"] == [("Ann", "ann@example.com")]
+        assert envelope["to"] == [("Bob", "bob@example.com")]
+        assert envelope["message_id"] == "<1@example.com>"
@@ -0,0 +1,171 @@
+"""
+Tests for persistent IMAP sessions.
+"""
+
+import pytest
+from aioimaplib import Response
+
+from src.config import Settings
+from src.services.email_receiver import EmailReceiver
+from src.services.imap_session import IMAPSession
+
+
+class FakeTransport:
+    def __init__(self):
+        self.closed = False
+
+    def is_closing(self):
+        return self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class FakeProtocol:
+    def __init__(self):
+        self.transport = FakeTransport()
+
+
+class FakeClient:
+    """Just enough of aioimaplib.IMAP4 for session management."""
+
+    def __init__(self, log):
+        self.log = log
+        self.protocol = FakeProtocol()
+        self.state = "NONAUTH"
+
+    def get_state(self):
+        return self.state
+
+    def has_capability(self, capability):
+        return False
+
+    async def wait_hello_from_server(self):
+        self.log.append("hello")
+
+    async def login(self, user, password):
+        self.log.append("login")
+        self.state = "AUTH"
+        return Response("OK", [b"LOGIN completed"])
+
+    async def select(self, mailbox):
+        self.log.append(f"select {mailbox}")
+        self.state = "SELECTED"
+        return Response("OK", [b"3 EXISTS", b"SELECT completed"])
+
+    async def uid_search(self, criteria):
+        self.log.append(f"search {criteria}")
+        return Response("OK", [b"", b"SEARCH completed"])
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def receiver(monkeypatch, log):
+    clients = []
+
+    def create_client(self):
+        client = FakeClient(log)
+        clients.append(client)
+        return client
+
+    monkeypatch.setattr(IMAPSession, "_create_client", create_client)
+    email_receiver = EmailReceiver()
+    email_receiver.settings = Settings(
+        _env_file=None,
+        IMAP_RECONNECT_BACKOFF=0.0,
+        MESSAGE_CACHE_ENABLED=False
+    )
+    email_receiver.clients = clients
+    return email_receiver
+
+
+class TestIMAPSession:
+    """Test session reuse and reconnection."""
+
+    async def test_session_reused_across_calls(self, receiver, log):
+        """Test repeated calls log in and select once."""
+        for _ in range(3):
+            result = await receiver.receive_emails_imap(mailbox="INBOX")
+            assert result["status"] == "success"
+
+        assert log.count("login") == 1
+        assert log.count("select INBOX") == 1
+        assert log.count("search ALL") == 3
+
+    async def test_changing_mailbox_reselects(self, receiver, log):
+        """Test a different mailbox is selected on the same connection."""
+        await receiver.receive_emails_imap(mailbox="INBOX")
+        await receiver.receive_emails_imap(mailbox="Sent")
+
+        assert log.count("login") == 1
+        assert log[-2:] == ["select Sent", "search ALL"]
+
+    async def test_reconnects_after_disconnect(self, receiver, log):
+        """Test a dropped transport triggers a fresh login."""
+        await receiver.receive_emails_imap()
+        receiver.clients[0].protocol.transport.close()
+        await receiver.receive_emails_imap()
+
+        assert log.count("login") == 2
+        assert len(receiver.clients) == 2
+
+    async def test_stats_report_session_occupancy(self, receiver):
+        """Test checked-out and idle sessions are counted separately."""
+        assert receiver.stats()["sessions"] == {"in_use": 0, "idle": 0, "max_size": 3}
+
+        await receiver.receive_emails_imap()
+        assert receiver.stats()["sessions"]["idle"] == 1
+
+        async with receiver._get_session().checkout():
+            assert receiver.stats()["sessions"] == {"in_use": 1, "idle": 0, "max_size": 3}
+
+    async def test_connect_retries_with_backoff(self, receiver, monkeypatch, log):
+        """Test a failed connection attempt is retried."""
+        attempts = []
+        original = FakeClient.wait_hello_from_server
+
+        async def flaky_hello(self):
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise OSError("connection refused")
+            await original(self)
+
+        monkeypatch.setattr(FakeClient, "wait_hello_from_server", flaky_hello)
+
+        result = await receiver.receive_emails_imap()
+
+        assert result["status"] == "success"
+        assert len(attempts) == 2
+
+    async def test_idle_push_signals_new_mail(self):
+        """Test EXISTS pushes beyond the known count flag new mail."""
+        session = IMAPSession("imap.example.com", 993, "user", "secret")
+        session.exists = 3
+
+        session.handle_push([b"3 EXISTS"])
+        assert session.has_new_mail() is False
+
+        session.handle_push([b"5 EXISTS", b"1 RECENT"])
+        assert session.has_new_mail() is True
+        assert session.exists == 5
+        assert await session.wait_for_new_mail(timeout=0.1) is True
+        assert await session.wait_for_new_mail(timeout=0.01) is False
+
+    async def test_search_results_dropped_on_mailbox_change(self):
+        """Test a stored SEARCH is reused until the mailbox size changes."""
+        session = IMAPSession("imap.example.com", 993, "user", "secret")
+        session.selected = "INBOX"
+        session.exists = 3
+        session.uidvalidity = 9
+        session.remember_search("INBOX", "ALL", [3, 1, 2])
+
+        assert session.cached_search("INBOX", "ALL", max_age=60) == [1, 2, 3]
+        assert session.cached_search("INBOX", "ALL", max_age=-1) is None
+
+        session.remember_search("INBOX", "ALL", [1, 2, 3])
+        session.handle_push([b"4 EXISTS"])
+        assert session.cached_search("INBOX", "ALL", max_age=60) is None
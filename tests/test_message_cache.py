@@ -0,0 +1,67 @@
+"""
+Tests for the on-disk message cache.
+"""
+
+import pytest
+
+from src.services.message_cache import MessageCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    message_cache = MessageCache(str(tmp_path))
+    yield message_cache
+    message_cache.close()
+
+
+class TestMessageCache:
+    """Test UID-keyed message caching."""
+
+    def test_round_trip(self, cache):
+        """Test stored messages are returned."""
+        cache.sync_mailbox("acct", "INBOX", 1)
+        cache.put_messages("acct", "INBOX", {3: {"id": "3"}, 9: {"id": "9"}}, "full")
+
+        assert cache.get_messages("acct", "INBOX", [3, 4, 9], "full") == {
+            3: {"id": "3"},
+            9: {"id": "9"},
+        }
+        cache.sync_mailbox("acct", "INBOX", 1)
+        assert set(cache.get_messages("acct", "INBOX", [3, 9], "full")) == {3, 9}
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test the cache survives a restart."""
+        first = MessageCache(str(tmp_path))
+        first.sync_mailbox("acct", "INBOX", 1)
+        first.put_messages("acct", "INBOX", {5: {"subject": "Héllo"}}, "summary")
+        first.close()
+
+        second = MessageCache(str(tmp_path))
+        try:
+            assert second.get_messages("acct", "INBOX", [5], "summary") == {5: {"subject": "Héllo"}}
+        finally:
+            second.close()
+
+    def test_uidvalidity_change_drops_entries(self, cache):
+        """Test entries from an old UIDVALIDITY are discarded."""
+        cache.sync_mailbox("acct", "INBOX", 1)
+        cache.put_messages("acct", "INBOX", {1: {"id": "1"}}, "full")
+
+        cache.sync_mailbox("acct", "INBOX", 2)
+        assert cache.get_messages("acct", "INBOX", [1], "full") == {}
+
+    def test_mailboxes_are_isolated(self, cache):
+        """Test the same UID in different mailboxes does not collide."""
+        cache.sync_mailbox("acct", "INBOX", 1)
+        cache.sync_mailbox("acct", "Sent", 1)
+        cache.put_messages("acct", "INBOX", {1: {"box": "inbox"}}, "full")
+
+        assert cache.get_messages("acct", "Sent", [1], "full") == {}
+
+    def test_prune_removes_expunged(self, cache):
+        """Test UIDs missing from the server are pruned."""
+        cache.sync_mailbox("acct", "INBOX", 1)
+        cache.put_messages("acct", "INBOX", {1: {}, 2: {}, 3: {}}, "full")
+
+        assert cache.prune("acct", "INBOX", [1, 3]) == 1
+        assert set(cache.get_messages("acct", "INBOX", [1, 2, 3], "full")) == {1, 3}
@@ -0,0 +1,79 @@
+"""
+Tests for the lazy message parser.
+"""
+
+import email
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from src.utils.message_parser import ParsedMessage
+
+
+def build_multipart(body: str, charset: str = "utf-8", html: bool = False) -> email.message.Message:
+    message = MIMEMultipart()
+    message["Subject"] = "=?utf-8?b?7JWI64WV?="
+    message.attach(MIMEText(body, "html" if html else "plain", charset))
+    attachment = MIMEApplication(b"%PDF" * 1000, "pdf", Name="report.pdf")
+    attachment.add_header("Content-Disposition", "attachment", filename="report.pdf")
+    message.attach(attachment)
+    return email.message_from_bytes(message.as_bytes())
+
+
+class TestParsedMessage:
+    """Test single-pass, partial decoding of messages."""
+
+    def test_body_and_attachments(self):
+        """Test the text part is previewed and attachments are listed."""
+        parsed = ParsedMessage(build_multipart("Hello there"))
+
+        assert parsed.subject == "안녕"
+        assert parsed.body == "Hello there"
+        assert parsed.body_length == len("Hello there")
+        assert parsed.attachments == [{"filename": "report.pdf", "content_type": "application/pdf"}]
+
+    def test_charset_honoured(self):
+        """Test bodies are decoded with their declared charset."""
+        parsed = ParsedMessage(build_multipart("Grüße aus Köln", charset="iso-8859-1"))
+
+        assert parsed.body == "Grüße aus Köln"
+
+    def test_long_base64_body_decoded_partially(self):
+        """Test only the preview is decoded from a long base64 body."""
+        text = "가나다라마바사" * 20000
+        parsed = ParsedMessage(build_multipart(text), preview_chars=100)
+
+        assert parsed.body == text[:100]
+        assert parsed.body_length == len(text.encode("utf-8"))
+
+    def test_long_quoted_printable_body(self):
+        """Test quoted-printable bodies are previewed from a prefix."""
+        message = email.message_from_string(
+            "Content-Type: text/plain; charset=utf-8\n"
+            "Content-Transfer-Encoding: quoted-printable\n\n"
+            + "caf=C3=A9 " * 5000
+        )
+        parsed = ParsedMessage(message, preview_chars=20)
+
+        assert parsed.body == "café café café café "
+        assert parsed.body_length > 20
+
+    def test_html_fallback(self):
+        """Test an HTML-only message uses its HTML part as the body."""
+        parsed = ParsedMessage(build_multipart("<p>Hi</p>", html=True))
+
+        assert parsed.body == "<p>Hi</p>"
+
+    def test_attachment_payload_not_decoded(self, monkeypatch):
+        """Test listing attachments never decodes their payloads."""
+        message = build_multipart("Hello")
+        attachment = message.get_payload()[1]
+
+        def fail(*args, **kwargs):
+            raise AssertionError("attachment payload decoded")
+
+        monkeypatch.setattr(attachment, "get_payload", fail)
+        parsed = ParsedMessage(message)
+
+        assert parsed.body == "Hello"
+        assert len(parsed.attachments) == 1
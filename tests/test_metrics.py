@@ -0,0 +1,59 @@
+"""
+Tests for the Prometheus metrics registry.
+"""
+
+import pytest
+
+from src.services.metrics import MetricsRegistry
+
+
+class TestMetricsRegistry:
+    """Test metric families and their exposition format."""
+
+    def test_counter_and_gauge_render(self):
+        """Test counters accumulate per label set and gauges keep the last value."""
+        registry = MetricsRegistry()
+        errors = registry.counter("errors_total", "Errors", ("protocol", "error"))
+        depth = registry.gauge("queue_depth", "Queue depth", ("account",))
+
+        errors.inc("smtp", "SMTPServerDisconnected")
+        errors.inc("smtp", "SMTPServerDisconnected")
+        errors.inc("imap", 'Odd"Name')
+        depth.set(5, "default")
+        depth.set(2, "default")
+
+        assert registry.render() == (
+            "# HELP errors_total Errors\n"
+            "# TYPE errors_total counter\n"
+            'errors_total{protocol="imap",error="Odd\\"Name"} 1\n'
+            'errors_total{protocol="smtp",error="SMTPServerDisconnected"} 2\n'
+            "# HELP queue_depth Queue depth\n"
+            "# TYPE queue_depth gauge\n"
+            'queue_depth{account="default"} 2\n'
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test observations land in the first bucket whose bound they do not exceed."""
+        registry = MetricsRegistry()
+        latency = registry.histogram("phase_seconds", "Phase latency", ("phase",), buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, "data")
+        with latency.time("connect"):
+            pass
+
+        lines = registry.render().splitlines()
+        assert 'phase_seconds_bucket{phase="data",le="0.1"} 2' in lines
+        assert 'phase_seconds_bucket{phase="data",le="1"} 3' in lines
+        assert 'phase_seconds_bucket{phase="data",le="+Inf"} 4' in lines
+        assert 'phase_seconds_sum{phase="data"} 3.65' in lines
+        assert 'phase_seconds_count{phase="data"} 4' in lines
+        assert latency.count("connect") == 1
+
+    def test_duplicate_name_rejected(self):
+        """Test a metric name can only be registered once."""
+        registry = MetricsRegistry()
+        registry.counter("sent_total", "Sent")
+
+        with pytest.raises(ValueError):
+            registry.gauge("sent_total", "Sent")
@@ -0,0 +1,253 @@
+"""
+Tests for streaming MIME serialization and SMTP DATA transfer.
+"""
+
+import asyncio
+import email
+import os
+import pytest
+import aiosmtplib
+from aiosmtplib.protocol import FlowControlMixin
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from src.services.mime_stream import (
+    ATTACHMENT_CHUNK_SIZE,
+    DATA_CHUNK_SIZE,
+    EncodedAttachmentCache,
+    FileAttachment,
+    encoded_size,
+    has_file_attachments,
+    iter_message_bytes,
+    send_streaming,
+)
+
+
+def build_message(path):
+    message = MIMEMultipart()
+    message["From"] = "sender@example.com"
+    message["To"] = "user@example.com"
+    message["Subject"] = "Report"
+    message.attach(MIMEText("See attached.\n.hidden line\n", "plain"))
+    message.attach(FileAttachment(path))
+    return message
+
+
+@pytest.fixture
+def attachment(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(ATTACHMENT_CHUNK_SIZE * 2 + 1000))
+    return path
+
+
+class FakeSMTPServer:
+    """Accepts one message over SMTP and records the raw DATA section."""
+
+    def __init__(self):
+        self.commands = []
+        self.data = b""
+        self.server = None
+
+    async def handle(self, reader, writer):
+        writer.write(b"220 fake ESMTP\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.strip().decode()
+            self.commands.append(command)
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                writer.write(b"250-fake\r\n250 8BITMIME\r\n")
+            elif verb == "DATA":
+                writer.write(b"354 go ahead\r\n")
+                await writer.drain()
+                self.data = await reader.readuntil(b"\r\n.\r\n")
+                writer.write(b"250 queued\r\n")
+            elif verb == "RCPT" and "refused" in command:
+                writer.write(b"550 no such user\r\n")
+            elif verb == "QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(
+            self.handle, "127.0.0.1", 0, limit=1024 * 1024
+        )
+        return self.server.sockets[0].getsockname()[1]
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+class TestIterMessageBytes:
+    """Test piecewise serialization."""
+
+    def test_round_trips_through_parser(self, attachment):
+        """Test the streamed bytes parse back to the original attachment."""
+        message = build_message(attachment)
+
+        data = b"".join(iter_message_bytes(message))
+        parsed = email.message_from_bytes(data)
+
+        text, attached = parsed.get_payload()
+        assert parsed["Subject"] == "Report"
+        assert "See attached." in text.get_payload()
+        assert attached.get_filename() == "data.bin"
+        assert attached.get_payload(decode=True) == attachment.read_bytes()
+
+    def test_attachment_read_in_chunks(self, attachment):
+        """Test no single piece holds more than one encoded chunk."""
+        pieces = list(iter_message_bytes(build_message(attachment)))
+
+        # 57 input bytes become one 76-character line plus CRLF
+        assert max(len(piece) for piece in pieces) <= ATTACHMENT_CHUNK_SIZE // 57 * 78
+        assert all(line == b"" or len(line) <= 76 for line in b"".join(pieces).split(b"\r\n"))
+
+    def test_has_file_attachments(self, attachment):
+        """Test streaming is only selected for messages with file parts."""
+        assert has_file_attachments(build_message(attachment))
+        assert not has_file_attachments(MIMEText("hello"))
+
+
+class TestSendStreaming:
+    """Test DATA streaming against a local SMTP server."""
+
+    async def test_send_streaming(self, attachment):
+        """Test the message arrives intact with dot-stuffing applied."""
+        server = FakeSMTPServer()
+        async with server as port:
+            smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            await smtp.connect()
+            errors, reply = await send_streaming(
+                smtp, build_message(attachment), "sender@example.com",
+                ["user@example.com", "refused@example.com"]
+            )
+            await smtp.quit()
+
+        assert reply == "queued"
+        assert list(errors) == ["refused@example.com"]
+        assert "MAIL FROM:<sender@example.com>" in server.commands
+        assert b"\r\n..hidden line\r\n" in server.data
+
+        received = server.data[:-len(b".\r\n")].replace(b"\r\n..", b"\r\n.")
+        parsed = email.message_from_bytes(received)
+        assert parsed.get_payload()[1].get_payload(decode=True) == attachment.read_bytes()
+
+    async def test_send_rendered_bytes(self):
+        """Test rendered messages are dot-stuffed across DATA chunk boundaries."""
+        head = b"Subject: Big\r\n\r\n"
+        filler = b"x" * (DATA_CHUNK_SIZE - len(head) - 2) + b"\r\n"
+        raw = head + filler + b".starts the second chunk\r\n" + b"y" * 100 + b"\r\n"
+        assert raw[DATA_CHUNK_SIZE:].startswith(b".")
+
+        server = FakeSMTPServer()
+        async with server as port:
+            smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            await smtp.connect()
+            _, reply = await send_streaming(smtp, raw, "sender@example.com", ["user@example.com"])
+            await smtp.quit()
+
+        assert reply == "queued"
+        assert server.data == raw.replace(b"\r\n.", b"\r\n..") + b".\r\n"
+
+    async def test_drain_falls_back_to_write_buffer(self, monkeypatch):
+        """Test streaming still applies backpressure without the private drain hook."""
+        monkeypatch.delattr(FlowControlMixin, "_drain_helper")
+        raw = b"Subject: Big\r\n\r\n" + (b"z" * 998 + b"\r\n") * 300
+
+        server = FakeSMTPServer()
+        async with server as port:
+            smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            await smtp.connect()
+            _, reply = await send_streaming(smtp, raw, "sender@example.com", ["user@example.com"])
+            await smtp.quit()
+
+        assert reply == "queued"
+        assert server.data == raw + b".\r\n"
+
+    async def test_all_recipients_refused(self, attachment):
+        """Test a fully refused envelope raises without sending DATA."""
+        server = FakeSMTPServer()
+        async with server as port:
+            smtp = aiosmtplib.SMTP(hostname="127.0.0.1", port=port, start_tls=False)
+            await smtp.connect()
+            with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+                await send_streaming(
+                    smtp, build_message(attachment), "sender@example.com",
+                    ["refused@example.com"]
+                )
+            await smtp.quit()
+
+        assert "DATA" not in server.commands
+        assert "RSET" in server.commands
+
+
+class TestEncodedAttachmentCache:
+    """Test reuse of encoded attachment bodies."""
+
+    def test_shared_attachment_encoded_once(self, attachment, monkeypatch):
+        """Test later sends replay the cached encoding byte for byte."""
+        cache = EncodedAttachmentCache(max_bytes=1024 * 1024)
+        first = b"".join(FileAttachment(attachment, cache=cache).iter_encoded())
+        assert b"".join(FileAttachment(attachment, cache=cache).iter_encoded()) == first
+
+        def fail(*args, **kwargs):
+            raise AssertionError("file re-read")
+
+        monkeypatch.setattr("builtins.open", fail)
+        second = b"".join(FileAttachment(attachment, cache=cache).iter_encoded())
+
+        assert second == first
+        assert cache.stats()["hits"] == 1
+        assert cache.size == encoded_size(attachment.stat().st_size)
+
+    def test_first_send_not_buffered(self, attachment, monkeypatch):
+        """Test a file sent once streams without its encoding being collected."""
+        cache = EncodedAttachmentCache(max_bytes=1024 * 1024)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("first send buffered for the cache")
+
+        monkeypatch.setattr(cache, "put", fail)
+        chunks = FileAttachment(attachment, cache=cache).iter_encoded()
+
+        assert b"".join(chunks)
+        assert cache.size == 0
+
+    def test_modified_file_re_encoded(self, attachment):
+        """Test a changed file does not reuse the stale entry."""
+        cache = EncodedAttachmentCache(max_bytes=1024 * 1024)
+        for _ in range(2):
+            b"".join(FileAttachment(attachment, cache=cache).iter_encoded())
+
+        attachment.write_bytes(b"new content")
+        data = b"".join(FileAttachment(attachment, cache=cache).iter_encoded())
+
+        assert data == b"bmV3IGNvbnRlbnQ=\r\n"
+        assert cache.stats()["hits"] == 0
+
+    def test_lru_eviction_and_size_bound(self, tmp_path):
+        """Test entries are evicted least recently used and oversized files skipped."""
+        paths = []
+        for index in range(3):
+            path = tmp_path / f"{index}.bin"
+            path.write_bytes(bytes([index]) * 570)
+            paths.append(path)
+        big = tmp_path / "big.bin"
+        big.write_bytes(b"x" * 2000)
+        cache = EncodedAttachmentCache(max_bytes=2 * encoded_size(570))
+
+        for path in paths + [big]:
+            for _ in range(2):
+                b"".join(FileAttachment(path, cache=cache).iter_encoded())
+
+        keys = [key[0] for key in cache._entries]
+        assert keys == [str(paths[1].resolve()), str(paths[2].resolve())]
+        assert cache.size <= cache.max_bytes
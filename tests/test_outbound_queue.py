@@ -0,0 +1,144 @@
+"""
+Tests for the durable outbound queue and queued sending.
+"""
+
+import asyncio
+import pytest
+import aiosmtplib
+
+from src.config import Settings
+from src.services.email_sender import EmailSender
+from src.services.outbound_queue import OutboundQueue
+
+
+class TestOutboundQueue:
+    """Test the SQLite-backed queue store."""
+
+    def test_claim_and_mark_sent(self, tmp_path):
+        """Test a queued message is claimed once and recorded as sent."""
+        queue = OutboundQueue(str(tmp_path))
+        message_id = queue.enqueue({"recipient": "a@example.com", "subject": "Hi"})
+
+        job = queue.claim_next()
+        assert job["id"] == message_id
+        assert job["attempts"] == 1
+        assert queue.claim_next() is None
+
+        queue.mark_sent(message_id)
+        status = queue.get(message_id)
+        assert status["status"] == "sent"
+        assert status["recipient"] == "a@example.com"
+        assert queue.pending_count() == 0
+        queue.close()
+
+    def test_retry_waits_for_backoff(self, tmp_path):
+        """Test a deferred message is not claimed before its next attempt time."""
+        queue = OutboundQueue(str(tmp_path))
+        message_id = queue.enqueue({"recipient": "a@example.com"})
+        queue.claim_next()
+
+        queue.mark_retry(message_id, "451 try later", delay=60)
+
+        assert queue.claim_next() is None
+        status = queue.get(message_id)
+        assert status["status"] == "queued"
+        assert status["last_error"] == "451 try later"
+        assert status["next_attempt_at"] is not None
+        queue.close()
+
+    def test_in_flight_messages_survive_restart(self, tmp_path):
+        """Test messages mid-send when the process died are queued again."""
+        queue = OutboundQueue(str(tmp_path))
+        message_id = queue.enqueue({"recipient": "a@example.com"})
+        queue.claim_next()
+        queue.close()
+
+        reopened = OutboundQueue(str(tmp_path))
+        job = reopened.claim_next()
+
+        assert job["id"] == message_id
+        assert job["attempts"] == 2
+        reopened.close()
+
+
+@pytest.fixture
+async def sender(tmp_path):
+    """EmailSender whose SMTP delivery fails according to a script."""
+    email_sender = EmailSender()
+    email_sender.settings = Settings(
+        _env_file=None,
+        DEFAULT_FROM_EMAIL="sender@example.com",
+        SEND_QUEUE_DIR=str(tmp_path),
+        SEND_QUEUE_WORKERS=2,
+        SEND_QUEUE_MAX_ATTEMPTS=3,
+        SEND_QUEUE_RETRY_BACKOFF=0.0,
+        SEND_QUEUE_POLL_INTERVAL=0.01
+    )
+    email_sender.failures = []
+    email_sender.sent = []
+
+    async def fake_send(message, sender_email, recipients):
+        if email_sender.failures:
+            raise email_sender.failures.pop(0)
+        email_sender.sent.append(recipients)
+
+    email_sender._send_smtp_message = fake_send
+    yield email_sender
+    await email_sender.close()
+
+
+async def wait_for_status(sender, message_id, expected):
+    for _ in range(200):
+        result = await sender.get_send_status(message_id)
+        if result["details"]["status"] == expected:
+            return result["details"]
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"message never reached {expected}")
+
+
+class TestQueuedSend:
+    """Test background delivery of queued emails."""
+
+    async def test_enqueue_returns_immediately_and_delivers(self, sender):
+        """Test the caller gets an ID and the worker sends the message."""
+        result = await sender.enqueue_email(recipient="user@example.com", body="hi")
+
+        assert result["status"] == "success"
+        details = await wait_for_status(sender, result["message_id"], "sent")
+        assert details["attempts"] == 1
+        assert sender.sent == [["user@example.com"]]
+
+    async def test_transient_failure_retried(self, sender):
+        """Test a 4xx reply is retried until the message goes through."""
+        sender.failures = [
+            aiosmtplib.SMTPResponseException(451, "try again later"),
+            aiosmtplib.SMTPServerDisconnected("gone"),
+        ]
+
+        result = await sender.enqueue_email(recipient="user@example.com", body="hi")
+
+        details = await wait_for_status(sender, result["message_id"], "sent")
+        assert details["attempts"] == 3
+
+    async def test_permanent_failure_not_retried(self, sender):
+        """Test a 5xx reply fails the message on the first attempt."""
+        sender.failures = [aiosmtplib.SMTPResponseException(550, "no such user")]
+
+        result = await sender.enqueue_email(recipient="user@example.com", body="hi")
+
+        details = await wait_for_status(sender, result["message_id"], "failed")
+        assert details["attempts"] == 1
+        assert "no such user" in details["last_error"]
+
+    async def test_invalid_email_not_queued(self, sender):
+        """Test validation errors are returned without queueing."""
+        result = await sender.enqueue_email(recipient="invalid", body="hi")
+
+        assert result["status"] == "error"
+        assert sender._queue is None
+
+    async def test_unknown_message_id(self, sender):
+        """Test status lookups for unknown IDs report an error."""
+        result = await sender.get_send_status("missing")
+
+        assert result["status"] == "error"
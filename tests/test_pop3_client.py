@@ -0,0 +1,223 @@
+"""
+Tests for the asyncio POP3 client and POP3 receive path.
+"""
+
+import asyncio
+import pytest
+
+from src.config import Settings
+from src.services.email_receiver import EmailReceiver
+from src.services.pop3_client import POP3Client, POP3ConnectionError, POP3Error
+
+
+def build_message(number: int) -> bytes:
+    return (
+        f"From: sender{number}@example.com\r\n"
+        f"Subject: Message {number}\r\n"
+        f"\r\n"
+        f"Body {number}\r\n"
+        f".leading dot line\r\n"
+    ).encode()
+
+
+class FakePOP3Server:
+    """Single-maildrop POP3 server speaking just enough of RFC 1939."""
+
+    def __init__(self, count: int, pipelining: bool = True):
+        self.messages = {n: build_message(n) for n in range(1, count + 1)}
+        self.pipelining = pipelining
+        self.drop_on = None
+        self.commands = []
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @staticmethod
+    def multiline(data: bytes) -> bytes:
+        stuffed = b"\r\n".join(
+            b"." + line if line.startswith(b".") else line
+            for line in data.split(b"\r\n")
+        )
+        if not stuffed.endswith(b"\r\n"):
+            stuffed += b"\r\n"
+        return stuffed + b".\r\n"
+
+    async def handle(self, reader, writer):
+        writer.write(b"+OK ready\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command, *args = line.decode().strip().split()
+            command = command.upper()
+            self.commands.append(" ".join([command, *args]))
+            if command in ("USER", "PASS"):
+                writer.write(b"+OK\r\n")
+            elif command == "CAPA":
+                caps = b"TOP\r\nUIDL\r\n" + (b"PIPELINING\r\n" if self.pipelining else b"")
+                writer.write(b"+OK\r\n" + caps + b".\r\n")
+            elif command == "LIST":
+                listing = b"".join(
+                    f"{n} {len(m)}\r\n".encode() for n, m in self.messages.items()
+                )
+                writer.write(b"+OK\r\n" + listing + b".\r\n")
+            elif command == "UIDL":
+                listing = b"".join(f"{n} uid-{n}\r\n".encode() for n in self.messages)
+                writer.write(b"+OK\r\n" + listing + b".\r\n")
+            elif command in ("RETR", "TOP"):
+                number = int(args[0])
+                if number == self.drop_on:
+                    break
+                if number not in self.messages:
+                    writer.write(b"-ERR no such message\r\n")
+                    continue
+                data = self.messages[number]
+                if command == "TOP":
+                    data = data.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+                writer.write(b"+OK\r\n" + self.multiline(data))
+            elif command == "QUIT":
+                writer.write(b"+OK bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"-ERR unknown\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def server():
+    fake = FakePOP3Server(5)
+    fake.port = await fake.start()
+    yield fake
+    await fake.stop()
+
+
+class TestPOP3Client:
+    """Test the POP3 protocol client."""
+
+    async def test_retr_undoes_dot_stuffing(self, server):
+        """Test a retrieved message matches the original bytes."""
+        client = POP3Client("127.0.0.1", server.port, use_ssl=False)
+        await client.connect()
+        await client.login("user", "pass")
+
+        data = await client.retr(2)
+        await client.quit()
+
+        assert data == build_message(2)
+        assert "PIPELINING" in client.capabilities
+
+    async def test_fetch_many_pipelines(self, server):
+        """Test TOP commands are pipelined and return headers only."""
+        client = POP3Client("127.0.0.1", server.port, use_ssl=False)
+        await client.connect()
+        await client.login("user", "pass")
+
+        results = await client.fetch_many([1, 3, 9], top_lines=0, window=3)
+        await client.quit()
+
+        assert set(results) == {1, 3}
+        assert b"Subject: Message 3" in results[3]
+        assert b"Body" not in results[3]
+
+    async def test_error_status_raises(self, server):
+        """Test -ERR replies raise POP3Error."""
+        client = POP3Client("127.0.0.1", server.port, use_ssl=False)
+        await client.connect()
+        await client.login("user", "pass")
+
+        with pytest.raises(POP3Error):
+            await client.retr(99)
+        await client.quit()
+
+    async def test_fetch_many_aborts_on_lost_connection(self, server):
+        """Test a dropped connection ends the pipeline instead of skipping a message."""
+        server.drop_on = 2
+        client = POP3Client("127.0.0.1", server.port, use_ssl=False, timeout=2)
+        await client.connect()
+        await client.login("user", "pass")
+
+        with pytest.raises(POP3ConnectionError):
+            await client.fetch_many([1, 2, 3], window=3)
+        await client.close()
+
+    async def test_single_line_responses(self):
+        """Test one-line LIST/UIDL/RETR bodies end at the terminator."""
+        fake = FakePOP3Server(1)
+        fake.messages[1] = b"Subject: Short\r\n"
+        port = await fake.start()
+        try:
+            client = POP3Client("127.0.0.1", port, use_ssl=False, timeout=2)
+            await client.connect()
+            await client.login("user", "pass")
+
+            assert await client.list() == {1: len(fake.messages[1])}
+            assert await client.uidl() == {1: "uid-1"}
+            assert await client.retr(1) == b"Subject: Short\r\n"
+            assert await client.fetch_many([1, 1], window=2) == {1: b"Subject: Short\r\n"}
+            await client.quit()
+        finally:
+            await fake.stop()
+
+
+class TestReceivePOP3:
+    """Test EmailReceiver.receive_emails_pop3."""
+
+    @pytest.fixture
+    def receiver(self, server, tmp_path):
+        email_receiver = EmailReceiver()
+        email_receiver.settings = Settings(
+            _env_file=None,
+            POP3_SERVER="127.0.0.1",
+            POP3_PORT=server.port,
+            POP3_USE_SSL=False,
+            MESSAGE_CACHE_DIR=str(tmp_path)
+        )
+        yield email_receiver
+        if email_receiver._cache is not None:
+            email_receiver._cache.close()
+
+    async def test_receive_latest(self, receiver):
+        """Test the newest messages are returned in order."""
+        result = await receiver.receive_emails_pop3(limit=3)
+
+        assert result["status"] == "success"
+        assert [email_data["subject"] for email_data in result["emails"]] == [
+            "Message 3", "Message 4", "Message 5"
+        ]
+        assert result["emails"][0]["uidl"] == "uid-3"
+
+    async def test_uidl_dedupe(self, receiver, server):
+        """Test already retrieved messages are not downloaded again."""
+        await receiver.receive_emails_pop3(limit=2)
+        server.messages[6] = build_message(6)
+        server.commands.clear()
+
+        result = await receiver.receive_emails_pop3(limit=3)
+
+        assert result["cached"] == 2
+        assert [c for c in server.commands if c.startswith("RETR")] == ["RETR 6"]
+        assert result["emails"][-1]["subject"] == "Message 6"
+
+    async def test_zero_limit_fetches_nothing(self, receiver, server):
+        """Test limit=0 returns no emails rather than the whole maildrop."""
+        result = await receiver.receive_emails_pop3(limit=0)
+
+        assert result["status"] == "success"
+        assert result["emails"] == []
+        assert not [c for c in server.commands if c.startswith("RETR")]
+
+    async def test_summary_uses_top(self, receiver, server):
+        """Test header-only listing uses TOP n 0."""
+        result = await receiver.receive_emails_pop3(limit=1, summary_only=True)
+
+        assert "TOP 5 0" in server.commands
+        assert result["emails"][0]["subject"] == "Message 5"
+        assert result["emails"][0]["body"] == ""
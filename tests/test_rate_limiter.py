@@ -0,0 +1,103 @@
+"""
+Tests for outbound send rate limiting.
+"""
+
+import time
+import pytest
+
+from src.config import Settings
+from src.services.email_sender import EmailSender
+from src.services.rate_limiter import (
+    DEFAULT_LIMITS,
+    RateLimitExceeded,
+    RateLimiterManager,
+    SendRateLimiter,
+    provider_limits,
+)
+
+
+class TestSendRateLimiter:
+    """Test token-bucket pacing."""
+
+    async def test_burst_then_sustained_rate(self):
+        """Test a burst goes out at once and later sends are paced."""
+        limiter = SendRateLimiter(per_minute=600, burst=3)
+
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.acquire()
+        burst_time = time.monotonic() - started
+        waited = await limiter.acquire()
+
+        assert burst_time < 0.05
+        assert 0.05 < waited < 0.3
+
+    async def test_max_wait_raises(self):
+        """Test a send that would wait too long fails fast."""
+        limiter = SendRateLimiter(per_minute=1, burst=1, max_wait=5)
+        await limiter.acquire()
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            await limiter.acquire()
+
+        assert exc_info.value.retry_after > 50
+
+    async def test_daily_cap_counts_recipients(self):
+        """Test the daily budget is charged per recipient."""
+        limiter = SendRateLimiter(per_minute=600, burst=10, per_day=5, max_wait=1)
+        await limiter.acquire(recipients=4)
+
+        with pytest.raises(RateLimitExceeded):
+            await limiter.acquire(recipients=2)
+
+
+class TestProviderLimits:
+    """Test provider defaults and per-account limiters."""
+
+    def test_provider_defaults(self):
+        """Test providers are matched on the SMTP host suffix."""
+        assert provider_limits("smtp.gmail.com").per_day == 500
+        assert provider_limits("smtp-mail.outlook.com").per_minute == 30
+        assert provider_limits("smtp.kakao.com").per_day is None
+        assert provider_limits("mail.example.org") == DEFAULT_LIMITS
+
+    def test_limiter_per_account(self):
+        """Test each account gets its own limiter and overrides win."""
+        manager = RateLimiterManager(per_minute=5)
+
+        first = manager.get_limiter("smtp.gmail.com", "a@gmail.com")
+        second = manager.get_limiter("smtp.gmail.com", "b@gmail.com")
+
+        assert first is manager.get_limiter("SMTP.gmail.com", "A@gmail.com")
+        assert first is not second
+        assert first.per_minute == 5
+        assert first.per_day == 500
+
+
+class TestSenderIntegration:
+    """Test EmailSender waits for the limiter before sending."""
+
+    async def test_send_smtp_message_rate_limited(self):
+        """Test the pool is only reached once the limiter allows it."""
+        email_sender = EmailSender()
+        email_sender.settings = Settings(
+            _env_file=None,
+            SMTP_SERVER="smtp.example.com",
+            SMTP_RATE_LIMIT_PER_MINUTE=1,
+            SMTP_RATE_LIMIT_BURST=1,
+            SMTP_RATE_LIMIT_MAX_WAIT=0
+        )
+        sent = []
+
+        class FakePool:
+            async def send_message(self, message, sender, recipients):
+                sent.append(recipients)
+
+        email_sender._pool = FakePool()
+
+        await email_sender._send_smtp_message(None, "a@example.com", ["b@example.com"])
+        with pytest.raises(RateLimitExceeded):
+            await email_sender._send_smtp_message(None, "a@example.com", ["c@example.com"])
+
+        assert sent == [["b@example.com"]]
+        assert email_sender._is_transient(RateLimitExceeded(30))
@@ -0,0 +1,197 @@
+"""
+Tests for MCP tool output formats.
+"""
+
+import asyncio
+import json
+import pytest
+from fastmcp import Client
+
+from src.config import Settings
+from src.server import create_server, format_email, select_fields
+from src.services import accounts as accounts_module
+from src.services.email_receiver import EmailReceiver
+from src.services.email_sender import EmailSender
+
+
+EMAILS = [
+    {"id": "7", "from": "ann@example.com", "subject": "Hi", "body": "x" * 500, "body_length": 500},
+    {"id": "8", "from": "bob@example.com", "subject": "Re: Hi", "body": "ok", "body_length": 2},
+]
+
+
+@pytest.fixture
+def server(monkeypatch):
+    async def fake_receive(self, **kwargs):
+        return {"status": "success", "emails": EMAILS, "cached": 1}
+
+    async def fake_send(self, **kwargs):
+        return {
+            "status": "success",
+            "message": "Email sent successfully to user@example.com",
+            "details": {"recipient": "user@example.com", "subject": "Hi", "cc": None,
+                        "bcc": None, "attachments": 0}
+        }
+
+    monkeypatch.setattr(EmailReceiver, "receive_emails_imap", fake_receive)
+    monkeypatch.setattr(EmailSender, "send_email", fake_send)
+    return create_server()
+
+
+async def call(server, tool, arguments):
+    async with Client(server) as client:
+        result = await client.call_tool(tool, arguments)
+    return result.content[0].text
+
+
+class TestOutputFormats:
+    """Test structured and text tool responses."""
+
+    async def test_imap_json_with_field_selection(self, server):
+        """Test JSON listings carry only the requested fields."""
+        text = await call(server, "receive_emails_imap", {
+            "output_format": "json", "fields": ["id", "subject"]
+        })
+
+        result = json.loads(text)
+        assert result["cached"] == 1
+        assert result["emails"] == [
+            {"id": "7", "subject": "Hi"}, {"id": "8", "subject": "Re: Hi"}
+        ]
+
+    async def test_imap_text_listing(self, server):
+        """Test the default text listing is unchanged in shape."""
+        text = await call(server, "receive_emails_imap", {})
+
+        assert text.startswith("📬 Retrieved 2 email(s) (1 from local cache):")
+        assert "--- Email 2 ---\nID: 8\n" in text
+        assert "Body Preview: " + "x" * 200 + "...\n" in text
+
+    async def test_multi_mailbox_text_listing(self, server, monkeypatch):
+        """Test merged listings name each email's mailbox and failed mailboxes."""
+        async def fake_multi(self, **kwargs):
+            return {
+                "status": "partial",
+                "message": "Failed to read 1 of 2 mailboxes: Sent",
+                "count": 1,
+                "emails": [dict(EMAILS[1], mailbox="INBOX")],
+                "mailboxes": {
+                    "INBOX": {"status": "success", "total": 4, "cached": 0},
+                    "Sent": {"status": "error", "message": "timed out"}
+                }
+            }
+
+        monkeypatch.setattr(EmailReceiver, "receive_emails_multi", fake_multi)
+        text = await call(server, "receive_emails_multi_mailbox", {"mailboxes": ["INBOX", "Sent"]})
+
+        assert text.startswith("⚠️ Failed to read 1 of 2 mailboxes: Sent\n")
+        assert "INBOX: 4 matching\nSent: ❌ timed out\n" in text
+        assert "--- Email 1 ---\nMailbox: INBOX\nID: 8\n" in text
+
+    async def test_send_email_json(self, server):
+        """Test send results can be returned as JSON with selected details."""
+        text = await call(server, "send_email", {
+            "recipient": "user@example.com", "body": "hi",
+            "output_format": "json", "fields": ["recipient"]
+        })
+
+        result = json.loads(text)
+        assert result["status"] == "success"
+        assert result["details"] == {"recipient": "user@example.com"}
+
+    async def test_unknown_output_format(self, server):
+        """Test an unsupported format is rejected."""
+        text = await call(server, "send_email", {
+            "recipient": "user@example.com", "body": "hi", "output_format": "xml"
+        })
+
+        assert text.startswith("❌ Error: output_format")
+
+    async def test_unknown_account(self, server):
+        """Test naming an unconfigured account is reported, not sent."""
+        text = await call(server, "send_email", {
+            "recipient": "user@example.com", "body": "hi",
+            "output_format": "json", "account": "nobody"
+        })
+
+        assert json.loads(text) == {"status": "error", "message": "Unknown account 'nobody'"}
+
+    def test_format_email(self):
+        """Test IMAP and multi-mailbox listings share one email layout."""
+        email_data = dict(EMAILS[1], mailbox="Sent", has_attachments=True, attachments=[
+            {"filename": "a.pdf", "content_type": "application/pdf", "size": 10}
+        ])
+
+        assert format_email(3, email_data) == [
+            "--- Email 3 ---", "Mailbox: Sent", "ID: 8", "From: bob@example.com", "To: N/A",
+            "Subject: Re: Hi", "Date: N/A", "Attachments: 1", "  - a.pdf (application/pdf), 10 bytes",
+            "Body Preview: ok", "Body Length: 2 characters", ""
+        ]
+        assert "Mailbox: Sent" not in format_email(1, EMAILS[1])
+
+    def test_select_fields(self):
+        """Test missing fields are skipped and no selection keeps everything."""
+        assert select_fields({"a": 1, "b": 2}, ["b", "c"]) == {"b": 2}
+        assert select_fields({"a": 1}, None) == {"a": 1}
+
+
+class TestMetricsRoute:
+    """Test the Prometheus scrape endpoint."""
+
+    async def test_metrics_include_account_gauges(self, server):
+        """Test a scrape reports pool and queue gauges of accounts in use."""
+        route = next(r for r in server._additional_http_routes if r.path == "/api/metrics")
+
+        # Accounts are closed when the server stops, so scrape while it runs
+        async with Client(server) as client:
+            await client.call_tool("send_email", {"recipient": "user@example.com", "body": "hi"})
+            response = await route.endpoint(None)
+
+        body = response.body.decode()
+        assert response.media_type.startswith("text/plain; version=0.0.4")
+        assert "# TYPE email_smtp_phase_seconds histogram" in body
+        assert 'email_smtp_pool_connections{account="default",state="idle"} 0' in body
+        assert 'email_send_queue_depth{account="default"} 0' in body
+
+
+class TestStartup:
+    """Test work resumed when the server starts."""
+
+    async def test_queued_mail_delivered_after_restart(self, tmp_path, monkeypatch):
+        """Test a backlog from a previous run is sent without any tool call."""
+        settings = Settings(
+            _env_file=None,
+            DEFAULT_FROM_EMAIL="sender@example.com",
+            SEND_QUEUE_DIR=str(tmp_path),
+            SEND_QUEUE_POLL_INTERVAL=0.01
+        )
+        previous = EmailSender(settings)
+
+        async def never_sends(self, message, sender, recipients):
+            await asyncio.Event().wait()
+
+        monkeypatch.setattr(EmailSender, "_send_smtp_message", never_sends)
+        queued = await previous.enqueue_email(recipient="user@example.com", body="hi")
+        await asyncio.sleep(0.05)
+        await previous.close()
+
+        sent = []
+
+        async def fake_send(self, message, sender, recipients):
+            sent.append(recipients)
+
+        monkeypatch.setattr(EmailSender, "_send_smtp_message", fake_send)
+        monkeypatch.setattr(accounts_module, "get_settings", lambda: settings)
+        server = create_server()
+
+        async with Client(server):
+            for _ in range(200):
+                if sent:
+                    break
+                await asyncio.sleep(0.01)
+
+        assert sent == [["user@example.com"]]
+        restarted = EmailSender(settings)
+        status = await restarted.get_send_status(queued["message_id"])
+        await restarted.close()
+        assert status["details"]["status"] == "sent"
@@ -0,0 +1,281 @@
+"""
+Tests for the SMTP connection pool.
+"""
+
+import asyncio
+import pytest
+import aiosmtplib
+from email.mime.text import MIMEText
+
+from src.services import smtp_pool
+from src.services.metrics import BYTES_TOTAL, SMTP_PHASE_SECONDS
+from src.services.smtp_pool import SMTPConnectionPool
+
+
+class FakeSMTP:
+    """Minimal stand-in for aiosmtplib.SMTP."""
+
+    instances = []
+    fail_next_send = None
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.is_connected = False
+        self.sent = 0
+        self.noops = 0
+        FakeSMTP.instances.append(self)
+
+    async def connect(self):
+        self.is_connected = True
+
+    async def login(self, username, password):
+        self.logged_in_as = username
+
+    async def data(self, message):
+        return aiosmtplib.SMTPResponse(250, "OK")
+
+    async def noop(self):
+        self.noops += 1
+        return aiosmtplib.SMTPResponse(250, "OK")
+
+    async def send_message(self, message, sender=None, recipients=None):
+        if FakeSMTP.fail_next_send is not None:
+            error, FakeSMTP.fail_next_send = FakeSMTP.fail_next_send, None
+            self.is_connected = False
+            raise error
+        self.sent += 1
+        return {}, "OK"
+
+    async def sendmail(self, sender, recipients, message):
+        await self.data(message)
+        self.sent += 1
+        self.last_raw = message
+        return {}, "OK"
+
+    async def quit(self):
+        self.is_connected = False
+
+    def close(self):
+        self.is_connected = False
+
+
+@pytest.fixture(autouse=True)
+def fake_smtp(monkeypatch):
+    """Replace the real SMTP client with the fake."""
+    FakeSMTP.instances = []
+    FakeSMTP.fail_next_send = None
+    monkeypatch.setattr(smtp_pool.aiosmtplib, "SMTP", FakeSMTP)
+    return FakeSMTP
+
+
+def make_pool(**kwargs):
+    options = {"hostname": "smtp.example.com", "port": 587}
+    options.update(kwargs)
+    return SMTPConnectionPool(**options)
+
+
+def make_message():
+    return MIMEText("hello")
+
+
+class TestSMTPConnectionPool:
+    """Test SMTP connection pooling."""
+
+    async def test_reuses_connection(self):
+        """Sequential sends share a single connection."""
+        pool = make_pool()
+        for _ in range(3):
+            await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert len(FakeSMTP.instances) == 1
+        assert FakeSMTP.instances[0].sent == 3
+        assert pool.stats()["idle"] == 1
+
+    async def test_max_size_bounds_open_connections(self):
+        """Concurrent checkouts never exceed max_size."""
+        pool = make_pool(max_size=2)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with pool.connection():
+                peak = max(peak, pool.in_use)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(6)))
+
+        assert peak == 2
+        assert len(FakeSMTP.instances) == 2
+
+    async def test_recycles_after_max_messages(self):
+        """A connection is retired after max_messages_per_connection sends."""
+        pool = make_pool(max_messages_per_connection=2)
+        for _ in range(3):
+            await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert len(FakeSMTP.instances) == 2
+        assert FakeSMTP.instances[0].is_connected is False
+
+    async def test_idle_timeout_closes_connection(self):
+        """Connections idle longer than idle_timeout are not reused."""
+        pool = make_pool(idle_timeout=0.0)
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+        await asyncio.sleep(0.01)
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert len(FakeSMTP.instances) == 2
+
+    async def test_health_check_noop(self):
+        """Idle connections are probed with NOOP before reuse."""
+        pool = make_pool(health_check_interval=0.0)
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert FakeSMTP.instances[0].noops == 1
+        assert len(FakeSMTP.instances) == 1
+
+    async def test_reconnects_on_disconnect(self):
+        """A dropped connection is replaced and the send retried once."""
+        pool = make_pool()
+        FakeSMTP.fail_next_send = aiosmtplib.SMTPServerDisconnected("gone")
+
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert len(FakeSMTP.instances) == 2
+        assert FakeSMTP.instances[1].sent == 1
+
+    async def test_disconnect_after_data_not_retried(self, monkeypatch):
+        """A drop once the message data is sent may follow delivery, so it is not resent."""
+        async def dropped_data(self, message):
+            self.is_connected = False
+            raise aiosmtplib.SMTPServerDisconnected("gone")
+
+        monkeypatch.setattr(FakeSMTP, "data", dropped_data)
+        pool = make_pool()
+
+        with pytest.raises(aiosmtplib.SMTPServerDisconnected):
+            await pool.send_message(make_message().as_bytes(), "a@example.com", ["b@example.com"])
+
+        assert len(FakeSMTP.instances) == 1
+        assert pool.size == 0
+
+    async def test_reconnects_on_421(self):
+        """A 421 reply is treated as a stale connection."""
+        pool = make_pool()
+        FakeSMTP.fail_next_send = aiosmtplib.SMTPResponseException(421, "closing")
+
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert FakeSMTP.instances[1].sent == 1
+
+    async def test_permanent_error_not_retried(self):
+        """Non-transient SMTP errors propagate without a retry."""
+        pool = make_pool()
+        FakeSMTP.fail_next_send = aiosmtplib.SMTPResponseException(550, "no such user")
+
+        with pytest.raises(aiosmtplib.SMTPResponseException):
+            await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert len(FakeSMTP.instances) == 1
+        assert pool.size == 0
+
+    @pytest.mark.parametrize(
+        "error",
+        [
+            aiosmtplib.SMTPResponseException(550, "mailbox unavailable"),
+            aiosmtplib.SMTPRecipientsRefused([]),
+        ],
+    )
+    async def test_refused_message_keeps_connection(self, monkeypatch, error):
+        """A refusal the server answered leaves the connection pooled."""
+        pool = make_pool()
+
+        async def refuse(self, message, sender=None, recipients=None):
+            raise error
+
+        monkeypatch.setattr(FakeSMTP, "send_message", refuse)
+        with pytest.raises(type(error)):
+            await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert pool.size == 1
+        assert pool.in_use == 0
+        async with pool.connection() as conn:
+            assert conn.smtp is FakeSMTP.instances[0]
+        assert len(FakeSMTP.instances) == 1
+
+    async def test_unavailable_reply_discards_connection(self, monkeypatch):
+        """A 421 reply retires the connection even if the socket stays open."""
+        pool = make_pool()
+
+        async def unavailable(self, message, sender=None, recipients=None):
+            raise aiosmtplib.SMTPResponseException(421, "closing")
+
+        monkeypatch.setattr(FakeSMTP, "send_message", unavailable)
+        with pytest.raises(aiosmtplib.SMTPResponseException):
+            await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+
+        assert pool.size == 0
+
+    async def test_sends_prerendered_bytes(self):
+        """Already rendered messages are sent as-is."""
+        pool = make_pool()
+        raw = make_message().as_bytes()
+
+        await pool.send_message(raw, "a@example.com", ["b@example.com", "c@example.com"])
+
+        assert FakeSMTP.instances[0].last_raw is raw
+
+    async def test_records_phase_metrics(self):
+        """Connect, AUTH and DATA are timed separately and sent bytes counted."""
+        pool = make_pool(username="user", password="secret")
+        before = {phase: SMTP_PHASE_SECONDS.count(phase) for phase in ("connect", "auth", "data")}
+        sent_before = BYTES_TOTAL.value("smtp", "sent")
+        raw = make_message().as_bytes()
+
+        await pool.send_message(raw, "a@example.com", ["b@example.com"])
+
+        assert FakeSMTP.instances[0].logged_in_as == "user"
+        assert {phase: SMTP_PHASE_SECONDS.count(phase) - before[phase] for phase in before} == {
+            "connect": 1, "auth": 1, "data": 1
+        }
+        assert BYTES_TOTAL.value("smtp", "sent") - sent_before == len(raw)
+
+    async def test_min_size_warm_up(self):
+        """min_size connections are opened on first checkout."""
+        pool = make_pool(min_size=3)
+        async with pool.connection():
+            pass
+
+        assert len(FakeSMTP.instances) == 3
+        assert pool.stats()["idle"] == 3
+
+    async def test_warm_up_counts_against_max_size(self, monkeypatch):
+        """Concurrent first checkouts wait for warm-up instead of opening extra connections."""
+        async def slow_connect(self):
+            await asyncio.sleep(0.01)
+            self.is_connected = True
+
+        monkeypatch.setattr(FakeSMTP, "connect", slow_connect)
+        pool = make_pool(min_size=2, max_size=2)
+        peak = 0
+
+        async def worker():
+            nonlocal peak
+            async with pool.connection():
+                peak = max(peak, pool.size)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(worker() for _ in range(4)))
+
+        assert peak == 2
+        assert len(FakeSMTP.instances) == 2
+
+    async def test_close(self):
+        """Closing the pool disconnects idle connections."""
+        pool = make_pool()
+        await pool.send_message(make_message(), "a@example.com", ["b@example.com"])
+        await pool.close()
+
+        assert FakeSMTP.instances[0].is_connected is False
+        with pytest.raises(RuntimeError):
+            await pool.acquire()
@@ -0,0 +1,102 @@
+"""
+Tests for mail-merge templates.
+"""
+
+import asyncio
+import pytest
+
+from src.config import Settings
+from src.services.email_sender import EmailSender
+from src.services.templates import CompiledTemplate, MailTemplate, TemplateError
+
+
+class TestCompiledTemplate:
+    """Test template compilation and rendering."""
+
+    def test_render_substitutes_placeholders(self):
+        """Test placeholders are filled and literal text is kept."""
+        template = CompiledTemplate("Hi {{ name }}, your order {{order_id}} shipped.")
+
+        assert template.variables == {"name", "order_id"}
+        assert template.render({"name": "Ann", "order_id": 42}) == "Hi Ann, your order 42 shipped."
+
+    def test_missing_variable(self):
+        """Test a missing value is reported by name."""
+        with pytest.raises(TemplateError, match="order_id"):
+            CompiledTemplate("{{ name }} {{ order_id }}").render({"name": "Ann"})
+
+    def test_html_values_escaped(self):
+        """Test values substituted into HTML bodies are escaped, subjects are not."""
+        template = MailTemplate("t", "Hello {{ name }}", "<p>{{ name }}</p>", is_html=True)
+
+        subject, body = template.render({"name": "<Ann & Bob>"})
+
+        assert subject == "Hello <Ann & Bob>"
+        assert body == "<p>&lt;Ann &amp; Bob&gt;</p>"
+
+
+@pytest.fixture
+def sender():
+    email_sender = EmailSender()
+    email_sender.settings = Settings(
+        _env_file=None,
+        DEFAULT_FROM_EMAIL="sender@example.com",
+        SMTP_POOL_MAX_SIZE=2
+    )
+    email_sender.sent = []
+
+    async def fake_send(message, sender_email, recipients):
+        email_sender.sent.append(message)
+        return {}, "OK"
+
+    email_sender._send_smtp_message = fake_send
+    return email_sender
+
+
+class TestSendMerge:
+    """Test mail-merge sending."""
+
+    async def test_merge_renders_per_row(self, sender):
+        """Test each row gets its own subject and body."""
+        registered = sender.register_template("Order {{ order_id }}", "Hi {{ name }}")
+        rows = [
+            {"recipient": "a@example.com", "name": "Ann", "order_id": 1},
+            {"recipient": "b@example.com", "name": "Bob"},
+            {"recipient": "c@example.com", "name": "Cy", "order_id": 3},
+        ]
+
+        result = await sender.send_merge(registered["template_id"], rows)
+
+        assert registered["variables"] == ["name", "order_id"]
+        assert result["status"] == "partial"
+        assert [item["status"] for item in result["results"]] == ["success", "error", "success"]
+        assert "order_id" in result["results"][1]["message"]
+        subjects = sorted(message["Subject"] for message in sender.sent)
+        assert subjects == ["Order 1", "Order 3"]
+
+    async def test_unknown_template(self, sender):
+        """Test merging with an unregistered template fails up front."""
+        result = await sender.send_merge("missing", [{"recipient": "a@example.com"}])
+
+        assert result["status"] == "error"
+        assert sender.sent == []
+
+    async def test_render_crash_stops_merge(self, sender, monkeypatch):
+        """Test an unexpected render error is returned instead of hanging the workers."""
+        registered = sender.register_template("Order {{ order_id }}", "Hi")
+        render = MailTemplate.render
+
+        def crashing_render(self, row):
+            if row["order_id"] == 2:
+                raise RuntimeError("renderer crashed")
+            return render(self, row)
+
+        monkeypatch.setattr(MailTemplate, "render", crashing_render)
+        rows = [{"recipient": f"{n}@example.com", "order_id": n} for n in range(1, 5)]
+
+        result = await asyncio.wait_for(sender.send_merge(registered["template_id"], rows), 5)
+
+        assert result["status"] == "error"
+        assert result["message"].startswith("Mail merge stopped at row 1: Failed to render row: renderer crashed")
+        assert [item["status"] for item in result["results"]] == ["success", "error", "error", "error"]
+        assert [message["Subject"] for message in sender.sent] == ["Order 1"]
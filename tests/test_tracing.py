@@ -0,0 +1,73 @@
+"""
+Tests for per-phase timing traces.
+"""
+
+import json
+import time
+
+from src.services import tracing
+from src.services.metrics import SMTP_PHASE_SECONDS
+from src.services.tracing import Trace
+
+
+class TestTrace:
+    """Test span collection and export."""
+
+    def test_nested_and_aggregate_spans(self):
+        """Test spans nest under the open span and add_time sums repeated steps."""
+        with Trace("send_email") as trace:
+            with tracing.span("pool_acquire"):
+                with SMTP_PHASE_SECONDS.time("connect"):
+                    time.sleep(0.001)
+            with tracing.span("smtp.data"):
+                tracing.add_time("attachment_encoding", 0.002)
+                tracing.add_time("attachment_encoding", 0.003)
+
+        spans = {span["name"]: span for span in trace.summary()["spans"]}
+        assert list(spans) == ["pool_acquire", "smtp.connect", "smtp.data", "attachment_encoding"]
+        assert spans["smtp.connect"]["depth"] == 1
+        assert spans["smtp.connect"]["duration_ms"] >= 1
+        assert spans["attachment_encoding"]["count"] == 2
+        assert abs(spans["attachment_encoding"]["duration_ms"] - 5) < 0.01
+
+    def test_no_trace_is_a_no_op(self):
+        """Test spans and aggregates outside a trace record nothing."""
+        with tracing.span("validate") as span:
+            tracing.add_time("parse", 0.1)
+
+        assert span is None
+        assert not tracing.is_tracing()
+
+    def test_failed_span_marked_in_otlp(self):
+        """Test the OTLP rendering links parents and flags failed spans."""
+        with Trace("receive_emails_imap") as trace:
+            try:
+                with tracing.span("imap.connect"):
+                    raise ConnectionError("refused")
+            except ConnectionError:
+                pass
+
+        root, connect = trace.to_otlp()["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert len(root["traceId"]) == 32
+        assert "parentSpanId" not in root
+        assert connect["parentSpanId"] == root["spanId"]
+        assert connect["status"] == {"code": 2, "message": "ConnectionError"}
+        assert int(connect["endTimeUnixNano"]) >= int(connect["startTimeUnixNano"])
+
+    async def test_run_traced_exports(self, tmp_path):
+        """Test run_traced attaches the summary and appends one line per trace."""
+        export_file = tmp_path / "traces" / "spans.jsonl"
+
+        async def operation():
+            with tracing.span("validate"):
+                return {"status": "error", "message": "Invalid recipient email"}
+
+        for _ in range(2):
+            result = await tracing.run_traced("send_email", operation(), str(export_file))
+
+        assert result["details"]["trace"]["spans"][0]["name"] == "validate"
+        lines = export_file.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["resourceSpans"][0]["resource"]["attributes"][0] == {
+            "key": "service.name", "value": {"stringValue": "email-send-mcp"}
+        }
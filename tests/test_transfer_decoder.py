@@ -0,0 +1,38 @@
+"""
+Tests for incremental transfer decoding.
+"""
+
+import base64
+import quopri
+
+from src.utils.transfer_decoder import TransferDecoder
+
+
+def decode_in_chunks(encoding: str, data: bytes, size: int) -> bytes:
+    decoder = TransferDecoder(encoding)
+    output = b"".join(decoder.feed(data[i:i + size]) for i in range(0, len(data), size))
+    return output + decoder.flush()
+
+
+class TestTransferDecoder:
+    """Test decoding split at arbitrary chunk boundaries."""
+
+    def test_base64_any_split(self):
+        """Test base64 split mid-group and mid-line decodes exactly."""
+        payload = bytes(range(256)) * 10
+        encoded = base64.encodebytes(payload).replace(b"\n", b"\r\n")
+
+        for size in (1, 7, 77, 1000):
+            assert decode_in_chunks("base64", encoded, size) == payload
+
+    def test_quoted_printable_any_split(self):
+        """Test soft line breaks and escapes split across chunks."""
+        text = ("Grüße, café = 100% " * 50).encode("utf-8")
+        encoded = quopri.encodestring(text)
+
+        for size in (1, 3, 50):
+            assert decode_in_chunks("quoted-printable", encoded, size) == text
+
+    def test_binary_passthrough(self):
+        """Test other encodings are written unchanged."""
+        assert decode_in_chunks("8bit", b"raw bytes", 4) == b"raw bytes"
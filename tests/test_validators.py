@@ -3,9 +3,12 @@ Tests for email validation utilities.
 """
 
 import pytest
+from src.utils import validators
 from src.utils.validators import (
+    clear_validation_cache,
     validate_email_address,
     validate_email_addresses,
+    validate_email_batch,
     format_email_address
 )
 
@@ -65,3 +68,57 @@ class TestEmailValidation:
         assert "John Doe" in result
         assert "user@example.com" in result
         assert "<" in result and ">" in result
+
+
+class TestValidationCache:
+    """Test memoized and batched validation."""
+    
+    def setup_method(self):
+        clear_validation_cache()
+    
+    def test_repeat_addresses_validated_once(self, monkeypatch):
+        """Test the full validator runs once per distinct address."""
+        calls = []
+        original = validators.validate_email
+        
+        def counting_validate(email, **kwargs):
+            calls.append(email)
+            return original(email, **kwargs)
+        
+        monkeypatch.setattr(validators, "validate_email", counting_validate)
+        
+        for _ in range(3):
+            assert validate_email_address("User@Example.com") == (True, "User@example.com")
+        
+        assert calls == ["User@example.com"]
+    
+    def test_spelling_variants_share_cache_entry(self, monkeypatch):
+        """Test whitespace and domain case do not create new cache entries."""
+        calls = []
+        original = validators.validate_email
+        
+        def counting_validate(email, **kwargs):
+            calls.append(email)
+            return original(email, **kwargs)
+        
+        monkeypatch.setattr(validators, "validate_email", counting_validate)
+        
+        for email in ["user@example.com", " user@EXAMPLE.com", "user@Example.COM\n"]:
+            assert validate_email_address(email) == (True, "user@example.com")
+        
+        assert calls == ["user@example.com"]
+    
+    def test_prefilter_rejects_without_full_validation(self, monkeypatch):
+        """Test obviously malformed input never reaches the full validator."""
+        monkeypatch.setattr(validators, "validate_email", None)
+        
+        assert validate_email_address("no-at-sign") == (False, "An email address must have an @-sign.")
+        assert validate_email_address("user@")[0] is False
+        assert validate_email_address("@example.com")[0] is False
+    
+    def test_batch_preserves_order_and_duplicates(self):
+        """Test batch results line up with the input list."""
+        results = validate_email_batch(["a@example.com", "bad", "a@example.com"])
+        
+        assert results[0] == results[2] == (True, "a@example.com")
+        assert results[1][0] is False